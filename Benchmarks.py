@@ -0,0 +1,868 @@
+import csv, os, sys, math
+import itertools, operator
+import random
+import shutil
+import time, queue, traceback
+import datetime, platform
+import json, sqlite3
+import argparse, contextlib
+import multiprocessing as mp
+
+import pandas as pd
+
+from ReportPDF_New_MProcess_2 import Timer, InputCorrect, Currency_Values_Reader, CSV_Start, Year_Proc_Read, \
+    Single_Pass_Read, Batch_Read, Vacancy_Record, create_readers
+from ReportPDF import DataSet
+from ReportBackends import CSV_Chunks, backends
+from CurrencyValues import Currency_Values_Creator
+from RefactorCSV import RefactorAPICSV
+from SQLReport import SQLReport
+
+
+currency_to_rub = {
+    "RUR": 1, "USD": 60.66, "EUR": 59.90, "KZT": 0.13, "UAH": 1.64,
+    "BYR": 23.91, "AZN": 35.68, "UZS": 0.0055, "KGS": 0.76, "GEL": 21.74,
+}
+currency_weights = [850, 60, 30, 20, 15, 10, 5, 5, 3, 2]
+areas = ["Москва", "Санкт-Петербург", "Екатеринбург", "Новосибирск", "Казань", "Нижний Новгород",
+         "Краснодар", "Самара", "Ростов-на-Дону", "Уфа", "Пермь", "Воронеж", "Минск", "Алматы", "Киев"]
+area_weights = [400, 150, 50, 45, 40, 35, 30, 25, 25, 20, 15, 15, 10, 10, 10]
+names = ["Программист", "Программист Python", "Ведущий программист 1С", "Аналитик", "Бухгалтер",
+         "Менеджер по продажам", "Водитель", "Системный администратор", "Тестировщик", "Дизайнер"]
+engines = ["ReportPDF", "ReportPDFInFutures", "ReportPDFInMultiprocess", "ReportPDF_New_MProcess_2", "SQLReport"]
+engine_to_backend = {"ReportPDF": "serial", "ReportPDFInFutures": "threads", "ReportPDFInMultiprocess": "processes"}
+compared_metrics = ["wall_s", "cpu_s", "peak_rss_mb"]
+cbr_codes = ["AUD", "AZN", "GBP", "AMD", "BYN", "BGN", "BRL", "HUF", "HKD", "DKK", "USD", "EUR", "INR", "KZT", "CAD",
+             "KGS", "CNY", "MDL", "NOK", "PLN", "RON", "XDR", "SGD", "TJS", "TRY", "TMT", "UZS", "UAH", "CZK", "SEK",
+             "CHF", "ZAR", "KRW", "JPY"]
+vacancy_fields = ["name", "key_skills", "salary_from", "salary_to", "salary_currency", "area_name", "published_at"]
+
+
+def create_currency_csv(csv_dir: str, csv_name: str, start_year: int, end_year: int) -> None:
+    """Создать csv-файл с курсами валют в формате Currency_Values_Creator.
+    Args:
+        csv_dir (str): директория для файла.
+        csv_name (str): название файла.
+        start_year (int): первый год.
+        end_year (int): последний год (включительно).
+    """
+    os.makedirs(csv_dir, exist_ok=True)
+    with open(csv_dir + "/" + csv_name, "w", encoding="utf-8-sig", newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(Currency_Values_Reader.start_basic_row)
+        for year in range(start_year, end_year + 1):
+            for month in range(1, 13):
+                drift = 1 + (year - start_year) * 0.03 + month * 0.001
+                for code, rate in currency_to_rub.items():
+                    writer.writerow([year, month, code, round(rate * (1 if code == "RUR" else drift), 10)])
+
+
+def get_year_counts(rows_count: int, years: list, year_weights: list) -> list:
+    """Поделить кол-во вакансий между годами пропорционально весам (остаток - самым "тяжелым" годам).
+    Args:
+        rows_count (int): кол-во вакансий.
+        years (list): годы.
+        year_weights (list): вес каждого года.
+    Returns:
+        list: кол-во вакансий для каждого года.
+    """
+    weights_sum = sum(year_weights)
+    counts = [rows_count * weight // weights_sum for weight in year_weights]
+    by_weight = sorted(range(len(years)), key=lambda index: year_weights[index], reverse=True)
+    for index in by_weight[:rows_count - sum(counts)]:
+        counts[index] += 1
+    return counts
+
+
+def create_vacancies_csv(file_name: str, rows_count: int, start_year: int, end_year: int,
+                         invalid_piece: float = 0.05, seed: int = 42, multiline_skills: bool = True) -> None:
+    """Создать синтетический csv-файл с вакансиями, отсортированными по дате публикации.
+    Кол-во вакансий растет от года к году, валюты и города распределены неравномерно (как в выгрузках hh.ru).
+    Файл пишется по годам, поэтому в памяти хранятся даты только одного года (подходит и для 10М строк).
+    Args:
+        file_name (str): название файла.
+        rows_count (int): кол-во вакансий.
+        start_year (int): первый год.
+        end_year (int): последний год (включительно).
+        invalid_piece (float): доля вакансий без зарплаты.
+        seed (int): зерно генератора случайных чисел.
+        multiline_skills (bool): писать навыки через перенос строки (поле в кавычках) или через пробел.
+    """
+    rand = random.Random(seed)
+    years = list(range(start_year, end_year + 1))
+    year_weights = [index + 1 for index in range(len(years))]
+    currencies = list(currency_to_rub.keys())
+    with open(file_name, "w", encoding="utf-8-sig", newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(vacancy_fields)
+        for year, year_count in zip(years, get_year_counts(rows_count, years, year_weights)):
+            dates = sorted((rand.randint(1, 12), rand.randint(1, 28)) for _ in range(year_count))
+            for month, day in dates:
+                salary_from = rand.randint(10, 150) * 1000
+                salary_to = salary_from + rand.randint(0, 50) * 1000
+                salary_from, salary_to = rand.choice([(salary_from, salary_to), (salary_from, ""), ("", salary_to)])
+                currency = rand.choices(currencies, currency_weights)[0]
+                if currency != "RUR":
+                    salary_from = salary_from if salary_from == "" else salary_from // 50
+                    salary_to = salary_to if salary_to == "" else salary_to // 50
+                if rand.random() < invalid_piece:
+                    salary_from, salary_to, currency = "", "", ""
+                key_skills = ("\n" if multiline_skills else " ").join(
+                    rand.sample(["Python", "SQL", "Git", "1С", "Excel", "Linux"], 2))
+                writer.writerow([rand.choice(names), key_skills, salary_from, salary_to, currency,
+                                 rand.choices(areas, area_weights)[0],
+                                 f"{year}-{month:02}-{day:02}T{rand.randint(0, 23):02}:15:00+0300"])
+
+
+@contextlib.contextmanager
+def bench_files(bench_dir: str, rows_count: int = None, with_currency: bool = True, **vacancies_args):
+    """Временная директория бенчмарка с синтетическими файлами (2003-2022 годы).
+    Директория создается заново и удаляется при выходе, в том числе если бенчмарк упал.
+    Args:
+        bench_dir (str): временная директория.
+        rows_count (int): кол-во вакансий (None - файл с вакансиями не создается).
+        with_currency (bool): создать файл валют currency_csv.csv.
+        **vacancies_args: остальные аргументы create_vacancies_csv.
+    Yields:
+        str: файл с вакансиями.
+    """
+    if os.path.exists(bench_dir):
+        shutil.rmtree(bench_dir)
+    os.mkdir(bench_dir)
+    try:
+        if with_currency:
+            create_currency_csv(bench_dir, "currency_csv.csv", 2003, 2022)
+        file_name = bench_dir + "/vacancies.csv"
+        if rows_count is not None:
+            create_vacancies_csv(file_name, rows_count, 2003, 2022, **vacancies_args)
+        yield file_name
+    finally:
+        shutil.rmtree(bench_dir, ignore_errors=True)
+
+
+def run_readers(mode: str, file_name: str, prof: str, values_reader: Currency_Values_Reader) -> (list, dict, dict):
+    """Посчитать данные для отчета без построения графиков и pdf.
+    Args:
+        mode (str): режим обработки из create_readers.
+        file_name (str): файл с вакансиями.
+        prof (str): название профессии.
+        values_reader (Currency_Values_Reader): данные по валютам.
+    Returns:
+        (list, dict, dict): данные по годам, город к средней зарплате, город к доле вакансий.
+    """
+    input_values = InputCorrect(file_name, prof, Timer("BENCH > " + mode, 3))
+    year_reader, area_reader = create_readers(mode, input_values, values_reader)
+    year_data = sorted(year_reader.get_year_data())
+    return year_data, area_reader.area_to_middle_salary, area_reader.area_to_piece
+
+
+def benchmark_modes(modes: list, rows_count: int, prof: str = "Программист", bench_dir: str = "bench") -> dict:
+    """Сравнить время разных режимов обработки на синтетическом файле.
+    Args:
+        modes (list): режимы обработки из create_readers.
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        prof (str): название профессии.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: режим к времени работы в секундах.
+    """
+    with bench_files(bench_dir, rows_count) as file_name:
+        values_reader = Currency_Values_Reader(bench_dir, "currency_csv.csv")
+        mode_to_time = {}
+        mode_to_result = {}
+        for index, mode in enumerate(modes):
+            run_name = mode if mode not in mode_to_time else f"{mode} ({index})"
+            start_time = time.perf_counter()
+            mode_to_result[run_name] = run_readers(mode, file_name, prof, values_reader)
+            mode_to_time[run_name] = round(time.perf_counter() - start_time, 3)
+        for run_name, result in mode_to_result.items():
+            if result != mode_to_result[modes[0]]:
+                print(f"BENCH > Результаты режимов \"{modes[0]}\" и \"{run_name}\" отличаются!")
+    return mode_to_time
+
+
+def benchmark_year_workers(rows_count: int, processes_count: int = None, bench_dir: str = "bench") -> dict:
+    """Сравнить обработку по годам: постоянные процессы с ограниченной очередью и процесс на каждый год.
+    Синтетический файл содержит 20 лет (2003-2022).
+    Args:
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        processes_count (int): кол-во постоянных процессов (по умолчанию - кол-во ядер).
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: режим к времени работы в секундах.
+    """
+    with bench_files(bench_dir, rows_count) as file_name:
+        values_reader = Currency_Values_Reader(bench_dir, "currency_csv.csv")
+        csv_start = CSV_Start(InputCorrect(file_name, "Программист", Timer("BENCH > Годы", 3)), values_reader)
+        mode_to_time = {}
+        mode_to_result = {}
+        for mode, spawn_per_year in [("Процесс на год", True), ("Постоянные процессы", False)]:
+            start_time = time.perf_counter()
+            year_reader = Year_Proc_Read(csv_start, bench_dir + "/csv", processes_count, spawn_per_year=spawn_per_year)
+            mode_to_result[mode] = sorted(year_reader.get_year_data())
+            mode_to_time[mode] = round(time.perf_counter() - start_time, 3)
+        if mode_to_result["Процесс на год"] != mode_to_result["Постоянные процессы"]:
+            print("BENCH > Результаты обработки по годам отличаются!")
+    return mode_to_time
+
+
+def measure_peak_rss(mode: str, file_name: str, prof: str, bench_dir: str, rss_queue) -> None:
+    """Функция отдельного процесса: посчитать данные для отчета и отдать пиковый размер памяти процесса (RSS).
+    Модуль resource есть только в Unix.
+    Args:
+        mode (str): режим обработки из create_readers.
+        file_name (str): файл с вакансиями.
+        prof (str): название профессии.
+        bench_dir (str): директория с файлом валют.
+        rss_queue (mp.Queue): очередь для результата (МБ до обработки, пиковые МБ).
+    """
+    import resource
+    values_reader = Currency_Values_Reader(bench_dir, "currency_csv.csv")
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    run_readers(mode, file_name, prof, values_reader)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_queue.put((round(start_rss / 1024, 1), round(peak_rss / 1024, 1)))
+
+
+def benchmark_memory(modes: list, rows_count: int, prof: str = "Программист", bench_dir: str = "bench") -> dict:
+    """Сравнить пиковую память разных режимов: каждый режим запускается в новом процессе (spawn),
+    чтобы пик одного режима не влиял на другой. Процессы-обработчики внутри режимов не учитываются.
+    Args:
+        modes (list): режимы обработки из create_readers.
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        prof (str): название профессии.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: режим к паре (МБ до обработки, пиковые МБ).
+    """
+    with bench_files(bench_dir, rows_count) as file_name:
+        context = mp.get_context("spawn")
+        mode_to_rss = {}
+        for mode in modes:
+            rss_queue = context.Queue()
+            proc = context.Process(target=measure_peak_rss, args=(mode, file_name, prof, bench_dir, rss_queue))
+            proc.start()
+            mode_to_rss[mode] = rss_queue.get()
+            proc.join()
+    return mode_to_rss
+
+
+def benchmark_batch(profs: list, rows_count: int, bench_dir: str = "bench") -> dict:
+    """Сравнить пакетную обработку профессий за один проход с отдельным проходом на каждую профессию.
+    Args:
+        profs (list): названия профессий.
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: режим к времени работы в секундах.
+    """
+    with bench_files(bench_dir, rows_count) as file_name:
+        values_reader = Currency_Values_Reader(bench_dir, "currency_csv.csv")
+        timer = Timer("BENCH > Пакет", 3)
+        mode_to_time = {}
+        start_time = time.perf_counter()
+        single_results = [Single_Pass_Read(CSV_Start(InputCorrect(file_name, prof, timer), values_reader, False))
+                          .get_year_data() for prof in profs]
+        mode_to_time["Проход на профессию"] = round(time.perf_counter() - start_time, 3)
+        start_time = time.perf_counter()
+        batch_reader = Batch_Read(CSV_Start(InputCorrect(file_name, profs[0], timer), values_reader, False), profs)
+        batch_results = [batch_reader.get_prof_reader(prof).get_year_data() for prof in profs]
+        mode_to_time["Пакет"] = round(time.perf_counter() - start_time, 3)
+        if single_results != batch_results:
+            print("BENCH > Результаты пакетной обработки отличаются!")
+    return mode_to_time
+
+
+def benchmark_backends(rows_count: int, prof: str = "Программист", workers: int = None,
+                       bench_dir: str = "bench") -> dict:
+    """Сравнить способы обработки (serial/threads/processes) в отчете ReportPDF на синтетическом файле.
+    Args:
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        prof (str): название профессии.
+        workers (int): кол-во потоков или процессов (по умолчанию - кол-во ядер).
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: способ обработки к времени работы в секундах.
+    """
+    with bench_files(bench_dir, rows_count, with_currency=False) as file_name:
+        backend_to_time = {}
+        backend_to_result = {}
+        for backend in backends:
+            start_time = time.perf_counter()
+            data = DataSet(file_name, prof, backend, workers)
+            backend_to_time[backend] = round(time.perf_counter() - start_time, 3)
+            backend_to_result[backend] = (data.year_to_salary, data.year_to_salary_needed, data.area_to_salary,
+                                          data.area_to_piece)
+        for backend, result in backend_to_result.items():
+            if result != backend_to_result[backends[0]]:
+                print(f"BENCH > Результаты способов \"{backends[0]}\" и \"{backend}\" отличаются!")
+    return backend_to_time
+
+
+def get_salary_with_exceptions(csv_start: CSV_Start, line: list) -> (float or None):
+    """Прежняя проверка записи и подсчет зарплаты (для сравнения): каждое поле зарплаты разбирается float
+    в try/except при проверке и еще раз при подсчете зарплаты, курс ищется дважды.
+    Args:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        line (list): запись.
+    Returns:
+        float or None: зарплата в рублях или None, если запись не подходит.
+    """
+    if len(line) != csv_start.start_line_len:
+        return None
+    dic = dict(zip(csv_start.start_line, line))
+    is_numeric = []
+    for field in ["salary_from", "salary_to"]:
+        try:
+            float(dic[field])
+            is_numeric.append(True)
+        except ValueError:
+            is_numeric.append(False)
+    if csv_start.values_reader.rate(dic["published_at"], dic["salary_currency"]) is None or not any(is_numeric):
+        return None
+    try:
+        salary_from = math.floor(float(dic["salary_from"]))
+    except ValueError:
+        salary_from = math.floor(float(dic["salary_to"]))
+    try:
+        salary_to = math.floor(float(dic["salary_to"]))
+    except ValueError:
+        salary_to = salary_from
+    return csv_start.values_reader.rate(dic["published_at"], dic["salary_currency"]) * (salary_to + salary_from) / 2
+
+
+def benchmark_validation(rows_count: int, invalid_piece: float = 0.5, bench_dir: str = "bench") -> dict:
+    """Сравнить прежнюю проверку записей (исключения на каждой невалидной записи) с CSV_Start.get_record
+    на файле, где invalid_piece записей без зарплаты. Записи читаются заранее, время чтения файла не учитывается.
+    Args:
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        invalid_piece (float): доля вакансий без зарплаты.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: способ проверки к времени работы в секундах.
+    """
+    with bench_files(bench_dir, rows_count, invalid_piece=invalid_piece) as file_name:
+        csv_start = CSV_Start(InputCorrect(file_name, "Программист", Timer("BENCH > Проверка записей", 3)),
+                              Currency_Values_Reader(bench_dir, "currency_csv.csv"), False)
+        with open(file_name, "r", encoding="utf-8-sig") as csv_file:
+            lines = list(csv.reader(csv_file))[1:]
+        check_to_time = {}
+        start_time = time.perf_counter()
+        old_salaries = [get_salary_with_exceptions(csv_start, line) for line in lines]
+        check_to_time["try/except"] = round(time.perf_counter() - start_time, 3)
+        start_time = time.perf_counter()
+        new_salaries = []
+        for line in lines:
+            record = csv_start.get_record(line)
+            new_salaries.append(None if record is None else record.salary)
+        check_to_time["get_record"] = round(time.perf_counter() - start_time, 3)
+        if old_salaries != new_salaries:
+            print("BENCH > Результаты проверок отличаются!")
+        print(f"BENCH > Отброшено {csv_start.rejects.get_rejected_count()} из {len(lines)} записей:",
+              csv_start.rejects.counts)
+    return check_to_time
+
+
+def get_list_with_objects(csv_start: CSV_Start, line: list) -> (list or None):
+    """Прежний путь записи до строки отладочного csv (для сравнения): проверка с исключениями,
+    словарь по первой строке, повторный разбор зарплат, словарь мини-вакансии и список.
+    Args:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        line (list): запись.
+    Returns:
+        list or None: название, зарплата, город, дата публикации или None, если запись не подходит.
+    """
+    if get_salary_with_exceptions(csv_start, line) is None:
+        return None
+    dic = dict(zip(csv_start.start_line, line))
+    middle_salary = Vacancy_Record.get_middle_salary(CSV_Start.parse_float(dic["salary_from"]),
+                                                     CSV_Start.parse_float(dic["salary_to"]))
+    small_dic = {"name": dic["name"], "area_name": dic["area_name"], "published_at": dic["published_at"],
+                 "salary": csv_start.values_reader.rate(dic["published_at"], dic["salary_currency"]) * middle_salary,
+                 "is_needed": None}
+    return [small_dic["name"], small_dic["salary"], small_dic["area_name"], small_dic["published_at"]]
+
+
+def benchmark_record_flow(rows_count: int, bench_dir: str = "bench") -> dict:
+    """Сравнить стоимость одной записи: прежний путь через словари и объекты вакансий
+    и Vacancy_Record, который собирается один раз при проверке. Записи читаются заранее.
+    Args:
+        rows_count (int): кол-во вакансий в синтетическом файле.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: путь записи к времени на одну запись в микросекундах.
+    """
+    with bench_files(bench_dir, rows_count) as file_name:
+        csv_start = CSV_Start(InputCorrect(file_name, "Программист", Timer("BENCH > Путь записи", 3)),
+                              Currency_Values_Reader(bench_dir, "currency_csv.csv"), False)
+        with open(file_name, "r", encoding="utf-8-sig") as csv_file:
+            lines = list(csv.reader(csv_file))[1:]
+        flow_to_time = {}
+        start_time = time.perf_counter()
+        old_lists = [get_list_with_objects(csv_start, line) for line in lines]
+        flow_to_time["dict + мини-вакансия"] = round((time.perf_counter() - start_time) / len(lines) * 1e6, 3)
+        start_time = time.perf_counter()
+        new_lists = []
+        for line in lines:
+            record = csv_start.get_record(line)
+            new_lists.append(None if record is None else record.get_list())
+        flow_to_time["Vacancy_Record"] = round((time.perf_counter() - start_time) / len(lines) * 1e6, 3)
+        if old_lists != new_lists:
+            print("BENCH > Результаты путей записи отличаются!")
+    return flow_to_time
+
+
+def get_ingestion_rows(reader_name: str, file_name: str, header_end: int):
+    """Читать записи файла (без первой строки) модулем csv или через mmap (только столбцы CSV_Start.needed_fields).
+    Args:
+        reader_name (str): способ чтения ("csv.reader" или "mmap").
+        file_name (str): название csv-файла.
+        header_end (int): конец первой строки в байтах.
+    Returns:
+        generator: записи (списки строк).
+    """
+    if reader_name == "mmap":
+        field_indexes = tuple(vacancy_fields.index(field) for field in CSV_Start.needed_fields)
+        yield from CSV_Chunks.read_rows_mmap(file_name, header_end, os.path.getsize(file_name),
+                                             len(vacancy_fields), field_indexes)
+        return
+    with open(file_name, "r", encoding="utf-8-sig", newline='') as csv_file:
+        file = csv.reader(csv_file)
+        next(file)
+        yield from file
+
+
+def benchmark_ingestion(rows_count: int, bench_dir: str = "bench") -> dict:
+    """Сравнить чтение записей файла модулем csv и через mmap (CSV_Chunks.read_rows_mmap)
+    на файле без полей в кавычках и на файле, где в каждой записи есть многострочное поле.
+    Записи не сохраняются, чтобы сборщик мусора не влиял на время, и сравниваются отдельно
+    (только по столбцам CSV_Start.needed_fields, остальные столбцы mmap не декодирует).
+    Args:
+        rows_count (int): кол-во вакансий в синтетических файлах.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: файл к способу чтения и времени в секундах.
+    """
+    with bench_files(bench_dir, with_currency=False):
+        file_to_time = {}
+        for file_kind, multiline_skills in [("Без кавычек", False), ("С кавычками", True)]:
+            file_name = bench_dir + "/vacancies.csv"
+            create_vacancies_csv(file_name, rows_count, 2003, 2022, multiline_skills=multiline_skills)
+            with open(file_name, "rb") as csv_file:
+                header_end = CSV_Chunks.find_record_end(csv_file, 0, False)
+            file_to_time[file_kind] = {}
+            for reader_name in ["csv.reader", "mmap"]:
+                start_time = time.perf_counter()
+                for _ in get_ingestion_rows(reader_name, file_name, header_end):
+                    pass
+                file_to_time[file_kind][reader_name] = round(time.perf_counter() - start_time, 3)
+            get_needed = operator.itemgetter(*(vacancy_fields.index(field) for field in CSV_Start.needed_fields))
+            if any(csv_line is None or mmap_line is None or get_needed(csv_line) != get_needed(mmap_line)
+                   for csv_line, mmap_line in itertools.zip_longest(
+                       get_ingestion_rows("csv.reader", file_name, header_end),
+                       get_ingestion_rows("mmap", file_name, header_end))):
+                print(f"BENCH > Записи файла \"{file_kind}\" при чтении через mmap отличаются!")
+    return file_to_time
+
+
+def create_cbr_xml(cur_year: int, cur_month: int) -> bytes:
+    """Создать ответ XML_daily.asp (windows-1251) со всеми полями валют, как у Центробанка.
+    Args:
+        cur_year (int): год запроса.
+        cur_month (int): месяц запроса.
+    Returns:
+        bytes: тело ответа.
+    """
+    xml = (f'<?xml version="1.0" encoding="windows-1251"?>'
+           f'<ValCurs Date="01.{cur_month:02}.{cur_year}" name="Foreign Currency Market">')
+    for index, code in enumerate(cbr_codes):
+        nominal = [1, 10, 100][index % 3]
+        value = f"{(index + 1) * 3.1 + cur_year - 2000 + cur_month / 100:.4f}".replace(".", ",")
+        xml += (f'<Valute ID="R01{index:03}"><NumCode>{index + 36:03}</NumCode><CharCode>{code}</CharCode>'
+                f'<Nominal>{nominal}</Nominal><Name>Валюта {code}</Name><Value>{value}</Value></Valute>')
+    return (xml + "</ValCurs>").encode("windows-1251")
+
+
+def get_rows_with_temp_files(cur_year: int, cur_month: int, content: bytes, bench_dir: str) -> list:
+    """Прежний путь Currency_Values_Creator: ответ пишется во временный xml, читается pandas,
+    пишется во временный csv и читается модулем csv.
+    Args:
+        cur_year (int): год запроса.
+        cur_month (int): месяц запроса.
+        content (bytes): тело ответа.
+        bench_dir (str): директория для временных файлов.
+    Returns:
+        list: кортежи (год, месяц, код валюты, курс к рублю).
+    """
+    with open(bench_dir + "/temp_xml.xml", "w", encoding="utf-8-sig") as xml_file:
+        xml_file.write(content.decode("windows-1251").split("?>", 1)[1])
+    pd.read_xml(bench_dir + "/temp_xml.xml").to_csv(bench_dir + "/temp_csv.csv", index=False)
+    rows = []
+    with open(bench_dir + "/temp_csv.csv", "r", encoding="utf-8-sig") as csv_file:
+        lines = csv.reader(csv_file)
+        index_of = {field: index for index, field in enumerate(next(lines))}
+        for line in lines:
+            value = float(line[index_of["Value"]].replace(",", "."))
+            delimiter = int(line[index_of["Nominal"]])
+            rows.append((cur_year, cur_month, line[index_of["CharCode"]], round(value/delimiter, 10)))
+    return rows
+
+
+def benchmark_currency_xml(bench_dir: str = "bench") -> dict:
+    """Сравнить разбор ответов Центробанка за всю историю (с января 2003 года по текущий месяц):
+    через временные xml и csv-файлы и потоком Currency_Values_Creator.iter_xml_rows.
+    Args:
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: способ разбора к времени в секундах.
+    """
+    with bench_files(bench_dir, with_currency=False):
+        today = datetime.date.today()
+        contents = [(year, month, create_cbr_xml(year, month)) for year in range(2003, today.year + 1)
+                    for month in range(1, 13) if (year, month) <= (today.year, today.month)]
+        parser_to_time = {}
+        start_time = time.perf_counter()
+        old_rows = [row for year, month, content in contents
+                    for row in get_rows_with_temp_files(year, month, content, bench_dir)]
+        parser_to_time["temp xml + pandas + temp csv"] = round(time.perf_counter() - start_time, 3)
+        start_time = time.perf_counter()
+        new_rows = [row for year, month, content in contents
+                    for row in Currency_Values_Creator.iter_xml_rows(year, month, content)]
+        parser_to_time["iterparse"] = round(time.perf_counter() - start_time, 3)
+        if old_rows != new_rows:
+            print("BENCH > Строки курсов валют отличаются!")
+        print(f"BENCH > Разобрано {len(contents)} ответов, {len(new_rows)} строк")
+    return parser_to_time
+
+
+def create_daily_currency_csv(file_name: str, start_year: int, end_year: int, month_days: int = 28) -> None:
+    """Создать историю курсов в формате Currency_Values_Creator с курсом на каждый день
+    (столбец Day, в RefactorAPICSV у месяца остается курс первого дня).
+    Args:
+        file_name (str): название файла.
+        start_year (int): первый год.
+        end_year (int): последний год (включительно).
+        month_days (int): кол-во дней с курсами в месяце.
+    """
+    with open(file_name, "w", encoding="utf-8-sig", newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(Currency_Values_Reader.start_daily_row)
+        for year in range(start_year, end_year + 1):
+            for month in range(1, 13):
+                for day in range(1, month_days + 1):
+                    drift = (year - start_year) / 10 + day / 1000
+                    writer.writerows([year, month, day, code, round((index + 1) * 3.1 + drift, 4)]
+                                     for index, code in enumerate(cbr_codes))
+
+
+def benchmark_currency_pivot(years_count: int = 50, bench_dir: str = "bench") -> dict:
+    """Сравнить построение таблицы месяц x валюта (RefactorAPICSV) на синтетической истории курсов по дням:
+    два прохода модулем csv, сводная таблица pandas и дописывание одного нового месяца.
+    Args:
+        years_count (int): кол-во лет в истории.
+        bench_dir (str): временная директория для файлов.
+    Returns:
+        dict: способ к времени в секундах.
+    """
+    with bench_files(bench_dir, with_currency=False):
+        file_name = bench_dir + "/currency_daily.csv"
+        create_daily_currency_csv(file_name, 2023 - years_count, 2021)
+        mode_to_time = {}
+        for mode in RefactorAPICSV.modes:
+            start_time = time.perf_counter()
+            RefactorAPICSV(file_name, bench_dir + "/" + mode, "new_currencies.csv", mode)
+            mode_to_time[mode] = round(time.perf_counter() - start_time, 3)
+        shutil.copytree(bench_dir + "/pandas", bench_dir + "/append")
+        create_daily_currency_csv(file_name, 2023 - years_count, 2022)
+        start_time = time.perf_counter()
+        RefactorAPICSV(file_name, bench_dir + "/append", "new_currencies.csv", append=True)
+        mode_to_time["pandas (дописать 2022 год)"] = round(time.perf_counter() - start_time, 3)
+        RefactorAPICSV(file_name, bench_dir + "/csv", "new_currencies.csv")
+        new_csv_lines = []
+        for mode in ["csv", "append"]:
+            with open(bench_dir + "/" + mode + "/new_currencies.csv", "r", encoding="utf-8-sig") as csv_file:
+                new_csv_lines.append(list(csv.reader(csv_file)))
+        with open(bench_dir + "/pandas/new_currencies.csv", "r", encoding="utf-8-sig") as csv_file:
+            if list(csv.reader(csv_file)) != new_csv_lines[0][:-12] or new_csv_lines[0] != new_csv_lines[1]:
+                print("BENCH > Таблицы курсов валют отличаются!")
+    return mode_to_time
+
+
+def get_vacancies_csv(data_dir: str, rows_count: int, seed: int = 42) -> str:
+    """Получить синтетический файл нужного размера (создается один раз и переиспользуется).
+    Args:
+        data_dir (str): директория для сгенерированных файлов.
+        rows_count (int): кол-во вакансий.
+        seed (int): зерно генератора случайных чисел.
+    Returns:
+        str: абсолютный путь до файла.
+    """
+    file_name = os.path.abspath(f"{data_dir}/vacancies_{rows_count}_{seed}.csv")
+    if not os.path.exists(file_name):
+        os.makedirs(data_dir, exist_ok=True)
+        create_vacancies_csv(file_name + ".tmp", rows_count, 2003, 2022, seed=seed)
+        os.replace(file_name + ".tmp", file_name)
+    return file_name
+
+
+def get_vacancies_db(csv_name: str, data_dir: str) -> str:
+    """Получить базу данных для SQLReport из синтетического файла (таблица vacancies как у DB_Preprocessing:
+    название, зарплата в рублях, город, дата). Зарплаты переводятся в рубли по тому же файлу валют,
+    что и у остальных движков (Currency_Values_Reader.rate). Создается один раз и переиспользуется.
+    Args:
+        csv_name (str): синтетический файл с вакансиями.
+        data_dir (str): директория с файлом валют.
+    Returns:
+        str: путь до базы данных.
+    """
+    db_name = csv_name.replace(".csv", ".db")
+    if os.path.exists(db_name):
+        return db_name
+    values_reader = Currency_Values_Reader(data_dir, "currency_csv.csv")
+    connect = sqlite3.connect(db_name + ".tmp")
+    connect.execute("DROP TABLE IF EXISTS vacancies")
+    for chunk in pd.read_csv(csv_name, encoding="utf-8-sig", chunksize=500000):
+        chunk = chunk[chunk["salary_currency"].notna() & (chunk["salary_from"].notna() | chunk["salary_to"].notna())]
+        rate_keys = chunk["published_at"].str[:values_reader.date_length] + chunk["salary_currency"]
+        key_to_rate = {key: values_reader.rate(key[:values_reader.date_length], key[values_reader.date_length:])
+                       for key in rate_keys.unique()}
+        salary = chunk[["salary_from", "salary_to"]].mean(axis=1) * rate_keys.map(key_to_rate).astype(float)
+        chunk, salary = chunk[salary.notna()], salary[salary.notna()]
+        pd.DataFrame({"name": chunk["name"], "salary": salary.round(),
+                      "area_name": chunk["area_name"], "published_at": chunk["published_at"]}) \
+            .to_sql("vacancies", connect, index=False, if_exists="append")
+    connect.close()
+    os.replace(db_name + ".tmp", db_name)
+    return db_name
+
+
+def run_engine(engine: str, file_name: str, db_name: str, prof: str, data_dir: str) -> None:
+    """Посчитать данные отчета одним движком без графиков и pdf.
+    Args:
+        engine (str): движок из engines (для ReportPDF_New_MProcess_2 можно указать режим через ':').
+        file_name (str): файл с вакансиями.
+        db_name (str): база данных с вакансиями (для SQLReport).
+        prof (str): название профессии.
+        data_dir (str): директория с файлом валют.
+    """
+    engine_name, _, mode = engine.partition(":")
+    if engine_name in engine_to_backend:
+        DataSet(file_name, prof, engine_to_backend[engine_name])
+    elif engine_name == "ReportPDF_New_MProcess_2":
+        run_readers(mode or "Процессы", file_name, prof, Currency_Values_Reader(data_dir, "currency_csv.csv"))
+    elif engine_name == "SQLReport":
+        SQLReport(db_name, prof)
+    else:
+        raise ValueError(f"Неизвестный движок: {engine}")
+
+
+def measure_engine(engine: str, file_name: str, db_name: str, prof: str, data_dir: str, work_dir: str,
+                   start_method: str, result_queue) -> None:
+    """Функция отдельного процесса: запустить движок и отдать время, процессорное время и пиковую память.
+    Процессорное время и память процессов-обработчиков движка тоже учитываются (RUSAGE_CHILDREN),
+    вывод движка (и его процессов) отбрасывается. Модуль resource есть только в Unix.
+    Если движок упал, в очередь кладется запись с ошибкой.
+    Args:
+        engine (str): движок.
+        file_name (str): файл с вакансиями.
+        db_name (str): база данных с вакансиями.
+        prof (str): название профессии.
+        data_dir (str): директория с файлом валют.
+        work_dir (str): рабочая директория для временных файлов движка.
+        start_method (str): способ запуска процессов движка (как в обычном запуске, а не spawn).
+        result_queue (mp.Queue): очередь для результата.
+    """
+    import resource
+    mp.set_start_method(start_method, force=True)
+    os.chdir(work_dir)
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+    start_usage = resource.getrusage(resource.RUSAGE_SELF)
+    start_time = time.perf_counter()
+    try:
+        run_engine(engine, file_name, db_name, prof, data_dir)
+    except BaseException as error:
+        traceback.print_exc()
+        result_queue.put({"error": f"{type(error).__name__}: {error}"})
+        return
+    sys.stdout.flush()
+    wall_time = time.perf_counter() - start_time
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = self_usage.ru_utime + self_usage.ru_stime - start_usage.ru_utime - start_usage.ru_stime + \
+        children_usage.ru_utime + children_usage.ru_stime
+    result_queue.put({
+        "wall_s": round(wall_time, 3),
+        "cpu_s": round(cpu_time, 3),
+        "start_rss_mb": round(start_usage.ru_maxrss / 1024, 1),
+        "peak_rss_mb": round(max(self_usage.ru_maxrss, children_usage.ru_maxrss) / 1024, 1)
+    })
+
+
+def get_engine_result(proc: mp.Process, result_queue, poll_s: float = 1.0) -> dict:
+    """Дождаться результата процесса measure_engine. Если процесс завершился, ничего не отдав
+    (например, убит или упал до запуска движка), вернуть запись с ошибкой вместо вечного ожидания.
+    Args:
+        proc (mp.Process): запущенный процесс.
+        result_queue (mp.Queue): очередь для результата.
+        poll_s (float): как часто проверять, жив ли процесс.
+    Returns:
+        dict: результат measure_engine или {"error": описание}.
+    """
+    while True:
+        try:
+            return result_queue.get(timeout=poll_s)
+        except queue.Empty:
+            if not proc.is_alive():
+                try:
+                    return result_queue.get(timeout=poll_s)
+                except queue.Empty:
+                    return {"error": f"процесс завершился с кодом {proc.exitcode} без результата"}
+
+
+def run_suite(rows_counts: list, suite_engines: list, data_dir: str = "bench_data", prof: str = "Программист",
+              repeats: int = 1) -> dict:
+    """Запустить каждый движок на файлах каждого размера. Каждый запуск идет в новом процессе (spawn),
+    чтобы память и кэши одного движка не влияли на другой. Из повторов берется лучший по времени.
+    Если движок упал, в результаты попадает запись с ошибкой (без метрик), а набор идет дальше.
+    Args:
+        rows_counts (list): размеры синтетических файлов (кол-во вакансий).
+        suite_engines (list): движки.
+        data_dir (str): директория для сгенерированных файлов.
+        prof (str): название профессии.
+        repeats (int): кол-во повторов каждого запуска.
+    Returns:
+        dict: описание машины и список результатов (движок, размер, время, процессорное время,
+            пиковая память, вакансий в секунду).
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    data_dir = os.path.abspath(data_dir)
+    if not os.path.exists(data_dir + "/currency_csv.csv"):
+        create_currency_csv(data_dir, "currency_csv.csv", 2003, 2022)
+    context = mp.get_context("spawn")
+    results = []
+    for rows_count in rows_counts:
+        file_name = get_vacancies_csv(data_dir, rows_count)
+        db_name = get_vacancies_db(file_name, data_dir) \
+            if any(engine.startswith("SQLReport") for engine in suite_engines) else None
+        for engine in suite_engines:
+            runs = []
+            for _ in range(repeats):
+                work_dir = data_dir + "/run"
+                if os.path.exists(work_dir):
+                    shutil.rmtree(work_dir)
+                os.mkdir(work_dir)
+                result_queue = context.Queue()
+                proc = context.Process(target=measure_engine,
+                                       args=(engine, file_name, db_name, prof, data_dir, work_dir,
+                                             mp.get_start_method(), result_queue))
+                proc.start()
+                runs.append(get_engine_result(proc, result_queue))
+                proc.join()
+                shutil.rmtree(work_dir)
+                if "error" in runs[-1]:
+                    break
+            if "error" in runs[-1]:
+                result = {"engine": engine, "rows": rows_count, **runs[-1]}
+                print("BENCH > ОШИБКА", result)
+                results.append(result)
+                continue
+            result = min(runs, key=lambda run: run["wall_s"])
+            result = {"engine": engine, "rows": rows_count, **result,
+                      "rows_per_sec": round(rows_count / result["wall_s"]) if result["wall_s"] else None}
+            print("BENCH >", result)
+            results.append(result)
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "prof": prof,
+            "repeats": repeats
+        },
+        "results": results
+    }
+
+
+def compare_with_baseline(suite_results: dict, baseline: dict, tolerance: float = 0.1) -> list:
+    """Сравнить результаты с сохраненными: для каждой пары (движок, размер) из обоих файлов
+    посчитать отношение новых значений к старым.
+    Args:
+        suite_results (dict): результаты run_suite.
+        baseline (dict): сохраненные результаты run_suite.
+        tolerance (float): допустимое ухудшение (0.1 - на 10%).
+    Returns:
+        list: словари (движок, размер, метрика, было, стало, отношение, ухудшилось ли).
+
+    >>> old = {"results": [{"engine": "ReportPDF", "rows": 10, "wall_s": 1.0, "cpu_s": 1.0, "peak_rss_mb": 50.0}]}
+    >>> new = {"results": [{"engine": "ReportPDF", "rows": 10, "wall_s": 1.5, "cpu_s": 1.0, "peak_rss_mb": 40.0}]}
+    >>> [(row["metric"], row["ratio"], row["is_worse"]) for row in compare_with_baseline(new, old)]
+    [('wall_s', 1.5, True), ('cpu_s', 1.0, False), ('peak_rss_mb', 0.8, False)]
+    """
+    key_to_baseline = {(result["engine"], result["rows"]): result for result in baseline["results"]}
+    comparison = []
+    for result in suite_results["results"]:
+        old_result = key_to_baseline.get((result["engine"], result["rows"]))
+        if old_result is None or "error" in result:
+            continue
+        for metric in compared_metrics:
+            if not old_result.get(metric):
+                continue
+            ratio = round(result[metric] / old_result[metric], 3)
+            comparison.append({"engine": result["engine"], "rows": result["rows"], "metric": metric,
+                               "baseline": old_result[metric], "current": result[metric], "ratio": ratio,
+                               "is_worse": ratio > 1 + tolerance})
+    return comparison
+
+
+def save_json(file_name: str, data: dict) -> None:
+    """Сохранить данные в json-файл.
+    Args:
+        file_name (str): название файла.
+        data (dict): данные.
+    """
+    with open(file_name, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Сравнение движков отчета на синтетических файлах")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000],
+                        help="размеры файлов (от 10 тыс. до 10 млн вакансий)")
+    parser.add_argument("--engines", nargs="+", default=engines,
+                        help="движки (для ReportPDF_New_MProcess_2 режим через ':', например ReportPDF_New_MProcess_2:NumPy)")
+    parser.add_argument("--repeats", type=int, default=1, help="кол-во повторов каждого запуска")
+    parser.add_argument("--data-dir", default="bench_data", help="директория для сгенерированных файлов")
+    parser.add_argument("--output", default="bench_results.json", help="файл для результатов")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="файл с сохраненными результатами")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как новые базовые")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="допустимое ухудшение (0.1 - на 10%%)")
+    parser.add_argument("--modes", action="store_true",
+                        help="дополнительно сравнить режимы ReportPDF_New_MProcess_2 (память, пакет, процессы по годам)")
+    args = parser.parse_args()
+
+    suite_results = run_suite(args.rows, args.engines, args.data_dir, repeats=args.repeats)
+    save_json(args.output, suite_results)
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            comparison = compare_with_baseline(suite_results, json.load(baseline_file), args.tolerance)
+        for row in comparison:
+            print(f"BENCH > {row['engine']} {row['rows']} {row['metric']}: {row['baseline']} -> {row['current']}"
+                  f" (x{row['ratio']}){' УХУДШЕНИЕ' if row['is_worse'] else ''}")
+        suite_results["baseline_comparison"] = comparison
+        save_json(args.output, suite_results)
+    if args.save_baseline:
+        save_json(args.baseline, suite_results)
+
+    if args.modes:
+        print("Проверка записей (50% невалидных)", benchmark_validation(200000))
+        print("Путь записи (мкс на запись)", benchmark_record_flow(200000))
+        print("Разбор курсов валют (с)", benchmark_currency_xml())
+        print("Таблица курсов за 50 лет по дням (с)", benchmark_currency_pivot())
+        print("Чтение записей (с)", benchmark_ingestion(300000))
+        print("Способы обработки", benchmark_backends(200000))
+        print("Память (МБ)", benchmark_memory(["Один проход", "MMap", "Кэш", "NumPy"], 1000000))
+        print("10 профессий", benchmark_batch(names, 20000))
+        print("20 лет", benchmark_year_workers(100000))
+        for rows in [10000, 100000]:
+            print(rows, benchmark_modes(["Процессы", "Один проход", "MMap", "Куски", "Кэш", "Кэш", "NumPy"], rows))
@@ -1,40 +1,255 @@
 import requests
-import pandas as pd
-import os, shutil
-import csv
-from ReportPDF_New_MProcess_2 import Error, Timer
+import os, io, shutil
+import csv, sqlite3
+import asyncio, threading
+import time, calendar
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+class Thread_Sessions:
+    """Сессии requests по одной на поток: requests.Session не потокобезопасна,
+    поэтому потоки ThreadPoolExecutor не делят одну сессию.
+    Attributes:
+        thread_data (threading.local): сессия текущего потока.
+        sessions (list): все созданные сессии (закрываются в close).
+    """
+    def __init__(self):
+        """Инициализация (сессии создаются при первом запросе из потока)."""
+        self.thread_data = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def get(self) -> requests.Session:
+        """Получить сессию текущего потока (создается при первом вызове в потоке).
+        Returns:
+            requests.Session: сессия потока.
+        """
+        session = getattr(self.thread_data, "session", None)
+        if session is None:
+            session = requests.Session()
+            self.thread_data.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def close(self) -> None:
+        """Закрыть все сессии."""
+        with self.lock:
+            for session in self.sessions:
+                session.close()
+            self.sessions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
 class Currency_Values_Creator:
     """Класс для работы с API Центробанка
     Attributes:
         data_dir (str): имя папки для файлов.
         csv_name (str): название csv_файла, который нужно будет создать.
+        fetch_mode (str): способ загрузки ("sequential" - по одному запросу, "async" - параллельно).
+        concurrency (int): наибольшее кол-во одновременных запросов в режиме "async".
+        retries (int): кол-во повторов запроса при ошибке в режиме "async".
+        backoff (float): пауза перед первым повтором в секундах (дальше удваивается).
+        base_url (str): адрес API Центробанка (можно подменить локальным сервером).
+        incremental (bool): дополнять существующий csv-файл только недостающими датами.
+        cache_dir (str): папка для сохраненных ответов API (None - без сохранения).
+        granularity (str): частота курсов ("month" - на 1 число месяца, "day" - на каждый день).
+        last_date (tuple): последняя уже загруженная дата (None - загрузить все).
     """
-    temp_needed_fields = ["CharCode", "Nominal", "Value"]
+    needed_fields = ["CharCode", "Nominal", "Value"]
     start_basic_row = ["Year", "Month", "CharCode", "InRuR"]
+    start_daily_row = ["Year", "Month", "Day", "CharCode", "InRuR"]
+    fetch_modes = ["sequential", "async"]
+    granularities = ["month", "day"]
+    cbr_url = "http://www.cbr.ru/scripts/XML_daily.asp"
 
-    def __init__(self, data_dir: str, csv_name: str):
+    def __init__(self, data_dir: str, csv_name: str, fetch_mode: str = "sequential", concurrency: int = 8,
+                 retries: int = 3, backoff: float = 0.5, base_url: str = cbr_url, timeout: float = 30,
+                 incremental: bool = False, cache_dir: str = None, db_name: str = None, granularity: str = "month"):
         """Инициализация класса Currency_Values. Создание CSV-файла.
         Args:
             data_dir (str): имя папки для файлов.
             csv_name (str): имя будущего файла с данными по валютам.
+            fetch_mode (str): способ загрузки ("sequential" или "async").
+            concurrency (int): наибольшее кол-во одновременных запросов в режиме "async".
+            retries (int): кол-во повторов запроса при ошибке в режиме "async".
+            backoff (float): пауза перед первым повтором в секундах (дальше удваивается).
+            base_url (str): адрес API Центробанка.
+            timeout (float): время ожидания ответа в секундах.
+            incremental (bool): дополнять существующий csv-файл только недостающими датами.
+            cache_dir (str): папка для сохраненных ответов API (None - без сохранения).
+            db_name (str): база данных с валютами (таблица currencies), из которой восстанавливается csv-файл,
+                если его еще нет (тогда загружаются только месяцы после последнего месяца базы).
+            granularity (str): частота курсов ("month" или "day").
         """
+        if fetch_mode not in Currency_Values_Creator.fetch_modes:
+            raise ValueError(f"Неизвестный способ загрузки: {fetch_mode} "
+                             f"(доступны: {', '.join(Currency_Values_Creator.fetch_modes)})")
+        if granularity not in Currency_Values_Creator.granularities:
+            raise ValueError(f"Неизвестная частота курсов: {granularity} "
+                             f"(доступны: {', '.join(Currency_Values_Creator.granularities)})")
+        self.fetch_mode = fetch_mode
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.timeout = timeout
+        self.incremental = incremental
+        self.cache_dir = cache_dir
+        self.granularity = granularity
+        self.last_date = None
         self.data_dir = data_dir
-        self.temp_xml_name = "temp_xml.xml"
-        self.temp_csv_name = "temp_csv.csv"
         self.start_year = 2003
         self.start_month = 1
         self.end_year = datetime.now().year
         self.end_month = datetime.now().month
-        self.index_of = {}
+        self.end_day = datetime.now().day
+        if incremental:
+            self.set_start_after(self.get_last_date(csv_name) or self.restore_csv_from_db(csv_name, db_name))
         self.create_csv(csv_name)
 
     def make_dir_if_needed(self) -> None:
-        """Создание нужной дериктории"""
-        if os.path.exists(self.data_dir):
+        """Создание нужной дериктории (в режиме incremental существующая папка не удаляется)."""
+        if os.path.exists(self.data_dir) and not self.incremental:
             shutil.rmtree(self.data_dir)
-        os.mkdir(self.data_dir)
+        os.makedirs(self.data_dir, exist_ok=True)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_start_row(self) -> list:
+        """Получить заголовок csv-файла для выбранной частоты курсов.
+        Returns:
+            list: названия столбцов.
+        """
+        if self.granularity == "day":
+            return Currency_Values_Creator.start_daily_row
+        return Currency_Values_Creator.start_basic_row
+
+    def get_last_date(self, csv_name: str) -> (tuple or None):
+        """Найти последнюю дату, которая уже есть в csv-файле (даты в файле идут по порядку).
+        Args:
+            csv_name (str): имя csv-файла с данными по валютам.
+        Returns:
+            tuple or None: (год, месяц) или (год, месяц, день) или None, если файла нет или в нем нет данных.
+        """
+        full_csv_path = self.data_dir + "/" + csv_name
+        if not os.path.exists(full_csv_path):
+            return None
+        last_line = None
+        with open(file=full_csv_path, mode="r", encoding="utf-8-sig") as csv_file:
+            lines = csv.reader(csv_file)
+            start_row = next(lines, None)
+            if start_row is not None and start_row != self.get_start_row():
+                raise ValueError(f"Заголовок {csv_name} не подходит для частоты курсов {self.granularity}: {start_row}")
+            for line in lines:
+                last_line = line
+        if last_line is None:
+            return None
+        return tuple(int(value) for value in last_line[:-2])
+
+    @staticmethod
+    def get_last_db_month(db_name: str) -> (tuple or None):
+        """Найти последний месяц в базе данных с валютами (столбец Data в формате ГГГГ-ММ).
+        Args:
+            db_name (str): путь до базы данных (None - базы нет).
+        Returns:
+            tuple or None: (год, месяц) или None, если базы или данных в ней нет.
+        """
+        if db_name is None or not os.path.exists(db_name):
+            return None
+        con = sqlite3.connect(db_name)
+        try:
+            last_data = con.execute("SELECT MAX(Data) FROM currencies").fetchone()[0]
+        finally:
+            con.close()
+        if last_data is None:
+            return None
+        year, month = last_data.split("-")
+        return int(year), int(month)
+
+    def restore_csv_from_db(self, csv_name: str, db_name: str) -> (tuple or None):
+        """Восстановить csv-файл из базы данных с валютами, если csv-файла еще нет.
+        В базе курсы на месяц, поэтому файл по дням не восстанавливается. Строки месяца идут в порядке
+        столбцов базы, RUR и пустые курсы пропускаются.
+        Args:
+            csv_name (str): имя csv-файла с данными по валютам.
+            db_name (str): путь до базы данных (None - базы нет).
+        Returns:
+            tuple or None: последний восстановленный (год, месяц) или None, если ничего не восстановлено
+                (тогда загружаются все даты).
+        """
+        full_csv_path = self.data_dir + "/" + csv_name
+        if self.granularity != "month" or os.path.exists(full_csv_path):
+            return None
+        last_month = Currency_Values_Creator.get_last_db_month(db_name)
+        if last_month is None:
+            return None
+        con = sqlite3.connect(db_name)
+        try:
+            cursor = con.execute("SELECT * FROM currencies ORDER BY Data")
+            char_codes = [column[0] for column in cursor.description[1:]]
+            rows = [(*(int(value) for value in data.split("-")), char_code, value)
+                    for data, *values in cursor for char_code, value in zip(char_codes, values)
+                    if char_code != "RUR" and value is not None]
+        finally:
+            con.close()
+        self.make_dir_if_needed()
+        with open(file=full_csv_path, mode="w", encoding="utf-8-sig", newline='') as csv_file:
+            csv_base = csv.writer(csv_file)
+            csv_base.writerow(self.get_start_row())
+            csv_base.writerows(rows)
+        return last_month
+
+    def set_start_after(self, last_date: (tuple or None)) -> None:
+        """Начать запросы со следующей даты после уже загруженной.
+        Args:
+            last_date (tuple or None): (год, месяц) или (год, месяц, день) последней загруженной даты
+                (None - загрузить все).
+        """
+        if last_date is None:
+            return
+        self.start_year, self.start_month = last_date[:2]
+        self.last_date = tuple(last_date)
+
+    def get_cache_path(self, cur_url: str) -> (str or None):
+        """Получить путь до сохраненного ответа по дате запроса.
+        Args:
+            cur_url (str): адрес данных.
+        Returns:
+            str or None: путь до файла (None, если ответы не сохраняются).
+        """
+        if self.cache_dir is None:
+            return None
+        day, month, year = cur_url.rsplit("date_req=", 1)[1].split("/")
+        return f"{self.cache_dir}/{year}-{month}-{day}.xml"
+
+    def load_content(self, session, cur_url: str) -> bytes:
+        """Получить тело ответа: из сохраненных ответов или запросом (новый ответ сохраняется,
+        если он разбирается как xml).
+        Args:
+            session: requests.Session или модуль requests.
+            cur_url (str): адрес данных.
+        Returns:
+            bytes: тело ответа.
+        """
+        cache_path = self.get_cache_path(cur_url)
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "rb") as cache_file:
+                return cache_file.read()
+        response = session.get(cur_url, timeout=self.timeout)
+        response.raise_for_status()
+        if cache_path is not None:
+            ET.fromstring(response.content)
+            with open(cache_path + ".tmp", "wb") as cache_file:
+                cache_file.write(response.content)
+            os.replace(cache_path + ".tmp", cache_path)
+        return response.content
 
     def get_start_and_end_months(self, cur_year: int) -> (int, int):
         """Получение начального и конечного месяца для запросов
@@ -51,82 +266,168 @@ class Currency_Values_Creator:
             end_month_value = self.end_month
         return start_month_value, end_month_value
 
-    def get_needed_url(self, year: int, month: int) -> str:
-        """Получение url-адреса по текущему году и месяцу.
+    def get_needed_url(self, year: int, month: int, day: int = 1) -> str:
+        """Получение url-адреса по текущей дате.
         Args:
             year (int): текущий год.
             month (str): текущий месяц.
+            day (int): текущий день (по умолчанию - 1 число месяца).
         Returns:
             str: корректный url-адрес.
         """
-        str_month = str(month)
-        if month < 10:
-            str_month = "0" + str(month)
-        return f"http://www.cbr.ru/scripts/XML_daily.asp?date_req=01/{str_month}/{str(year)}"
+        return f"{self.base_url}?date_req={day:02}/{month:02}/{year}"
 
-    def url_to_csv(self, cur_url: str) -> str:
-        """Конвертация полученных их хапроса данных в CSV.
-        Args:
-            cur_url (str): адрес данных.
-        Returns:
-            str: имя полученного CSV-файла."""
-        data = requests.get(cur_url)
-        full_xml_path = self.data_dir + "/" + self.temp_xml_name
-        file = open(file=full_xml_path, mode="w", encoding="utf-8-sig")
-        file.write(data.text)
-        file.close()
-        full_csv_path = self.data_dir + "/" + self.temp_csv_name
-        pd.read_xml(full_xml_path).to_csv(full_csv_path, index=False)
-        return full_csv_path
-
-    def save_data_from_xml(self, cur_year: int, cur_month: int, csv_name: str) -> None:
+    def save_data_from_xml(self, cur_year: int, cur_month: int, csv_name: str, cur_day: int = None) -> None:
         """Преобразует данные из xml и добавляет их к итоговуму csv-файлу.
         Args:
             cur_year (int): год, по которому нужно получить данные.
             cur_month (int): месяц, по которому нужно получить данные.
             csv_name (str): файл, в который будут добавляться данные.
+            cur_day (int): день, по которому нужно получить данные (None - курсы на месяц).
         """
-        cur_url = self.get_needed_url(cur_year, cur_month)
+        cur_url = self.get_needed_url(cur_year, cur_month, cur_day or 1)
         print(cur_url)
-        full_csv_path = self.url_to_csv(cur_url)
+        content = self.load_content(requests, cur_url)
+        is_new_file = not os.path.exists(self.data_dir+"/"+csv_name)
         with open(file=self.data_dir+"/"+csv_name, mode="a", encoding="utf-8-sig", newline='') as csv_basic_file:
             csv_base = csv.writer(csv_basic_file)
-            with open(file=full_csv_path, mode="r", encoding="utf-8-sig") as csv_file:
-                temp_file = csv.reader(csv_file)
-                start_temp_line = next(temp_file)
-                if len(self.index_of.items()) == 0:
-                   self.get_indexes(start_temp_line)
-                   csv_base.writerow(Currency_Values_Creator.start_basic_row)
-                for temp_line in temp_file:
-                    print(temp_line)
-                    value = float(temp_line[self.index_of["Value"]].replace(",","."))
-                    delimiter = int(temp_line[self.index_of["Nominal"]])
-                    new_row = [cur_year, cur_month, temp_line[self.index_of["CharCode"]], round(value/delimiter, 10)]
-                    csv_base.writerow(new_row)
-                csv_file.close()
-            csv_basic_file.close()
-
-    def get_indexes(self, temp_start_line: list) -> None:
-        """Получить индексы для нужных столбцов.
+            if is_new_file:
+                csv_base.writerow(self.get_start_row())
+            csv_base.writerows(Currency_Values_Creator.iter_xml_rows(cur_year, cur_month, content, cur_day))
+
+    def get_months(self) -> list:
+        """Получить все месяцы для запросов по порядку.
+        Returns:
+            list: пары (год, месяц).
+        """
+        months = []
+        for cur_year in range(self.start_year, self.end_year+1):
+            start_month_value, end_month_value = self.get_start_and_end_months(cur_year)
+            for cur_month in range(start_month_value, end_month_value+1):
+                months.append((cur_year, cur_month))
+        return months
+
+    def get_dates(self) -> list:
+        """Получить все даты для запросов по порядку (без уже загруженных).
+        Для частоты "day" - все дни месяцев из get_months, но не позже сегодняшнего дня.
+        Returns:
+            list: пары (год, месяц) или тройки (год, месяц, день).
+        """
+        dates = self.get_months()
+        if self.granularity == "day":
+            today = (self.end_year, self.end_month, self.end_day)
+            dates = [(cur_year, cur_month, cur_day) for cur_year, cur_month in dates
+                     for cur_day in range(1, calendar.monthrange(cur_year, cur_month)[1] + 1)
+                     if (cur_year, cur_month, cur_day) <= today]
+        return [date for date in dates if self.last_date is None or date > self.last_date]
+
+    @staticmethod
+    def iter_xml_rows(cur_year: int, cur_month: int, content: bytes, cur_day: int = None):
+        """Получать строки итогового csv-файла из ответа API потоком (xml.etree.iterparse), без временных файлов.
+        Из каждой валюты берутся только CharCode, Nominal и Value, разобранные элементы сразу очищаются.
+        Кодировка берется из заголовка xml (у Центробанка - windows-1251).
+        Args:
+            cur_year (int): год запроса.
+            cur_month (int): месяц запроса.
+            content (bytes): тело ответа.
+            cur_day (int): день запроса (None - в строках нет дня).
+        Returns:
+            generator: кортежи (год, месяц[, день], код валюты, курс к рублю) в порядке валют в ответе.
+
+        >>> list(Currency_Values_Creator.iter_xml_rows(2003, 1, b'<ValCurs><Valute><CharCode>KZT</CharCode>'
+        ...     b'<Nominal>100</Nominal><Name>Tenge</Name><Value>20,5000</Value></Valute></ValCurs>'))
+        [(2003, 1, 'KZT', 0.205)]
+        """
+        date = (cur_year, cur_month) if cur_day is None else (cur_year, cur_month, cur_day)
+        fields = {}
+        for _, element in ET.iterparse(io.BytesIO(content)):
+            if element.tag in Currency_Values_Creator.needed_fields:
+                fields[element.tag] = element.text
+            elif element.tag == "Valute":
+                if len(fields) != len(Currency_Values_Creator.needed_fields):
+                    raise ET.ParseError(f"В валюте {element.get('ID')} нет полей "
+                                        f"{set(Currency_Values_Creator.needed_fields) - set(fields)}")
+                value = float(fields["Value"].replace(",", "."))
+                delimiter = int(fields["Nominal"])
+                yield *date, fields["CharCode"], round(value/delimiter, 10)
+                fields = {}
+                element.clear()
+
+    async def fetch_date(self, sessions: Thread_Sessions, executor: ThreadPoolExecutor,
+                         semaphore: asyncio.Semaphore, cur_date: tuple) -> list:
+        """Загрузить и разобрать данные за одну дату с повторами при ошибках.
         Args:
-            temp_start_line (list): та строка, из которой получаем индексы.
+            sessions (Thread_Sessions): сессии с пулом соединений (своя у каждого потока).
+            executor (ThreadPoolExecutor): потоки для блокирующих запросов.
+            semaphore (asyncio.Semaphore): ограничение кол-ва одновременных запросов.
+            cur_date (tuple): (год, месяц) или (год, месяц, день) запроса.
+        Returns:
+            list: строки итогового csv-файла за дату.
+        """
+        cur_url = self.get_needed_url(*cur_date)
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    content = await loop.run_in_executor(executor, lambda: self.load_content(sessions.get(), cur_url))
+                    return list(self.iter_xml_rows(*cur_date[:2], content, *cur_date[2:]))
+                except (requests.RequestException, ET.ParseError) as error:
+                    if attempt == self.retries:
+                        raise
+                    print(f"{cur_url}: {error}, повтор через {self.backoff * 2 ** attempt} с")
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def fetch_all(self) -> (list, Exception or None):
+        """Загрузить данные за все даты параллельно (не больше concurrency запросов одновременно).
+        Если дата не загрузилась после всех повторов, остальные запросы отменяются, а строки
+        отдаются только до первой незагруженной даты (как в последовательной загрузке).
+        Returns:
+            (list, Exception or None): строки итогового csv-файла в порядке дат, первая ошибка загрузки.
         """
-        for field in Currency_Values_Creator.temp_needed_fields:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with Thread_Sessions() as sessions, ThreadPoolExecutor(self.concurrency) as executor:
+            tasks = [asyncio.create_task(self.fetch_date(sessions, executor, semaphore, cur_date))
+                     for cur_date in self.get_dates()]
             try:
-                field_index = temp_start_line.index(field)
-                self.index_of[field] = field_index
-            except:
-                Error("MISSING_INDEX", "Can't find index of \"" + field + "\"", True, Timer("", 0))
+                if tasks:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [task.exception() for task in tasks if not task.cancelled() and task.exception() is not None]
+        rows = []
+        for task in tasks:
+            if task.cancelled() or task.exception() is not None:
+                break
+            rows.extend(task.result())
+        return rows, (errors[0] if errors else None)
 
     def create_csv(self, csv_name: str) -> None:
         """Создание полного csv-файла с валютами."""
         self.make_dir_if_needed()
-        for cur_year in range(self.start_year, self.end_year+1):
-            start_month_value, end_month_value = self.get_start_and_end_months(cur_year)
-            for cur_month in range(start_month_value, end_month_value+1):
-                self.save_data_from_xml(cur_year, cur_month, csv_name)
+        dates = self.get_dates()
+        if self.fetch_mode == "async":
+            start_time = time.perf_counter()
+            rows, error = asyncio.run(self.fetch_all())
+            is_new_file = not os.path.exists(self.data_dir+"/"+csv_name)
+            with open(file=self.data_dir+"/"+csv_name, mode="a", encoding="utf-8-sig", newline='') as csv_file:
+                csv_base = csv.writer(csv_file)
+                if is_new_file:
+                    csv_base.writerow(self.get_start_row())
+                csv_base.writerows(rows)
+            if error is not None:
+                raise error
+            print(f"Загружено {len(dates)} дат за {round(time.perf_counter() - start_time, 3)} с")
+            return
+        for cur_date in dates:
+            self.save_data_from_xml(*cur_date[:2], csv_name, *cur_date[2:])
 
 
 if __name__ == '__main__':
-    values_creator = Currency_Values_Creator("api_data", "currency_csv.csv")
+    values_creator = Currency_Values_Creator("api_data", "currency_csv.csv",
+                                             input("Способ загрузки (sequential/async): ") or "sequential",
+                                             incremental=input("Только новые даты (да/нет): ") == "да",
+                                             cache_dir="api_cache", db_name="db_currencies/currencies.db",
+                                             granularity=input("Частота курсов (month/day): ") or "month")
 
@@ -0,0 +1,231 @@
+from unittest import TestCase
+import threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from CurrencyValues import *
+from RefactorCSV import RefactorAPICSV
+from ConvertCSVToDB import DBConverter
+
+
+def get_cbr_xml(date_req: str) -> bytes:
+    """XML в формате ответа XML_daily.asp (windows-1251), курсы зависят от месяца запроса."""
+    day, month, year = date_req.split("/")
+    shift = (int(year) - 2003) * 12 + int(month)
+    valutes = [("R01235", "840", "USD", 1, "Доллар США", f"{30 + shift / 100:.4f}"),
+               ("R01239", "978", "EUR", 1, "Евро", f"{33 + shift / 100:.4f}"),
+               ("R01335", "398", "KZT", 100, "Казахстанских тенге", f"{20 + shift / 1000:.4f}")]
+    xml = f'<?xml version="1.0" encoding="windows-1251"?><ValCurs Date="{day}.{month}.{year}" name="Foreign Currency Market">'
+    for valute_id, num_code, char_code, nominal, name, value in valutes:
+        xml += (f'<Valute ID="{valute_id}"><NumCode>{num_code}</NumCode><CharCode>{char_code}</CharCode>'
+                f'<Nominal>{nominal}</Nominal><Name>{name}</Name><Value>{value.replace(".", ",")}</Value></Valute>')
+    return (xml + "</ValCurs>").encode("windows-1251")
+
+
+class CBR_Handler(BaseHTTPRequestHandler):
+    fails_left = {}
+    requests_count = 0
+
+    def do_GET(self):
+        CBR_Handler.requests_count += 1
+        date_req = parse_qs(urlparse(self.path).query)["date_req"][0]
+        if CBR_Handler.fails_left.get(date_req, 0) > 0:
+            CBR_Handler.fails_left[date_req] -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        time.sleep(0.02 if date_req.startswith("01/01/") else 0)
+        body = get_cbr_xml(date_req)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml; charset=windows-1251")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Short_Creator(Currency_Values_Creator):
+    last_month = (2004, 3)
+
+    def get_months(self) -> list:
+        return [month for month in super().get_months() if month <= Short_Creator.last_month]
+
+
+class CurrencyValuesCreatorUnitTests(TestCase):
+    def setUp(self):
+        Short_Creator.last_month = (2004, 3)
+        CBR_Handler.fails_left = {}
+        CBR_Handler.requests_count = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CBR_Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/scripts/XML_daily.asp"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for data_dir in ["currency_sequential_test", "currency_async_test", "currency_cache_test", "currency_db_test"]:
+            if os.path.exists(data_dir):
+                shutil.rmtree(data_dir)
+
+    def read_csv(self, data_dir: str) -> list:
+        with open(data_dir + "/currency_csv.csv", "r", encoding="utf-8-sig") as csv_file:
+            return list(csv.reader(csv_file))
+
+    def test_async_is_equal_to_sequential(self):
+        Short_Creator("currency_sequential_test", "currency_csv.csv", base_url=self.base_url)
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", 4, base_url=self.base_url)
+        async_lines = self.read_csv("currency_async_test")
+        self.assertEqual(async_lines, self.read_csv("currency_sequential_test"))
+        self.assertEqual(len(async_lines), 1 + 15 * 3)
+        self.assertEqual(async_lines[1], ["2003", "1", "USD", "30.01"])
+        self.assertEqual(async_lines[3], ["2003", "1", "KZT", "0.20001"])
+
+    def test_async_retries_failed_requests(self):
+        CBR_Handler.fails_left = {"01/02/2003": 2, "01/03/2004": 1}
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", 4, backoff=0.01, base_url=self.base_url)
+        self.assertEqual(CBR_Handler.requests_count, 15 + 3)
+        self.assertEqual(len(self.read_csv("currency_async_test")), 1 + 15 * 3)
+
+    def test_async_raises_after_last_retry(self):
+        CBR_Handler.fails_left = {"01/05/2003": 10}
+        with self.assertRaises(requests.HTTPError):
+            Short_Creator("currency_async_test", "currency_csv.csv", "async", 4, retries=2, backoff=0.01,
+                          base_url=self.base_url)
+        self.assertEqual(CBR_Handler.fails_left["01/05/2003"], 7)
+        self.assertEqual(len(self.read_csv("currency_async_test")), 1 + 4 * 3)
+
+    def test_async_failure_cancels_pending_dates(self):
+        CBR_Handler.fails_left = {"01/01/2003": 10}
+        with self.assertRaises(requests.HTTPError):
+            Short_Creator("currency_async_test", "currency_csv.csv", "async", 1, retries=0, base_url=self.base_url)
+        self.assertEqual(CBR_Handler.requests_count, 1)
+        self.assertEqual(self.read_csv("currency_async_test"), [Currency_Values_Creator.start_basic_row])
+
+    def test_thread_sessions_are_per_thread(self):
+        with Thread_Sessions() as sessions, ThreadPoolExecutor(4) as executor:
+            barrier = threading.Barrier(4)
+            thread_sessions = list(executor.map(lambda _: (barrier.wait(), sessions.get(), sessions.get())[1:],
+                                                range(4)))
+            self.assertTrue(all(first is second for first, second in thread_sessions))
+            self.assertEqual(len({id(first) for first, _ in thread_sessions}), 4)
+            self.assertEqual(len(sessions.sessions), 4)
+        self.assertEqual(sessions.sessions, [])
+
+    def test_incremental_fetches_only_missing_months(self):
+        Short_Creator("currency_sequential_test", "currency_csv.csv", base_url=self.base_url)
+        for fetch_mode in ["sequential", "async"]:
+            Short_Creator.last_month = (2003, 10)
+            Short_Creator("currency_async_test", "currency_csv.csv", fetch_mode, base_url=self.base_url)
+            Short_Creator.last_month = (2004, 3)
+            requests_count = CBR_Handler.requests_count
+            Short_Creator("currency_async_test", "currency_csv.csv", fetch_mode, base_url=self.base_url,
+                          incremental=True)
+            self.assertEqual(CBR_Handler.requests_count - requests_count, 5)
+            self.assertEqual(self.read_csv("currency_async_test"), self.read_csv("currency_sequential_test"))
+
+    def test_incremental_without_new_months(self):
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url)
+        lines = self.read_csv("currency_async_test")
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url, incremental=True)
+        self.assertEqual(CBR_Handler.requests_count, 15)
+        self.assertEqual(self.read_csv("currency_async_test"), lines)
+
+    def test_cache_allows_offline_rebuild(self):
+        Short_Creator("currency_sequential_test", "currency_csv.csv", "async", base_url=self.base_url,
+                      cache_dir="currency_cache_test")
+        self.assertEqual(len(os.listdir("currency_cache_test")), 15)
+        self.server.shutdown()
+        for fetch_mode in ["sequential", "async"]:
+            Short_Creator("currency_async_test", "currency_csv.csv", fetch_mode, base_url=self.base_url,
+                          cache_dir="currency_cache_test")
+            self.assertEqual(self.read_csv("currency_async_test"), self.read_csv("currency_sequential_test"))
+        self.assertEqual(CBR_Handler.requests_count, 15)
+
+    def test_daily_granularity(self):
+        Short_Creator.last_month = (2003, 2)
+        Short_Creator("currency_sequential_test", "currency_csv.csv", base_url=self.base_url, granularity="day")
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", 4, base_url=self.base_url,
+                      granularity="day")
+        lines = self.read_csv("currency_async_test")
+        self.assertEqual(lines, self.read_csv("currency_sequential_test"))
+        self.assertEqual(CBR_Handler.requests_count, 2 * (31 + 28))
+        self.assertEqual(lines[0], ["Year", "Month", "Day", "CharCode", "InRuR"])
+        self.assertEqual(lines[4], ["2003", "1", "2", "USD", "30.01"])
+        self.assertEqual(lines[-1], ["2003", "2", "28", "KZT", "0.20002"])
+
+    def test_daily_incremental(self):
+        Short_Creator.last_month = (2003, 1)
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url, granularity="day")
+        with self.assertRaises(ValueError):
+            Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url,
+                          incremental=True)
+        Short_Creator.last_month = (2003, 2)
+        requests_count = CBR_Handler.requests_count
+        Short_Creator("currency_async_test", "currency_csv.csv", base_url=self.base_url, incremental=True,
+                      granularity="day")
+        self.assertEqual(CBR_Handler.requests_count - requests_count, 28)
+        Short_Creator("currency_sequential_test", "currency_csv.csv", "async", base_url=self.base_url,
+                      granularity="day")
+        self.assertEqual(self.read_csv("currency_async_test"), self.read_csv("currency_sequential_test"))
+
+    def test_get_last_db_month(self):
+        os.mkdir("currency_cache_test")
+        con = sqlite3.connect("currency_cache_test/currencies.db")
+        con.execute("CREATE TABLE currencies (Data TEXT, RUR INTEGER, USD REAL)")
+        con.executemany("INSERT INTO currencies VALUES (?, 1, 30.0)", [("2003-11",), ("2003-12",), ("2003-02",)])
+        con.commit()
+        con.close()
+        self.assertEqual(Currency_Values_Creator.get_last_db_month("currency_cache_test/currencies.db"), (2003, 12))
+        self.assertIsNone(Currency_Values_Creator.get_last_db_month("currency_cache_test/missing.db"))
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url, incremental=True,
+                      db_name="currency_cache_test/currencies.db")
+        self.assertEqual(self.read_csv("currency_async_test")[1:5], [["2003", "2", "USD", "30.0"],
+                                                                    ["2003", "11", "USD", "30.0"],
+                                                                    ["2003", "12", "USD", "30.0"],
+                                                                    ["2004", "1", "USD", "30.13"]])
+        self.assertEqual(CBR_Handler.requests_count, 3)
+
+    def test_incremental_restores_csv_from_db(self):
+        Short_Creator("currency_sequential_test", "currency_csv.csv", base_url=self.base_url)
+        Short_Creator.last_month = (2003, 10)
+        Short_Creator("currency_async_test", "currency_csv.csv", base_url=self.base_url)
+        RefactorAPICSV("currency_async_test/currency_csv.csv", "currency_cache_test", "new_currencies.csv", "pandas")
+        DBConverter("currency_cache_test/new_currencies.csv", "currency_db_test", "currencies.db")
+        shutil.rmtree("currency_async_test")
+        Short_Creator.last_month = (2004, 3)
+        requests_count = CBR_Handler.requests_count
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url, incremental=True,
+                      db_name="currency_db_test/currencies.db")
+        self.assertEqual(CBR_Handler.requests_count - requests_count, 5)
+        self.assertEqual(self.read_csv("currency_async_test"), self.read_csv("currency_sequential_test"))
+
+    def test_incremental_without_csv_rows_from_db_fetches_all(self):
+        Short_Creator.last_month = (2003, 2)
+        Short_Creator("currency_sequential_test", "currency_csv.csv", base_url=self.base_url)
+        RefactorAPICSV("currency_sequential_test/currency_csv.csv", "currency_cache_test", "new_currencies.csv",
+                       "pandas")
+        DBConverter("currency_cache_test/new_currencies.csv", "currency_db_test", "currencies.db")
+        requests_count = CBR_Handler.requests_count
+        Short_Creator("currency_async_test", "currency_csv.csv", "async", base_url=self.base_url, incremental=True,
+                      db_name="currency_db_test/currencies.db", granularity="day")
+        self.assertEqual(CBR_Handler.requests_count - requests_count, 31 + 28)
+        self.assertEqual(self.read_csv("currency_async_test")[1], ["2003", "1", "1", "USD", "30.01"])
+
+    def test_iter_xml_rows_with_fixture(self):
+        self.assertEqual(list(Currency_Values_Creator.iter_xml_rows(2004, 2, get_cbr_xml("01/02/2004"))),
+                         [(2004, 2, "USD", 30.14), (2004, 2, "EUR", 33.14), (2004, 2, "KZT", 0.20014)])
+        self.assertEqual(list(Currency_Values_Creator.iter_xml_rows(2004, 2, get_cbr_xml("17/02/2004"), 17))[0],
+                         (2004, 2, 17, "USD", 30.14))
+
+    def test_iter_xml_rows_without_needed_field(self):
+        content = get_cbr_xml("01/02/2004").replace(b"<Nominal>100</Nominal>", b"")
+        with self.assertRaises(ET.ParseError):
+            list(Currency_Values_Creator.iter_xml_rows(2004, 2, content))
+
+    def test_unknown_fetch_mode(self):
+        with self.assertRaises(ValueError):
+            Currency_Values_Creator("currency_async_test", "currency_csv.csv", "threads")
+        with self.assertRaises(ValueError):
+            Currency_Values_Creator("currency_async_test", "currency_csv.csv", granularity="week")
@@ -0,0 +1,126 @@
+class Prof_Matcher:
+    """Класс для проверки, относится ли вакансия к профессии: название профессии (или его синоним)
+    должно входить в название вакансии. Названия вакансий сильно повторяются, поэтому результат
+    проверки запоминается для уникальных названий, но не больше чем для cache_size названий
+    (при переполнении запомненные названия сбрасываются: поиск по обычному словарю быстрее, чем LRU).
+    Attributes:
+        profs (list): названия профессий.
+        synonyms (dict): название профессии к списку синонимов.
+        ignore_case (bool): сравнивать ли без учета регистра.
+        cache_size (int): наибольшее кол-во запомненных названий.
+    """
+    default_cache_size = 1 << 17
+
+    def __init__(self, profs, synonyms: dict = None, ignore_case: bool = False, cache_size: int = default_cache_size):
+        """Инициализация класса Prof_Matcher. Подготовка вариантов написания каждой профессии.
+        Args:
+            profs (str or list): название профессии или список названий.
+            synonyms (dict): название профессии к списку синонимов.
+            ignore_case (bool): сравнивать ли без учета регистра.
+            cache_size (int): наибольшее кол-во запомненных названий.
+
+        >>> Prof_Matcher("Программист").is_match("Ведущий программист 1С")
+        False
+        >>> Prof_Matcher("Программист", ignore_case=True).is_match("Ведущий программист 1С")
+        True
+        >>> Prof_Matcher("Программист", {"Программист": ["Developer"]}).is_match("Python Developer")
+        True
+        """
+        self.profs = [profs] if isinstance(profs, str) else list(profs)
+        self.synonyms = synonyms or {}
+        self.ignore_case = ignore_case
+        self.prof_to_variants = {prof: [self.normalize(variant) for variant in [prof] + self.synonyms.get(prof, [])]
+                                 for prof in self.profs}
+        self.cache_size = cache_size
+        self.name_to_matches = {}
+        self.rows_count = 0
+        self.prof_to_count = {prof: 0 for prof in self.profs}
+
+    def normalize(self, text: str) -> str:
+        """Привести строку к виду для сравнения.
+        Args:
+            text (str): строка.
+        Returns:
+            str: строка без регистра (если нужно) или та же строка.
+        """
+        return text.casefold() if self.ignore_case else text
+
+    def get_matches(self, name: str, rows_count: int = 1) -> tuple:
+        """Получить профессии, к которым относится название вакансии, и учесть их в счетчиках.
+        Args:
+            name (str): название вакансии.
+            rows_count (int): сколько записей с этим названием учесть в счетчиках.
+        Returns:
+            tuple: подходящие профессии в порядке profs.
+
+        >>> matcher = Prof_Matcher(["Программист", "Python"])
+        >>> matcher.get_matches("Программист Python"), matcher.get_matches("Аналитик")
+        (('Программист', 'Python'), ())
+        """
+        matches = self.name_to_matches.get(name)
+        if matches is None:
+            normal_name = self.normalize(name)
+            matches = tuple(prof for prof, variants in self.prof_to_variants.items()
+                            if any(normal_name.find(variant) > -1 for variant in variants))
+            if len(self.name_to_matches) >= self.cache_size:
+                self.name_to_matches.clear()
+            self.name_to_matches[name] = matches
+        self.rows_count += rows_count
+        for prof in matches:
+            self.prof_to_count[prof] += rows_count
+        return matches
+
+    def is_match(self, name: str, rows_count: int = 1) -> bool:
+        """Проверить, относится ли название вакансии хотя бы к одной профессии.
+        Args:
+            name (str): название вакансии.
+            rows_count (int): сколько записей с этим названием учесть в счетчиках.
+        Returns:
+            bool: относится ли вакансия к профессии.
+        """
+        return len(self.get_matches(name, rows_count)) > 0
+
+    def merge_counts(self, other) -> None:
+        """Добавить счетчики и результаты проверок другого объекта (например, копии из другого процесса).
+        Args:
+            other (Prof_Matcher): объект с теми же профессиями.
+        """
+        if other is self:
+            return
+        if len(self.name_to_matches) + len(other.name_to_matches) <= self.cache_size:
+            self.name_to_matches.update(other.name_to_matches)
+        self.rows_count += other.rows_count
+        for prof, count in other.prof_to_count.items():
+            self.prof_to_count[prof] += count
+
+    def get_config(self) -> dict:
+        """Получить настройки сравнения (например, чтобы понять, что сохраненные суммы устарели).
+        Returns:
+            dict: профессии, синонимы и учет регистра.
+        """
+        return {"profs": self.profs, "synonyms": self.synonyms, "ignore_case": self.ignore_case}
+
+    def get_stats(self) -> dict:
+        """Получить счетчики совпадений.
+        Returns:
+            dict: кол-во проверенных записей, кол-во запомненных названий (уникальных, пока их не больше cache_size),
+                профессия к кол-ву совпадений и профессия к доле совпадений.
+
+        >>> matcher = Prof_Matcher("Программист")
+        >>> [matcher.is_match(name) for name in ["Программист", "Аналитик", "Программист", "Программист 1С"]]
+        [True, False, True, True]
+        >>> matcher.get_stats()
+        {'rows': 4, 'names': 3, 'hits': {'Программист': 3}, 'hit_rate': {'Программист': 0.75}}
+        """
+        return {
+            "rows": self.rows_count,
+            "names": len(self.name_to_matches),
+            "hits": dict(self.prof_to_count),
+            "hit_rate": {prof: round(count / self.rows_count, 4) if self.rows_count else 0
+                         for prof, count in self.prof_to_count.items()}
+        }
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
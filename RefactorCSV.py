@@ -1,5 +1,6 @@
 import csv
 import os, shutil
+import pandas as pd
 
 
 class RefactorAPICSV:
@@ -7,20 +8,45 @@ class RefactorAPICSV:
     Attributes:
         full_path_to_csv(str): старый файл.
         new_csv_path(str): новый файл.
+        mode(str): способ обработки ("csv" - два прохода по файлу, "pandas" - сводная таблица за одно чтение).
+        append(bool): дописать в новый файл только месяцы, которых в нем еще нет.
+        is_daily(bool): курсы в старом файле по дням (есть столбец Day). Тогда для месяца берется курс
+            первого дня месяца в файле (как в помесячной загрузке - курс на 1 число), в месячном файле
+            при повторах берется последний курс.
+        fields(dict): столбец/номер в старом файле.
     """
     start_basic_row = {"Year" : 0, "Month": 1, "CharCode": 2, "InRuR": 3}
+    start_daily_row = {"Year": 0, "Month": 1, "Day": 2, "CharCode": 3, "InRuR": 4}
+    modes = ["csv", "pandas"]
 
-    def __init__(self, full_path_to_csv: str, new_csv_path: str, new_csv_name: str):
+    def __init__(self, full_path_to_csv: str, new_csv_path: str, new_csv_name: str, mode: str = "csv",
+                 append: bool = False):
         """Обработка старого файла и создание нового.
         Args:
             full_path_to_csv(str): старый файл.
             new_csv_path(str): новая директория.
             new_csv_name(str): название нового файла.
+            mode(str): способ обработки ("csv" или "pandas").
+            append(bool): дописать в новый файл только новые месяцы (сводной таблицей pandas).
         """
+        if mode not in RefactorAPICSV.modes:
+            raise ValueError(f"Неизвестный способ обработки: {mode} (доступны: {', '.join(RefactorAPICSV.modes)})")
         self.full_path_to_csv = full_path_to_csv
         self.new_csv_path = new_csv_path
         self.new_csv_name = new_csv_name
-        self.get_new_csv()
+        self.mode = mode
+        self.append = append
+        self.is_daily = self.get_is_daily()
+        self.fields = RefactorAPICSV.start_daily_row if self.is_daily else RefactorAPICSV.start_basic_row
+        if self.is_daily:
+            print("Курсы по дням: для каждого месяца берется курс первого дня")
+        if append:
+            self.append_new_months()
+        elif mode == "pandas":
+            table = self.get_pivot_table()
+            self.save_data([["Data"] + list(table.columns)] + RefactorAPICSV.get_pivot_lines(table))
+        else:
+            self.get_new_csv()
 
     @staticmethod
     def make_dir_if_needed(dir: str) -> None:
@@ -29,21 +55,27 @@ class RefactorAPICSV:
             shutil.rmtree(dir)
         os.mkdir(dir)
 
+    def get_is_daily(self) -> bool:
+        """Проверить, курсы в старом файле по дням или по месяцам (по первой строке).
+        Returns:
+            bool: есть ли в файле столбец Day.
+        """
+        with open(file=self.full_path_to_csv, mode="r", encoding="utf-8-sig") as csv_file:
+            return "Day" in next(csv.reader(csv_file), [])
+
     def get_all_currencies(self) -> list:
         """Получить список всех валют за все время.
         Returns:
             list: список валют.
         """
-        all_currencies = []
+        all_currencies = {}
         with open(file=self.full_path_to_csv, mode="r", encoding="utf-8-sig") as csv_file:
             lines = csv.reader(csv_file)
             next(lines)
             for line in lines:
-                new_charcode = line[RefactorAPICSV.start_basic_row["CharCode"]]
-                if new_charcode not in all_currencies:
-                    all_currencies.append(new_charcode)
+                all_currencies.setdefault(line[self.fields["CharCode"]])
         csv_file.close()
-        return all_currencies
+        return list(all_currencies)
 
     def get_year_month(self, line: list) -> str:
         """Получить новый формат времени из списка.
@@ -69,9 +101,71 @@ class RefactorAPICSV:
             csv_base.writerows(all_lines)
         csv_basic_file.close()
 
+    def get_pivot_table(self, after: str = None) -> pd.DataFrame:
+        """Получить сводную таблицу (месяц x валюта) за одно чтение старого файла.
+        Валюты идут в порядке первого появления (unique), для месяца берется последний курс валюты
+        (в файле по дням - первый).
+        Args:
+            after(str): брать только месяцы после этого (ГГГГ-ММ), None - все месяцы.
+        Returns:
+            pd.DataFrame: курсы-строки по месяцам (индекс - ГГГГ-ММ), первый столбец - RUR.
+        """
+        data = pd.read_csv(self.full_path_to_csv, dtype=str, encoding="utf-8-sig", keep_default_na=False)
+        currencies = list(data["CharCode"].unique())
+        data = data.drop_duplicates(["Year", "Month", "CharCode"], keep="first" if self.is_daily else "last")
+        data["Data"] = data["Year"] + "-" + data["Month"].str.zfill(2)
+        if after is not None:
+            data = data[data["Data"] > after]
+            currencies = list(data["CharCode"].unique())
+        table = (data.pivot(index="Data", columns="CharCode", values="InRuR")
+                 .reindex(columns=["RUR"] + currencies))
+        table["RUR"] = 1
+        return table
+
+    @staticmethod
+    def get_pivot_lines(table: pd.DataFrame) -> list:
+        """Получить строки нового файла из сводной таблицы (пропуски - None, как в режиме csv).
+        Args:
+            table(pd.DataFrame): сводная таблица.
+        Returns:
+            list: строки по месяцам (без первой строки).
+
+        >>> table = pd.DataFrame({"RUR": [1], "USD": [None]}, index=["2003-01"])
+        >>> RefactorAPICSV.get_pivot_lines(table)
+        [['2003-01', 1, None]]
+        """
+        table = table.astype(object).where(table.notna(), None)
+        return [[month] + values for month, values in zip(table.index, table.values.tolist())]
+
+    def append_new_months(self) -> None:
+        """Дописать в новый файл месяцы, которых в нем еще нет (файл не переписывается).
+        Если нового файла нет или появились новые валюты (нужны новые столбцы), файл создается заново.
+        """
+        full_new_path = self.new_csv_path+"/"+self.new_csv_name
+        if not os.path.exists(full_new_path):
+            table = self.get_pivot_table()
+            self.save_data([["Data"] + list(table.columns)] + RefactorAPICSV.get_pivot_lines(table))
+            return
+        with open(file=full_new_path, mode="r", encoding="utf-8-sig") as csv_file:
+            lines = csv.reader(csv_file)
+            header = next(lines)
+            last_line = header
+            for line in lines:
+                last_line = line
+        table = self.get_pivot_table(None if last_line is header else last_line[0])
+        new_currencies = [cur for cur in table.columns if cur not in header]
+        if new_currencies:
+            print(f"Новые валюты {new_currencies}, файл создается заново")
+            table = self.get_pivot_table()
+            self.save_data([["Data"] + list(table.columns)] + RefactorAPICSV.get_pivot_lines(table))
+            return
+        with open(file=full_new_path, mode="a", encoding="utf-8-sig", newline='') as csv_basic_file:
+            csv.writer(csv_basic_file).writerows(RefactorAPICSV.get_pivot_lines(table.reindex(columns=header[1:])))
+
     def get_new_csv(self):
         """обработать старый файл и получить новые строки + сохранить их."""
         all_currencies = ["RUR"] + self.get_all_currencies()
+        code_index, value_index = self.fields["CharCode"], self.fields["InRuR"]
         all_new_lines = []
         all_new_lines.append(["Data"] + all_currencies)
         with open(file=self.full_path_to_csv, mode="r", encoding="utf-8-sig") as csv_file:
@@ -80,21 +174,21 @@ class RefactorAPICSV:
             current_cur_to_inrur = {cur: None for cur in all_currencies}
             current_cur_to_inrur["RUR"] = 1
             first_line = next(lines)
-            current_cur_to_inrur[first_line[2]] = first_line[3]
+            current_cur_to_inrur[first_line[code_index]] = first_line[value_index]
             current_year_month = self.get_year_month(first_line)
             for line in lines:
                 year_month = self.get_year_month(line)
-                if current_year_month == year_month:
-                    current_cur_to_inrur[line[2]] = line[3]
-                else:
+                if current_year_month != year_month:
                     all_new_lines.append([current_year_month] + list(current_cur_to_inrur.values()))
                     current_cur_to_inrur = {cur: None for cur in all_currencies}
                     current_cur_to_inrur["RUR"] = 1
                     current_year_month = year_month
-                current_cur_to_inrur[line[2]] = line[3]
+                if not self.is_daily or current_cur_to_inrur[line[code_index]] is None:
+                    current_cur_to_inrur[line[code_index]] = line[value_index]
             all_new_lines.append([current_year_month] + list(current_cur_to_inrur.values()))
         self.save_data(all_new_lines)
 
 
 if __name__ == '__main__':
-    refactor = RefactorAPICSV("api_data/currency_csv.csv", "api_data_new", "new_currencies.csv")
\ No newline at end of file
+    refactor = RefactorAPICSV("api_data/currency_csv.csv", "api_data_new", "new_currencies.csv", "pandas",
+                              append=input("Только новые месяцы (да/нет): ") == "да")
\ No newline at end of file
@@ -0,0 +1,69 @@
+from unittest import TestCase
+from RefactorCSV import *
+
+
+class RefactorAPICSVUnitTests(TestCase):
+    def setUp(self):
+        self.lines = [[2003, 1, "USD", 31.78], [2003, 1, "EUR", 33.27], [2003, 2, "USD", 31.83],
+                      [2003, 2, "KZT", 0.2056], [2003, 2, "USD", 31.9], [2003, 11, "EUR", 34.1],
+                      [2004, 1, "USD", 29.45], [2004, 1, "KZT", 0.2101], [2004, 2, "EUR", 36.2]]
+        self.write_lines(self.lines)
+
+    def tearDown(self):
+        os.remove("refactor_test.csv")
+        for new_csv_path in ["refactor_csv_test", "refactor_pandas_test"]:
+            if os.path.exists(new_csv_path):
+                shutil.rmtree(new_csv_path)
+
+    def write_lines(self, lines: list) -> None:
+        with open("refactor_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Year", "Month", "CharCode", "InRuR"])
+            writer.writerows(lines)
+
+    def read_csv(self, new_csv_path: str) -> list:
+        with open(new_csv_path + "/new_currencies.csv", "r", encoding="utf-8-sig") as csv_file:
+            return list(csv.reader(csv_file))
+
+    def test_pandas_is_equal_to_csv(self):
+        RefactorAPICSV("refactor_test.csv", "refactor_csv_test", "new_currencies.csv")
+        RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", "pandas")
+        new_lines = self.read_csv("refactor_pandas_test")
+        self.assertEqual(new_lines, self.read_csv("refactor_csv_test"))
+        self.assertEqual(new_lines[:3], [["Data", "RUR", "USD", "EUR", "KZT"], ["2003-01", "1", "31.78", "33.27", ""],
+                                         ["2003-02", "1", "31.9", "", "0.2056"]])
+
+    def test_append_adds_only_new_months(self):
+        self.write_lines(self.lines[:6])
+        RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", "pandas")
+        self.write_lines(self.lines)
+        modified_time = os.path.getmtime("refactor_pandas_test")
+        RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", append=True)
+        RefactorAPICSV("refactor_test.csv", "refactor_csv_test", "new_currencies.csv")
+        self.assertEqual(self.read_csv("refactor_pandas_test"), self.read_csv("refactor_csv_test"))
+        self.assertEqual(os.path.getmtime("refactor_pandas_test"), modified_time)
+
+    def test_append_with_new_currency_rewrites_file(self):
+        RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", "pandas")
+        self.write_lines(self.lines + [[2004, 3, "CNY", 4.1]])
+        RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", append=True)
+        RefactorAPICSV("refactor_test.csv", "refactor_csv_test", "new_currencies.csv")
+        self.assertEqual(self.read_csv("refactor_pandas_test"), self.read_csv("refactor_csv_test"))
+
+    def test_daily_input_takes_first_day_of_month(self):
+        with open("refactor_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Year", "Month", "Day", "CharCode", "InRuR"])
+            writer.writerows([[2003, 1, 1, "USD", 31.78], [2003, 1, 1, "EUR", 33.27], [2003, 1, 2, "USD", 31.8],
+                              [2003, 1, 31, "EUR", 33.5], [2003, 2, 1, "USD", 31.83], [2003, 2, 3, "KZT", 0.2056],
+                              [2003, 2, 4, "KZT", 0.2057]])
+        RefactorAPICSV("refactor_test.csv", "refactor_csv_test", "new_currencies.csv")
+        RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", "pandas")
+        new_lines = self.read_csv("refactor_pandas_test")
+        self.assertEqual(new_lines, self.read_csv("refactor_csv_test"))
+        self.assertEqual(new_lines, [["Data", "RUR", "USD", "EUR", "KZT"], ["2003-01", "1", "31.78", "33.27", ""],
+                                     ["2003-02", "1", "31.83", "", "0.2056"]])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            RefactorAPICSV("refactor_test.csv", "refactor_pandas_test", "new_currencies.csv", "numpy")
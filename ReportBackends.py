@@ -0,0 +1,335 @@
+import os, io, re, csv, mmap
+import itertools
+import concurrent.futures as futures
+
+import numpy as np
+
+
+backends = ["serial", "threads", "processes"]
+
+
+class Serial_Executor(futures.Executor):
+    """Исполнитель с интерфейсом concurrent.futures, который выполняет задачи сразу в текущем потоке.
+    Нужен, чтобы последовательная обработка шла через тот же код, что и потоки или процессы.
+    """
+    def submit(self, fn, /, *args, **kwargs) -> futures.Future:
+        """Выполнить задачу и вернуть уже завершенный Future.
+        Args:
+            fn: функция задачи.
+            *args: позиционные аргументы функции.
+            **kwargs: именованные аргументы функции.
+        Returns:
+            Future: результат или исключение задачи.
+
+        >>> Serial_Executor().submit(pow, 2, 10).result()
+        1024
+        >>> list(Serial_Executor().map(len, ["a", "bb"]))
+        [1, 2]
+        """
+        future = futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+def create_executor(backend: str, workers: int = None) -> futures.Executor:
+    """Создать исполнитель задач для выбранного способа обработки.
+    Args:
+        backend (str): способ обработки ("serial", "threads" или "processes").
+        workers (int): кол-во потоков или процессов (по умолчанию - как в concurrent.futures).
+    Returns:
+        Executor: исполнитель задач.
+    """
+    if backend == "serial":
+        return Serial_Executor()
+    if backend == "threads":
+        return futures.ThreadPoolExecutor(workers)
+    if backend == "processes":
+        return futures.ProcessPoolExecutor(workers)
+    raise ValueError(f"Неизвестный способ обработки: {backend} (доступны: {', '.join(backends)})")
+
+
+def get_chunks_count(backend: str, workers: int = None) -> int:
+    """Получить кол-во кусков файла для выбранного способа обработки.
+    Args:
+        backend (str): способ обработки.
+        workers (int): кол-во потоков или процессов (по умолчанию - кол-во ядер).
+    Returns:
+        int: 1 кусок для последовательной обработки, иначе 4 куска на поток/процесс.
+
+    >>> get_chunks_count("serial", 8), get_chunks_count("threads", 2)
+    (1, 8)
+    """
+    if backend == "serial":
+        return 1
+    return (workers or os.cpu_count()) * 4
+
+
+class CSV_Chunks:
+    """Деление csv-файла на байтовые куски по границам записей (с учетом многострочных полей в кавычках)."""
+    block_size = 1 << 20
+    quotes_pattern = re.compile(rb'"+')
+
+    @staticmethod
+    def count_quotes(csv_file, start: int, end: int) -> int:
+        """Посчитать кол-во кавычек в байтах файла с позиции start до позиции end.
+        Args:
+            csv_file: файл, открытый в бинарном режиме.
+            start (int): начальная позиция.
+            end (int): конечная позиция (не включительно).
+        Returns:
+            int: кол-во кавычек.
+        """
+        csv_file.seek(start)
+        quotes_count = 0
+        while start < end:
+            block = csv_file.read(min(CSV_Chunks.block_size, end - start))
+            if not block:
+                break
+            quotes_count += block.count(b'"')
+            start += len(block)
+        return quotes_count
+
+    @staticmethod
+    def find_record_end(csv_file, position: int, is_in_quotes: bool) -> int:
+        """Найти конец записи: первый перенос строки после позиции position, который не внутри кавычек.
+        Args:
+            csv_file: файл, открытый в бинарном режиме.
+            position (int): позиция, с которой начинается поиск.
+            is_in_quotes (bool): находится ли позиция position внутри поля в кавычках.
+        Returns:
+            int: позиция начала следующей записи (или размер файла).
+        """
+        csv_file.seek(position)
+        block = csv_file.read(CSV_Chunks.block_size)
+        while block:
+            start = 0
+            new_line = block.find(b"\n")
+            while new_line != -1:
+                is_in_quotes ^= block.count(b'"', start, new_line) % 2 == 1
+                if not is_in_quotes:
+                    return position + new_line + 1
+                start = new_line + 1
+                new_line = block.find(b"\n", start)
+            is_in_quotes ^= block.count(b'"', start) % 2 == 1
+            position += len(block)
+            block = csv_file.read(CSV_Chunks.block_size)
+        return position
+
+    @staticmethod
+    def guess_quote_state(csv_file, position: int):
+        """Определить по байтам после позиции, находится ли она внутри поля в кавычках (не считая кавычки с начала файла).
+        В корректном csv группа кавычек после байта, который не разделитель, стоит внутри поля в кавычках,
+        а после группы кавычек, за которой идет не разделитель, начинается (или продолжается) поле в кавычках.
+        Состояние на позиции получается из первой такой группы и четности кавычек до нее.
+        Args:
+            csv_file: файл, открытый в бинарном режиме.
+            position (int): позиция в файле.
+        Returns:
+            (int, bool) или None: позиция (сдвинутая за кавычки, если position попала в группу кавычек)
+                и находится ли она внутри кавычек, или None, если в блоке после позиции состояние не определить.
+
+        >>> data = io.BytesIO(b'a,"b\\n,""c"" x"\\nd,e\\n')
+        >>> CSV_Chunks.guess_quote_state(data, 4), CSV_Chunks.guess_quote_state(data, 15)
+        ((4, True), (15, False))
+        >>> CSV_Chunks.guess_quote_state(data, 7), CSV_Chunks.guess_quote_state(data, 14)
+        ((8, True), (14, False))
+        >>> CSV_Chunks.guess_quote_state(io.BytesIO(b'a,"b\\n' + b'c\\n' * CSV_Chunks.block_size), 4) is None
+        True
+        """
+        csv_file.seek(position)
+        block = csv_file.read(CSV_Chunks.block_size)
+        start = len(block) - len(block.lstrip(b'"'))
+        quotes_count = 0
+        for quotes in CSV_Chunks.quotes_pattern.finditer(block, start):
+            if block[quotes.start() - 1] not in b",\r\n":
+                return position + start, quotes_count % 2 == 0
+            if quotes.end() < len(block) and block[quotes.end()] not in b",\r\n":
+                return position + start, (quotes_count + quotes.end() - quotes.start()) % 2 == 0
+            quotes_count += quotes.end() - quotes.start()
+        if len(block) < CSV_Chunks.block_size:
+            return position + start, quotes_count % 2 == 1
+        return None
+
+    @staticmethod
+    def get_chunk_ranges(file_name: str, chunks_count: int) -> list:
+        """Поделить файл на куски по границам записей. Граница ищется рядом с каждой целевой позицией
+        (CSV_Chunks.guess_quote_state), кавычки с начала файла считаются, только если состояние не определить.
+        Args:
+            file_name (str): название csv-файла.
+            chunks_count (int): желаемое кол-во кусков.
+        Returns:
+            list: список пар (начало, конец) в байтах, первая строка файла не входит ни в один кусок.
+        """
+        file_size = os.path.getsize(file_name)
+        with open(file_name, "rb") as csv_file:
+            header_end = CSV_Chunks.find_record_end(csv_file, 0, False)
+            boundaries = [header_end]
+            for index in range(1, chunks_count):
+                target = header_end + (file_size - header_end) * index // chunks_count
+                if target <= boundaries[-1]:
+                    continue
+                quote_state = CSV_Chunks.guess_quote_state(csv_file, target)
+                if quote_state is None:
+                    quote_state = target, CSV_Chunks.count_quotes(csv_file, header_end, target) % 2 == 1
+                record_end = CSV_Chunks.find_record_end(csv_file, *quote_state)
+                if boundaries[-1] < record_end < file_size:
+                    boundaries.append(record_end)
+        boundaries.append(file_size)
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+    @staticmethod
+    def read_lines(file_name: str, start: int, end: int):
+        """Читать строки куска файла по одной (не загружая кусок целиком).
+        Args:
+            file_name (str): название csv-файла.
+            start (int): начало куска в байтах (начало записи).
+            end (int): конец куска в байтах (начало следующей записи или размер файла).
+        Returns:
+            generator: строки куска вместе с переносами строк.
+        """
+        with open(file_name, "rb") as csv_file:
+            csv_file.seek(start)
+            position = start
+            while position < end:
+                line = csv_file.readline()
+                if not line:
+                    break
+                position += len(line)
+                yield line.decode("utf-8")
+
+    @staticmethod
+    def get_record_bounds(block: np.ndarray, is_last: bool) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, int):
+        """Найти записи блока. Позиции всех запятых, переносов строк, \\r и кавычек ищутся одним проходом
+        по блоку, затем остаются только байты вне кавычек (перед ними четное кол-во кавычек).
+        Args:
+            block (ndarray): байты блока (начинается с начала записи).
+            is_last (bool): последний ли это блок куска (тогда запись без переноса строки в конце тоже целая).
+        Returns:
+            (ndarray, ndarray, ndarray, ndarray, int): начала записей, концы записей (без переноса строки),
+                запятые и \\r вне кавычек и кол-во байт целых записей (0, если в блоке нет ни одной целой записи).
+
+        >>> block = np.frombuffer(b'a,"b\\n,c"\\nd,e\\nf', np.uint8)
+        >>> starts, ends, commas, carriage_returns, size = CSV_Chunks.get_record_bounds(block, False)
+        >>> starts.tolist(), ends.tolist(), commas.tolist(), size
+        ([0, 9], [8, 12], [1, 10], 13)
+        >>> CSV_Chunks.get_record_bounds(block, True)[1].tolist()
+        [8, 12, 14]
+        """
+        positions = np.flatnonzero((block == 44) | (block == 10) | (block == 13) | (block == 34))
+        kinds = block[positions]
+        is_quote = kinds == 34
+        is_outside = (np.cumsum(is_quote, dtype=np.uint8) & 1 == 0) & ~is_quote
+        positions, kinds = positions[is_outside], kinds[is_outside]
+        new_lines = positions[kinds == 10]
+        size = int(new_lines[-1]) + 1 if len(new_lines) else 0
+        if is_last and size < len(block):
+            new_lines = np.append(new_lines, len(block))
+            size = len(block)
+        elif size < len(block):
+            positions, kinds = positions[positions < size], kinds[positions < size]
+        starts = np.concatenate(([0], new_lines[:-1] + 1)) if len(new_lines) else new_lines
+        return starts, new_lines, positions[kinds == 44], positions[kinds == 13], size
+
+    @staticmethod
+    def read_block(view: memoryview, position: int, block_end: int, is_last: bool, fields_count: int,
+                   field_indexes: list) -> (list, int):
+        """Прочитать записи блока. Границы записей и полей считаются numpy прямо по байтам mmap (без копирования).
+        Из блока убираются байты ненужных столбцов, оставшиеся байты (нужные поля и запятые) декодируются
+        одним вызовом и делятся по запятым. Модулем csv разбирается только отдельная запись, у которой
+        другое кол-во полей, пустая строка, одиночный \\r или поле в кавычках в нужном столбце.
+        Args:
+            view (memoryview): memoryview над байтами файла (mmap).
+            position (int): начало блока (начало записи).
+            block_end (int): конец блока.
+            is_last (bool): последний ли это блок куска.
+            fields_count (int): кол-во столбцов в первой строке файла.
+            field_indexes (list): индексы нужных столбцов.
+        Returns:
+            (iterator, int): записи (списки строк длины fields_count, ненужные столбцы - пустые строки)
+                и кол-во прочитанных байт (0, если в блоке нет ни одной целой записи).
+        """
+        block = np.frombuffer(view, np.uint8, block_end - position, position)
+        starts, ends, commas, carriage_returns, size = CSV_Chunks.get_record_bounds(block, is_last)
+        if not size:
+            return iter(()), 0
+        content_ends = ends - ((ends > starts) & (block[np.maximum(ends - 1, 0)] == 13))
+        first_commas = np.searchsorted(commas, starts)
+        is_good = (np.searchsorted(commas, ends) - first_commas == fields_count - 1) & (content_ends > starts)
+        if len(carriage_returns):
+            records = np.searchsorted(starts, carriage_returns, "right") - 1
+            is_good[records[carriage_returns != content_ends[records]]] = False
+        good_records = np.flatnonzero(is_good)
+        field_commas = commas[first_commas[good_records, None] + np.arange(fields_count - 1)]
+        is_quoted = block[np.minimum(field_commas + 1, size - 1)] == 34
+        is_quoted = np.hstack((block[starts[good_records], None] == 34, is_quoted))[:, field_indexes].any(axis=1)
+        if is_quoted.any():
+            is_good[good_records[is_quoted]] = False
+            good_records, field_commas = good_records[~is_quoted], field_commas[~is_quoted]
+        bad_records = np.flatnonzero(~is_good)
+        record_ends = np.minimum(ends + 1, size)
+        skipped = np.empty((len(starts), fields_count - len(field_indexes) + 1, 2), dtype=commas.dtype)
+        skipped[bad_records] = record_ends[bad_records, None, None]
+        skipped[bad_records, 0, 0] = starts[bad_records]
+        good_starts, content_ends = starts[good_records], content_ends[good_records]
+        for skipped_number, index in enumerate(sorted(set(range(fields_count)) - set(field_indexes))):
+            skipped[good_records, skipped_number, 0] = good_starts if index == 0 else field_commas[:, index - 1] + 1
+            skipped[good_records, skipped_number, 1] = \
+                content_ends if index == fields_count - 1 else field_commas[:, index]
+        skipped[good_records, -1, 0] = np.minimum(content_ends + 1, size)
+        skipped[good_records, -1, 1] = record_ends[good_records]
+        segments = np.diff(skipped.ravel(), prepend=0, append=size)
+        kept = block[:size][np.repeat(np.tile(np.array([True, False]), len(segments) // 2 + 1)[:len(segments)], segments)]
+        skipped_sizes = segments[1::2].reshape(len(starts), -1)
+        skipped_before = np.cumsum(skipped_sizes.sum(axis=1)) - skipped_sizes[:, -1]
+        kept[(content_ends - skipped_before[good_records])[content_ends < size]] = 44
+        fields = str(kept.data, "utf-8").split(",")
+        del fields[len(good_records) * fields_count:]
+        rows = map(list, zip(*[iter(fields)] * fields_count))
+        if not len(bad_records):
+            return rows, size
+        parts, done = [], 0
+        for bad_number, record in enumerate(bad_records.tolist()):
+            parts.append(itertools.islice(rows, record - bad_number - done))
+            done = record - bad_number
+            text = str(view[position + int(starts[record]):position + min(int(ends[record]) + 1, size)], "utf-8")
+            parts.append(csv.reader(io.StringIO(text, newline='')))
+        parts.append(rows)
+        return itertools.chain.from_iterable(parts), size
+
+    @staticmethod
+    def read_rows_mmap(file_name: str, start: int, end: int, fields_count: int, field_indexes: tuple = None):
+        """Читать записи куска файла через mmap блоками примерно по block_size байт. Блок заканчивается
+        на последнем переносе строки вне кавычек, остаток блока читается со следующим блоком
+        (если в блоке нет ни одной целой записи, блок увеличивается).
+        Args:
+            file_name (str): название csv-файла.
+            start (int): начало куска в байтах (начало записи).
+            end (int): конец куска в байтах (начало следующей записи или размер файла).
+            fields_count (int): кол-во столбцов в первой строке файла.
+            field_indexes (tuple): индексы столбцов, которые нужно декодировать (по умолчанию - все).
+        Returns:
+            generator: записи (списки строк), как у csv.reader, но ненужные столбцы - пустые строки.
+        """
+        if start >= end:
+            return
+        field_indexes = sorted(set(range(fields_count) if field_indexes is None else field_indexes))
+        with open(file_name, "rb") as csv_file, mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                position, block_size = start, CSV_Chunks.block_size
+                while position < end:
+                    block_end = min(position + block_size, end)
+                    rows, size = CSV_Chunks.read_block(view, position, block_end, block_end == end, fields_count,
+                                                       field_indexes)
+                    block_size = block_size * 2 if not size else CSV_Chunks.block_size
+                    position += size
+                    yield from rows
+            finally:
+                view.release()
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,4 +1,5 @@
 import csv, re, math
+import argparse
 import datetime, time
 
 import matplotlib.pyplot as plt
@@ -7,17 +8,10 @@ from matplotlib.axes import Axes
 from jinja2 import Template
 import pdfkit
 
-import doctest
-
-
-def do_exit(message):
-    """Преднамеренное завершение программы с выводом сообщения в консоль.
+from ReportPDF_New_MProcess_2 import Timer, InputCorrect, CSV_Start, Chunked_Read
+from ReportBackends import backends, get_chunks_count
 
-    Args:
-        message (str): Текст сообщения.
-    """
-    print(message)
-    exit(0)
+import doctest
 
 
 currency_to_rub = {
@@ -27,148 +21,68 @@ currency_to_rub = {
 }
 
 
-class Salary:
-    """Информация о зарплате вакансии.
-
-    Attributes:
-        dic (dict): Словарь информации о зарплате.
-    """
-    def __init__(self, dic):
-        """Инициализация объекта Salary. Перевод зарплаты в рубли (для последущего сравнения).
-
-        Args:
-            dic (dict): Словарь информации про зарплату.
-        """
-        self.salary_from = math.floor(float(dic["salary_from"]))
-        self.salary_to = math.floor(float(dic["salary_to"]))
-        self.salary_currency = dic["salary_currency"]
-        middle_salary = (self.salary_to + self.salary_from) / 2
-        self.salary_in_rur = currency_to_rub[self.salary_currency] * middle_salary
-
-
-class Vacancy:
-    """Информация о вакансии.
+class Fixed_Rates:
+    """Курсы валют к рублю из currency_to_rub (одинаковые для всех дат) с тем же методом rate,
+    что и у Currency_Values_Reader.
 
     Attributes:
-        dic (dict): Словарь информации о зарплате.
+        version (str): версия таблицы курсов.
     """
-    def __init__(self, dic: dict):
-        """Инициализация объекта Vacancy. Приведение к более удобному виду.
-
-        Args:
-            dic (dict): Словарь информации про зарплату.
-        """
-        self.dic = dic
-        self.salary = Salary(dic)
-        self.dic["year"] = int(Vacancy.get_year_method_3(dic["published_at"]))
-        self.is_needed = dic["is_needed"]
-
-    #@staticmethod
-    #def get_year_method_1(data: str):
-    #    """Функция вычисления года через класс datetime.
-    #
-    #    Args:
-    #        data (str): дата вакансии в виде строки из csv-файла.
-    #
-    #    Returns:
-    #        str: Год - 4 цифры.
-    #    """
-    #    date = datetime.datetime.strptime(data, "%Y-%m-%dT%H:%M:%S%z")
-    #    return date.year
-
-    #@staticmethod
-    #def get_year_method_2(data: str):
-    #    """Функция вычисления года через метод split().
-    #
-    #    Args:
-    #        data (str): дата вакансии в виде строки из csv-файла.
-    #
-    #    Returns:
-    #        str: Год - 4 цифры.
-    #    """
-    #    return data.split("T")[0].split("-")[0]
+    version = "currency_to_rub"
 
-    @staticmethod
-    def get_year_method_3(data: str):
-        """Функция вычисления года через индексы в строке.
+    def rate(self, published_at_prefix: str, code: str):
+        """Получить курс валюты (дата публикации не важна).
 
         Args:
-            data (str): дата вакансии в виде строки из csv-файла.
+            published_at_prefix (str): Дата публикации.
+            code (str): Код валюты.
 
         Returns:
-            str: Год - 4 цифры.
-        """
-        return data[:4]
-
-
-class InputCorrect:
-    """Проверка существования и заполненности файла.
-
-    Attributes:
-        file (str): Название csv-файла с данными.
-        prof (str): Название профессии.
-    """
-    def __init__(self, file: str, prof: str):
-        """Инициализация объекта InputCorrect. Проверка на существование и заполненность файла.
-
-        Args:
-            file (str): Название csv-файла с данными.
-            prof (str): Название профессии.
+            float or None: Курс валюты в рублях или None, если валюты нет в таблице.
+        >>> Fixed_Rates().rate("2022-07-05T18:19:30+0300", "USD"), Fixed_Rates().rate("2022-07", "XYZ")
+        (60.66, None)
         """
-        self.in_file_name = file
-        self.in_prof_name = prof
-        self.check_file()
-
-    def check_file(self):
-        """Проверка на существование и заполненность файла."""
-        with open(self.in_file_name, "r", encoding='utf-8-sig', newline='') as csv_file:
-            file_iter = iter(csv.reader(csv_file))
-            if next(file_iter, "none") == "none": do_exit("Пустой файл")
-            if next(file_iter, "none") == "none": do_exit("Нет данных")
+        return currency_to_rub.get(code)
 
 
 class DataSet:
-    """Считывание файла и формирование удобной структуры данных.
+    """Считывание файла и формирование удобной структуры данных. Записи проверяются и суммируются тем же кодом,
+    что и в ReportPDF_New_MProcess_2 (CSV_Start и Aggregate_State через Chunked_Read), но по курсам currency_to_rub.
+    Файл делится на куски по границам записей, куски обрабатываются последовательно, в потоках или в процессах
+    (backend), суммы кусков складываются в порядке кусков.
 
     Attributes:
         file (str): Название csv-файла с данными.
         prof (str): Название профессии.
+        backend (str): Способ обработки кусков ("serial", "threads" или "processes").
+        workers (int): Кол-во потоков или процессов.
     """
-    def __init__(self, file: str, prof: str):
+    def __init__(self, file: str, prof: str, backend: str = "serial", workers: int = None):
         """Инициализация класса DataSet. Чтение. Фильтрация. Форматирование.
 
         Args:
             file (str): Название csv-файла с данными.
             prof (str): Название профессии.
+            backend (str): Способ обработки кусков ("serial", "threads" или "processes").
+            workers (int): Кол-во потоков или процессов (по умолчанию - кол-во ядер).
         """
-        self.input_values = InputCorrect(file, prof)
-        self.csv_reader()
-        self.csv_filter()
+        self.input_values = InputCorrect(file, prof, Timer("DATASET > Начало чтения файла", 3))
+        self.backend = backend
+        self.workers = workers
+        self.count_sums()
         self.get_years()
         self.count_graph_data()
 
-    def csv_reader(self):
-        """Чтение файла и первичная фильтрация (пропуск невалидных строк)."""
-        with open(self.input_values.in_file_name, "r", encoding='utf-8-sig', newline='') as csv_file:
-            file = csv.reader(csv_file)
-            self.start_line = next(file)
-            self.other_lines = [line for line in file
-                                if not ("" in line) and len(line) == len(self.start_line)]
-
-    def csv_filter(self):
-        """Формирование списка всех вакансий и списка нужных вакансий."""
-        self.filtered_vacancies = []
-        for line in self.other_lines:
-            new_dict_line = dict(zip(self.start_line, line))
-            new_dict_line["is_needed"] = new_dict_line["name"].find(self.input_values.in_prof_name) > -1
-            vac = Vacancy(new_dict_line)
-            self.filtered_vacancies.append(vac)
-        self.needed_vacancies = list(filter(lambda vac: vac.is_needed, self.filtered_vacancies))
+    def count_sums(self):
+        """Подсчет сумм по кускам файла выбранным способом и сложение сумм в порядке кусков."""
+        csv_start = CSV_Start(self.input_values, Fixed_Rates(), count_currencies=False)
+        chunks_count = get_chunks_count(self.backend, self.workers)
+        self.state = Chunked_Read(csv_start, self.workers, chunks_count, self.backend).state
+        self.rejects = csv_start.rejects
 
     def get_years(self):
-        """Отсортированный список всех уникальных лет, которые есть в файле."""
-        self.all_years = list(set([vac.dic["year"] for vac in self.filtered_vacancies]))
-        self.all_years.sort()
+        """Отсортированный список всех уникальных лет, которые есть в файле (без вакансий в редких валютах)."""
+        self.all_years = sorted(self.state.collapse(self.state.year_count).keys())
 
     @staticmethod
     def try_to_add(dic: dict, key, val) -> dict:
@@ -266,28 +180,31 @@ class DataSet:
         return key_to_count
 
     @staticmethod
-    def get_key_to_salary_and_count(years: list, vacs: list, key_str: str, is_area: bool) -> (dict, dict):
+    def get_key_to_salary_and_count(years: list, key_to_sum: dict, key_to_count: dict,
+                                    count_vacs: int, is_area: bool) -> (dict, dict):
         """Универсальная функция для высчитывания средней зарплаты и количества по ключам.
 
         Args:
             years (list): Список лет. год - ключ для добавления в словарь.
-            vacs (list): Список нужных вакансий.
-            key_str (str): Ключ внутри словаря вакансии, по которому идет рассчет.
+            key_to_sum (dict): Словарь ключ/сумма зарплат.
+            key_to_count (dict): Словарь ключ/кол-во вакансий.
+            count_vacs (int): Кол-во всех вакансий, по которым посчитаны суммы.
             is_area (bool): Если да, то отбрасывать маловакантные города.
 
         Returns:
             tuple: Кортеж из двух словарей: ключ/средняя зарплата, ключ/кол-во повторений.
+        >>> DataSet.get_key_to_salary_and_count([2022, 2023], {2022: 300}, {2022: 2}, 2, False)
+        ({2022: 150, 2023: 0}, {2022: 2, 2023: 0})
+        >>> DataSet.get_key_to_salary_and_count([], {"Мск": 990, "Екб": 10}, {"Мск": 99, "Екб": 1}, 100, True)
+        ({'Мск': 10}, {'Мск': 99})
         """
-        key_to_sum = {}
-        key_to_count = {}
-        for vac in vacs:
-            key_to_sum = DataSet.try_to_add(key_to_sum, vac.dic[key_str], vac.salary.salary_in_rur)
-            key_to_count = DataSet.try_to_add(key_to_count, vac.dic[key_str], 1)
+        key_to_sum = dict(key_to_sum)
+        key_to_count = dict(key_to_count)
         if is_area:
-            key_to_count = dict(filter(lambda item: item[1] / len(vacs) > 0.01, key_to_count.items()))
+            key_to_count = dict(filter(lambda item: item[1] / count_vacs > 0.01, key_to_count.items()))
         else:
             key_to_sum = DataSet.update_keys(years, key_to_sum)
-            key_to_count = DataSet.update_keys(years,key_to_count)
+            key_to_count = DataSet.update_keys(years, key_to_count)
         key_to_middle_salary = DataSet.get_middle_salary(key_to_count, key_to_sum)
         return key_to_middle_salary, key_to_count
 
@@ -318,14 +235,17 @@ class DataSet:
         return dict(list(sorted(key_to_salary.items(), key=lambda item: item[1], reverse=True))[:10])
 
     def count_graph_data(self):
-        """Считает данные для графиков и таблиц."""
-        count_vacs = len(self.filtered_vacancies)
-        self.year_to_salary, self.year_to_count = \
-            self.get_key_to_salary_and_count(self.all_years, self.filtered_vacancies, "year", False)
-        self.year_to_salary_needed, self.year_to_count_needed = \
-            self.get_key_to_salary_and_count(self.all_years, self.needed_vacancies, "year", False)
-        self.area_to_salary, self.area_to_count = \
-            self.get_key_to_salary_and_count(self.all_years, self.filtered_vacancies, "area_name", True)
+        """Считает данные для графиков и таблиц по суммам частых валют."""
+        state = self.state
+        area_to_count = state.collapse(state.area_count)
+        count_vacs = sum(area_to_count.values())
+        self.year_to_salary, self.year_to_count = self.get_key_to_salary_and_count(
+            self.all_years, state.collapse(state.year_sum), state.collapse(state.year_count), count_vacs, False)
+        self.year_to_salary_needed, self.year_to_count_needed = self.get_key_to_salary_and_count(
+            self.all_years, state.collapse(state.year_sum_needed), state.collapse(state.year_count_needed),
+            count_vacs, False)
+        self.area_to_salary, self.area_to_count = self.get_key_to_salary_and_count(
+            self.all_years, state.collapse(state.area_sum), area_to_count, count_vacs, True)
         self.area_to_salary = self.get_sorted_dict(self.area_to_salary)
         self.area_to_piece = {key: round(val / count_vacs, 4) for key, val in self.area_to_count.items()}
         self.area_to_piece = self.get_sorted_dict(self.area_to_piece)
@@ -489,7 +409,7 @@ class Report:
         html = open("html_template.html").read()
         template = Template(html)
         keys_to_values = {
-            "prof_name": "Аналитика по зарплатам и городам для профессии " + self.data.input_values.in_prof_name,
+            "prof_name": "Аналитика по зарплатам и городам для профессии " + self.data.input_values.prof,
             "image_name": "C:/Users/Shira/PycharmProjects/pythonProject_4/pythonProject_6_3/" + image_name,
             "year_head": "Статистика по годам",
             "city_head": "Статистика по городам",
@@ -504,18 +424,41 @@ class Report:
         pdfkit.from_string(pdf_template, file_name, configuration=config, options={"enable-local-file-access": True})
 
 
-def create_pdf():
-    """Функция создания pdf-файла-отчета."""
+def create_pdf(pdf_name: str = "report.pdf", backend: str = "serial", workers: int = None):
+    """Функция создания pdf-файла-отчета.
+
+    Args:
+        pdf_name (str): Название pdf-файла.
+        backend (str): Способ обработки файла ("serial", "threads" или "processes").
+        workers (int): Кол-во потоков или процессов (по умолчанию - кол-во ядер).
+    """
     file_name = input("Введите название файла: ")
     prof = input("Введите название профессии: ")
     start_time = time.time()
-    print("start!")
-    report_data = Report(DataSet(file_name, prof))
+    print("start! backend: " + backend)
+    report_data = Report(DataSet(file_name, prof, backend, workers))
     print("data done: " + str(time.time() - start_time))
-    report_data.generate_pdf("report.pdf")
+    report_data.generate_pdf(pdf_name)
     print("pdf done: " + str(time.time() - start_time))
 
 
+def parse_args(default_backend: str = "serial"):
+    """Разбор аргументов командной строки.
+
+    Args:
+        default_backend (str): Способ обработки, если он не указан.
+
+    Returns:
+        Namespace: backend и workers.
+    """
+    parser = argparse.ArgumentParser(description="PDF-отчет по вакансиям")
+    parser.add_argument("--backend", choices=backends, default=default_backend,
+                        help="способ обработки файла: последовательно, в потоках или в процессах")
+    parser.add_argument("--workers", type=int, default=None, help="кол-во потоков или процессов")
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
     #doctest.testmod()
-    create_pdf()
+    args = parse_args()
+    create_pdf(backend=args.backend, workers=args.workers)
@@ -0,0 +1,655 @@
+from unittest import TestCase
+import tempfile, pickle, subprocess, sys, io, contextlib, sqlite3
+from ReportPDF_New_MProcess_2 import *
+from VacancyCache import String_Table, Vacancy_Cache
+from ReportBackends import Serial_Executor, create_executor
+from SQLReport import SQLReport, CacheReport
+
+
+def get_state_with_vacancies(vacancies: list, currency_count: int = 51) -> Aggregate_State:
+    state = Aggregate_State("Программист")
+    for cur, year, area, name, salary in vacancies:
+        state.add_vacancy(cur, year, area, name, salary)
+    for cur in set(vac[0] for vac in vacancies):
+        state.currency_count[cur] = currency_count
+    return state
+
+
+class AggregateStateUnitTests(TestCase):
+    def test_get_year_data_with_one_year(self):
+        state = get_state_with_vacancies([("RUR", 2022, "Мск", "Программист", 100.0),
+                                          ("RUR", 2022, "Мск", "Бухгалтер", 51.0)])
+        self.assertEqual(state.get_year_data(), [(2022, 2, 75, 1, 100)])
+
+    def test_get_year_data_without_needed_vacancies(self):
+        state = get_state_with_vacancies([("RUR", 2021, "Мск", "Бухгалтер", 10.0)])
+        self.assertEqual(state.get_year_data(), [(2021, 1, 10, 0, 0)])
+
+    def test_get_year_data_uses_rounded_salary(self):
+        state = get_state_with_vacancies([("RUR", 2022, "Мск", "Бухгалтер", 9.96)])
+        self.assertEqual(state.get_year_data(), [(2022, 1, 10, 0, 0)])
+
+    def test_get_year_data_skips_rare_currency(self):
+        state = get_state_with_vacancies([("RUR", 2022, "Мск", "Бухгалтер", 10.0),
+                                          ("USD", 2022, "Мск", "Бухгалтер", 1000.0)])
+        state.currency_count["USD"] = 50
+        self.assertEqual(state.get_year_data(), [(2022, 1, 10, 0, 0)])
+
+    def test_get_area_data_with_two_areas(self):
+        state = get_state_with_vacancies([("RUR", 2022, "Мск", "Бухгалтер", 10.0),
+                                          ("RUR", 2022, "Екб", "Бухгалтер", 30.0),
+                                          ("RUR", 2022, "Екб", "Бухгалтер", 10.0)])
+        self.assertEqual(state.get_area_data(), ({"Екб": 20, "Мск": 10}, {"Екб": 0.6667, "Мск": 0.3333}))
+
+    def test_merge_is_equal_to_one_state(self):
+        vacancies = [("RUR", 2021, "Мск", "Программист", 10.0), ("RUR", 2022, "Екб", "Бухгалтер", 30.0),
+                     ("RUR", 2022, "Мск", "Программист", 20.0)]
+        first_state = get_state_with_vacancies(vacancies[:1])
+        first_state.merge(get_state_with_vacancies(vacancies[1:], 0))
+        full_state = get_state_with_vacancies(vacancies)
+        self.assertEqual(first_state.get_year_data(), full_state.get_year_data())
+        self.assertEqual(first_state.get_area_data(), full_state.get_area_data())
+
+    def test_state_to_dict_and_back(self):
+        state = get_state_with_vacancies([("RUR", 2022, "Мск", "Программист", 100.0)])
+        self.assertEqual(Aggregate_State.from_dict(json.loads(json.dumps(state.to_dict()))).to_dict(),
+                         state.to_dict())
+
+
+def count_rows_in_process(timer: Timer, rows: int) -> None:
+    with timer.process_span("worker", rows=rows):
+        with timer.span("inner"):
+            timer.count("rows_read", rows)
+
+
+class TimerUnitTests(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir)
+
+    def test_nested_spans_in_threads_have_own_stacks(self):
+        timer = Timer("TEST", 3)
+        with timer.span("outer"):
+            thread = threading.Thread(target=count_rows_in_process, args=(timer, 3))
+            thread.start()
+            thread.join()
+        spans = {event["name"]: event["args"] for event in timer.events if event["ph"] == "X"}
+        self.assertEqual(spans["worker"]["parent"], None)
+        self.assertEqual(spans["inner"]["parent"], "worker")
+        self.assertEqual(spans["outer"]["depth"], 0)
+        self.assertEqual(timer.counters, {"rows_read": 3})
+
+    def test_count_from_threads(self):
+        timer = Timer("TEST", 3)
+        threads = [threading.Thread(target=lambda: [timer.count("rows_read") for _ in range(10000)])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(timer.counters, {"rows_read": 80000})
+        pickle.loads(pickle.dumps(timer)).count("rows_read")
+
+    def test_export_merges_child_processes(self):
+        timer = Timer("TEST", 3, self.profile_dir)
+        with timer.span("main"):
+            procs = [mp.Process(target=count_rows_in_process, args=(timer, rows)) for rows in [5, 7]]
+            for proc in procs:
+                proc.start()
+            for proc in procs:
+                proc.join()
+        timer.count("rows_read", 1)
+        trace_path = f"{self.profile_dir}/trace.json"
+        report = timer.export(f"{self.profile_dir}/stats.json", trace_path)
+        self.assertEqual(report["counters"], {"rows_read": 13})
+        self.assertEqual(len(report["processes"]), 3)
+        self.assertEqual(sorted(span["rows"] for span in report["spans"] if span["name"] == "worker"), [5, 7])
+        self.assertTrue(os.path.exists(report["profile"]))
+        self.assertTrue(report["top_functions"])
+        with open(trace_path, "r", encoding="utf-8") as trace_file:
+            phases = [event["ph"] for event in json.load(trace_file)["traceEvents"]]
+        self.assertEqual(phases.count("M"), 3)
+        self.assertEqual(phases.count("X"), 5)
+
+
+class ChunkedReadUnitTests(TestCase):
+    def setUp(self):
+        self.file_name = "chunked_read_test.csv"
+        with open(self.file_name, "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["name", "key_skills"])
+            for index in range(100):
+                writer.writerow([f"Программист {index}", "Python\nSQL\n\"Git\""])
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def get_chunks_lines(self, chunks_count: int) -> list:
+        with open(self.file_name, "rb") as csv_file:
+            data = csv_file.read()
+        lines = []
+        for start, end in CSV_Chunks.get_chunk_ranges(self.file_name, chunks_count):
+            lines += list(csv.reader(io.StringIO(data[start:end].decode("utf-8"), newline='')))
+        return lines
+
+    def test_get_chunk_ranges_with_one_chunk(self):
+        self.assertEqual(len(CSV_Chunks.get_chunk_ranges(self.file_name, 1)), 1)
+
+    def test_get_chunk_ranges_keeps_multiline_records(self):
+        with open(self.file_name, "r", encoding="utf-8-sig", newline='') as csv_file:
+            all_lines = list(csv.reader(csv_file))[1:]
+        for chunks_count in [2, 7, 300]:
+            self.assertEqual(self.get_chunks_lines(chunks_count), all_lines)
+
+    def test_get_chunk_ranges_finds_quote_state_near_target(self):
+        with open(self.file_name, "a", encoding="utf-8", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            for index in range(100):
+                writer.writerow([f"Аналитик, \"BI\" {index}", "Excel,\n\"\"\n,SQL"])
+        with open(self.file_name, "r", encoding="utf-8-sig", newline='') as csv_file:
+            all_lines = list(csv.reader(csv_file))[1:]
+        for block_size in [4, 64, 1 << 20]:
+            CSV_Chunks.block_size = block_size
+            chunks_lines = self.get_chunks_lines(53)
+            CSV_Chunks.block_size = 1 << 20
+            self.assertEqual(chunks_lines, all_lines)
+
+    def test_read_lines_gives_same_records_as_chunk_bytes(self):
+        for start, end in CSV_Chunks.get_chunk_ranges(self.file_name, 7):
+            with open(self.file_name, "rb") as csv_file:
+                csv_file.seek(start)
+                data = csv_file.read(end - start).decode("utf-8")
+            self.assertEqual(list(csv.reader(CSV_Chunks.read_lines(self.file_name, start, end))),
+                             list(csv.reader(io.StringIO(data, newline=''))))
+
+    def test_read_rows_mmap_gives_same_records_as_csv_reader(self):
+        with open(self.file_name, "a", encoding="utf-8", newline='') as csv_file:
+            csv_file.write("\r\nБухгалтер,Excel\r\n\nВодитель,\"А,\"\"Б\"\"\r\nВ\"\nДизайнер,Figma")
+        with open(self.file_name, "r", encoding="utf-8-sig", newline='') as csv_file:
+            all_lines = list(csv.reader(csv_file))[1:]
+        for block_size in [16, 100, 1 << 20]:
+            CSV_Chunks.block_size = block_size
+            mmap_lines = []
+            for start, end in CSV_Chunks.get_chunk_ranges(self.file_name, 7):
+                mmap_lines += list(CSV_Chunks.read_rows_mmap(self.file_name, start, end, 2))
+            CSV_Chunks.block_size = 1 << 20
+            self.assertEqual(mmap_lines, all_lines)
+
+    def test_read_rows_mmap_splits_blocks_without_quotes(self):
+        with open(self.file_name, "w", encoding="utf-8", newline='') as csv_file:
+            csv_file.write("name,salary\r\nПрограммист,100\r\nБухгалтер,\r\n,\r\n")
+        start, end = CSV_Chunks.get_chunk_ranges(self.file_name, 1)[0]
+        self.assertEqual(list(CSV_Chunks.read_rows_mmap(self.file_name, start, end, 2)),
+                         [["Программист", "100"], ["Бухгалтер", ""], ["", ""]])
+
+    def test_read_rows_mmap_decodes_only_needed_fields(self):
+        with open(self.file_name, "w", encoding="utf-8", newline='') as csv_file:
+            csv_file.write('name,key_skills,salary\r\nПрограммист,"Python\r\nSQL",100\r\n"Аналитик, BI",Excel,200\r\n'
+                           'Водитель,,300,лишнее\r\nБухгалтер,"1С,Excel",\r\n')
+        start, end = CSV_Chunks.get_chunk_ranges(self.file_name, 1)[0]
+        self.assertEqual(list(CSV_Chunks.read_rows_mmap(self.file_name, start, end, 3, (0, 2))),
+                         [["Программист", "", "100"], ["Аналитик, BI", "Excel", "200"],
+                          ["Водитель", "", "300", "лишнее"], ["Бухгалтер", "", ""]])
+
+
+class ReportBackendsUnitTests(TestCase):
+    def test_serial_executor_keeps_exception(self):
+        future = Serial_Executor().submit(int, "x")
+        self.assertIsInstance(future.exception(), ValueError)
+
+    def test_create_executor_with_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_executor("gpu")
+
+
+class VacancyCacheUnitTests(TestCase):
+    def test_get_first_seen_codes(self):
+        order, codes = Vacancy_Cache.get_first_seen_codes(np.array([5, 2, 5, 7, 2]))
+        self.assertEqual(order.tolist(), [5, 2, 7])
+        self.assertEqual(codes.tolist(), [0, 1, 0, 2, 1])
+
+    def test_reading_cache_does_not_import_report_engine(self):
+        code = "import sys, SQLReport; print('ReportPDF_New_MProcess_2' in sys.modules, 'matplotlib' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ["False", "False"])
+
+    def test_cache_report_matches_sql_report(self):
+        data_dir = tempfile.mkdtemp()
+        try:
+            with open(data_dir + "/currency.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(Currency_Values_Reader.start_basic_row)
+                writer.writerows([[year, month, "RUR", 1] for year in [2021, 2022] for month in range(1, 13)])
+            with open(data_dir + "/vacancies.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(CSV_Start.needed_fields)
+                writer.writerows([[["Программист", "Аналитик", "Программист Python"][index % 3], str(1000 * index), "",
+                                   "RUR", (["Мск"] * 4 + ["Екб"] * 3 + ["Казань"] * 2 + ["Пермь"])[index % 10],
+                                   f"{2021 + index % 2}-0{1 + index % 9}-01T10:00:00+0300"] for index in range(1, 121)])
+            csv_start = CSV_Start(InputCorrect(data_dir + "/vacancies.csv", "Программист", Timer("TEST", 3)),
+                                  Currency_Values_Reader(data_dir, "currency.csv"), False)
+            Cache_Read(csv_start, data_dir + "/cache")
+            cache = Vacancy_Cache.load(data_dir + "/cache", data_dir + "/vacancies.csv", None)
+            connect = sqlite3.connect(data_dir + "/vacancies.db")
+            connect.execute("CREATE TABLE vacancies (name TEXT, salary REAL, area_name TEXT, published_at TEXT)")
+            connect.executemany("INSERT INTO vacancies VALUES (?, ?, ?, ?)",
+                                [(cache.names[name_id], float(salary), cache.areas[area_id], str(published_at))
+                                 for name_id, salary, area_id, published_at
+                                 in zip(cache.name_id, cache.salary, cache.area_id, cache.published_at)])
+            connect.commit()
+            connect.close()
+            outputs = []
+            for create_report in [lambda: SQLReport(data_dir + "/vacancies.db", "Программист"),
+                                  lambda: CacheReport(cache, "Программист")]:
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    create_report()
+                outputs.append(output.getvalue())
+            self.assertEqual(outputs[1], outputs[0])
+            self.assertIn("Программист", str(cache.names))
+        finally:
+            shutil.rmtree(data_dir)
+
+
+class StringTableUnitTests(TestCase):
+    def test_add_keeps_first_seen_order(self):
+        table = String_Table()
+        for value in ["Мск", "Екб", "Мск", "Казань", "Екб"]:
+            table.add(value)
+        self.assertEqual(table.get_values(), ["Мск", "Екб", "Казань"])
+        self.assertEqual(table.get_ids().tolist(), [0, 1, 0, 2, 1])
+
+    def test_map_values(self):
+        table = String_Table()
+        for value in ["10", "x", "10"]:
+            table.add(value)
+        self.assertEqual(table.map_values(np.array([10.0, np.nan]))[[0, 2]].tolist(), [10.0, 10.0])
+
+    def test_empty_table(self):
+        self.assertEqual(String_Table().get_ids().tolist(), [])
+
+
+class VectorizedReadUnitTests(TestCase):
+    def test_round_like_python_with_halves(self):
+        values = np.array([0.15, 0.25, 2.675, 1.05, 100.45, 3.0])
+        self.assertEqual(Vectorized_Read.round_like_python(values, 1).tolist(), [round(float(val), 1) for val in values])
+
+    def test_get_codes_with_missing_value(self):
+        self.assertEqual(Vectorized_Read.get_codes(["USD", "RUR", "XXX", "USD"], {"RUR": 0, "USD": 1}).tolist(),
+                         [1, 0, -1, 1])
+
+
+class CurrencyValuesReaderUnitTests(TestCase):
+    def setUp(self):
+        with open("currency_reader_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(Currency_Values_Reader.start_basic_row)
+            writer.writerows([[2003, 1, "RUR", 1], [2003, 1, "USD", 31.5], [2004, 12, "USD", 28.0]])
+        self.values_reader = Currency_Values_Reader(".", "currency_reader_test.csv")
+
+    def tearDown(self):
+        os.remove("currency_reader_test.csv")
+
+    def test_rate_with_existing_month(self):
+        self.assertEqual(self.values_reader.rate("2003-01-15T10:00:00+0300", "USD"), 31.5)
+
+    def test_rate_with_last_month(self):
+        self.assertEqual(self.values_reader.rate("2004-12", "USD"), 28.0)
+
+    def test_rate_with_missing_rate(self):
+        self.assertIsNone(self.values_reader.rate("2004-12", "RUR"))
+
+    def test_rate_with_missing_month_and_currency(self):
+        self.assertIsNone(self.values_reader.rate("2010-01", "USD"))
+        self.assertIsNone(self.values_reader.rate("2003-01", "EUR"))
+
+    def test_rate_matrix_shape(self):
+        self.assertEqual(self.values_reader.rate_matrix.shape, (24, 2))
+
+
+class DailyCurrencyValuesReaderUnitTests(TestCase):
+    def setUp(self):
+        with open("currency_daily_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(Currency_Values_Reader.start_daily_row)
+            writer.writerows([[2022, 1, 10, "USD", 75.0], [2022, 1, 10, "BYR", 0.003], [2022, 1, 14, "USD", 76.0],
+                              [2022, 1, 14, "BYR", 0.004], [2022, 2, 1, "USD", 77.0], [2022, 2, 1, "RUR", 1]])
+        self.values_reader = Currency_Values_Reader(".", "currency_daily_test.csv")
+
+    def tearDown(self):
+        os.remove("currency_daily_test.csv")
+
+    def test_rate_on_known_day(self):
+        self.assertEqual(self.values_reader.rate("2022-01-14T10:00:00+0300", "USD"), 76.0)
+
+    def test_rate_as_of_last_known_day(self):
+        self.assertEqual(self.values_reader.rate("2022-01-13T23:59:00+0300", "USD"), 75.0)
+        self.assertEqual(self.values_reader.rate("2022-01-31", "USD"), 76.0)
+        self.assertEqual(self.values_reader.rate("2022-12-31", "USD"), 77.0)
+
+    def test_rate_before_first_day_and_of_dropped_currency(self):
+        self.assertIsNone(self.values_reader.rate("2022-01-09", "USD"))
+        self.assertEqual(self.values_reader.rate("2022-01-20", "BYR"), 0.004)
+        self.assertIsNone(self.values_reader.rate("2022-02-01", "BYR"))
+        self.assertIsNone(self.values_reader.rate("2022-01-31", "RUR"))
+
+    def test_rate_matrix_shape(self):
+        self.assertEqual(self.values_reader.date_length, 10)
+        self.assertEqual(self.values_reader.rate_matrix.shape, (365, 3))
+
+    def test_modes_use_daily_rates(self):
+        with open("daily_read_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_Start.needed_fields)
+            writer.writerows([["Программист", "1000", "", "USD", "Мск", f"2022-01-{day:02}T1{hour}:00:00+0300"]
+                              for day in range(8, 32) for hour in range(3)])
+        input_values = InputCorrect("daily_read_test.csv", "Программист", Timer("TEST", 3))
+        readers = [Single_Pass_Read(CSV_Start(input_values, self.values_reader, count_currencies=False)),
+                   Vectorized_Read(CSV_Start(input_values, self.values_reader, count_currencies=False))]
+        os.remove("daily_read_test.csv")
+        for reader in readers:
+            self.assertEqual(reader.get_year_data(), [(2022, 66, 75818, 66, 75818)])
+            self.assertEqual(reader.csv_start.rejects.counts, {"no_rate": 6})
+
+
+class IncrementalReadUnitTests(TestCase):
+    def setUp(self):
+        with open("incremental_currency_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(Currency_Values_Reader.start_basic_row)
+            writer.writerows([[year, month, "RUR", 1] for year in [2021, 2022] for month in range(1, 13)])
+        self.values_reader = Currency_Values_Reader(".", "incremental_currency_test.csv")
+        self.file_name = "incremental_read_test.csv"
+        self.lines = [["Программист" if index % 3 == 0 else "Бухгалтер", "Python\nSQL", str(1000 + index * 7), "",
+                       "RUR", "Мск" if index % 2 == 0 else "Екб", f"202{1 + index % 2}-0{1 + index % 9}-01T10:00:00+0300"]
+                      for index in range(120)]
+        self.write_lines(self.lines[:80], "w")
+
+    def tearDown(self):
+        for file_name in [self.file_name, "incremental_currency_test.csv"]:
+            os.remove(file_name)
+        shutil.rmtree("incremental_state_test")
+
+    def write_lines(self, lines: list, mode: str, tail: str = "") -> None:
+        with open(self.file_name, mode, encoding="utf-8" if mode == "a" else "utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            if mode == "w":
+                writer.writerow(["name", "key_skills", "salary_from", "salary_to", "salary_currency", "area_name",
+                                 "published_at"])
+            writer.writerows(lines)
+            csv_file.write(tail)
+
+    def get_reader(self, reader_class, *args):
+        input_values = InputCorrect(self.file_name, "Программист", Timer("TEST", 3))
+        return reader_class(CSV_Start(input_values, self.values_reader, count_currencies=False), *args)
+
+    def test_tail_read_is_equal_to_full_read(self):
+        self.get_reader(Incremental_Read, "incremental_state_test")
+        self.write_lines(self.lines[80:], "a")
+        incremental_reader = self.get_reader(Incremental_Read, "incremental_state_test")
+        full_reader = self.get_reader(Single_Pass_Read)
+        self.assertEqual(incremental_reader.get_year_data(), full_reader.get_year_data())
+        self.assertEqual(incremental_reader.area_to_middle_salary, full_reader.area_to_middle_salary)
+        self.assertEqual(incremental_reader.watermark, os.path.getsize(self.file_name))
+
+    def test_unfinished_record_is_left_for_next_run(self):
+        self.get_reader(Incremental_Read, "incremental_state_test")
+        self.write_lines([], "a", "Программист,\"Python")
+        watermark = os.path.getsize(self.file_name) - len("Программист,\"Python".encode("utf-8"))
+        self.assertEqual(self.get_reader(Incremental_Read, "incremental_state_test").watermark, watermark)
+
+    def test_changed_file_is_read_again(self):
+        self.get_reader(Incremental_Read, "incremental_state_test")
+        self.write_lines(self.lines[40:], "w")
+        self.assertEqual(self.get_reader(Incremental_Read, "incremental_state_test").get_year_data(),
+                         self.get_reader(Single_Pass_Read).get_year_data())
+
+
+class RejectStatsUnitTests(TestCase):
+    def setUp(self):
+        with open("rejects_currency_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(Currency_Values_Reader.start_basic_row)
+            writer.writerows([[2022, month, cur, 1] for month in range(1, 13) for cur in ["RUR", "USD"]])
+        self.values_reader = Currency_Values_Reader(".", "rejects_currency_test.csv")
+        lines = [["Программист", str(1000 + index), "", "RUR", "Мск", "2022-01-01T10:00:00+0300"]
+                 for index in range(60)]
+        lines += [["Программист", "100", "", "USD", "Мск", "2022-02-01T10:00:00+0300"]] * 2
+        lines += [["Программист", "", "", "RUR", "Мск", "2022-03-01T10:00:00+0300"]] * 5
+        lines += [["Программист", "100", "200", "EUR", "Мск", "2022-04-01T10:00:00+0300"]] * 4
+        lines += [["Программист", "100"]]
+        with open("rejects_read_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["name", "salary_from", "salary_to", "salary_currency", "area_name", "published_at"])
+            writer.writerows(lines)
+        self.counts = {"bad_length": 1, "bad_salary": 5, "no_rate": 4, "rare_currency": 2}
+
+    def tearDown(self):
+        os.remove("rejects_read_test.csv")
+        os.remove("rejects_currency_test.csv")
+
+    def get_csv_start(self, count_currencies: bool = False) -> CSV_Start:
+        input_values = InputCorrect("rejects_read_test.csv", "Программист", Timer("TEST", 3))
+        return CSV_Start(input_values, self.values_reader, count_currencies)
+
+    def test_check_line_reasons(self):
+        csv_start = self.get_csv_start()
+        self.assertEqual(csv_start.check_line(["Программист", "100"]), ("bad_length", None))
+        self.assertEqual(csv_start.check_line(["a", "x", "", "RUR", "Мск", "2022-01"]), ("bad_salary", None))
+        self.assertEqual(csv_start.check_line(["a", "", "1", "RUR", "Мск", "2023-01"]), ("no_rate", None))
+        self.assertIsNone(csv_start.check_line(["a", "", "1", "USD", "Мск", "2022-01"])[0])
+
+    def test_modes_give_same_rejects(self):
+        for reader in [Single_Pass_Read(self.get_csv_start()), Vectorized_Read(self.get_csv_start()),
+                       Chunked_Read(self.get_csv_start(), 2, backend="threads"), Mmap_Read(self.get_csv_start())]:
+            self.assertEqual(reader.csv_start.rejects.counts, self.counts)
+            self.assertEqual(reader.csv_start.rejects.checked_count, 72)
+
+    def test_modes_reject_not_finite_salaries(self):
+        with open("rejects_read_test.csv", "a", encoding="utf-8", newline='') as csv_file:
+            csv.writer(csv_file).writerows([["Программист", salary, "", "RUR", "Мск", "2022-05-01T10:00:00+0300"]
+                                            for salary in ["inf", "-inf", "nan", "1e400", "Infinity"]])
+        readers = [Single_Pass_Read(self.get_csv_start()), Vectorized_Read(self.get_csv_start())]
+        for reader in readers:
+            self.assertEqual(reader.csv_start.rejects.counts, {**self.counts, "bad_salary": 10})
+        self.assertEqual(readers[1].get_year_data(), readers[0].get_year_data())
+
+    def test_cache_keeps_rejects(self):
+        cache_root = tempfile.mkdtemp()
+        try:
+            readers = [Cache_Read(self.get_csv_start(), cache_root) for _ in range(2)]
+            self.assertEqual(readers[0].csv_start.rejects.counts, self.counts)
+            self.assertEqual(readers[1].csv_start.rejects.to_dict(), readers[0].csv_start.rejects.to_dict())
+            self.assertEqual(readers[1].get_year_data(), Single_Pass_Read(self.get_csv_start()).get_year_data())
+            self.assertEqual(readers[1].cache.names, ["Программист"])
+        finally:
+            shutil.rmtree(cache_root)
+
+    def test_area_reader_counts_all_rows_once(self):
+        counters = []
+        for reader_class in [Single_Pass_Read, Area_Proc_Read]:
+            csv_start = self.get_csv_start(count_currencies=reader_class == Area_Proc_Read)
+            reader_class(csv_start)
+            counters.append(csv_start.input_values.timer.counters)
+        self.assertEqual(counters[1]["rows_read"], counters[0]["rows_read"])
+        self.assertEqual(counters[1]["rows_read"], 72)
+        self.assertEqual(counters[1]["rows_rejected"], sum(self.counts.values()))
+
+    def test_is_valid_vac_counts_rare_currency_with_samples(self):
+        csv_start = self.get_csv_start(count_currencies=True)
+        with open("rejects_read_test.csv", "r", encoding="utf-8-sig") as csv_file:
+            lines = list(csv.reader(csv_file))[1:]
+        self.assertEqual(sum(csv_start.is_valid_vac(line) for line in lines), 60)
+        self.assertEqual(csv_start.rejects.counts, self.counts)
+        self.assertEqual(len(csv_start.rejects.samples["bad_salary"]), Reject_Stats.samples_count)
+        self.assertEqual(csv_start.rejects.samples["rare_currency"][0][3], "USD")
+
+    def test_get_record(self):
+        csv_start = self.get_csv_start()
+        line = ["Программист", "100.7", "", "USD", "Мск", "2022-02-01T10:00:00+0300"]
+        record = csv_start.get_record(line)
+        self.assertEqual(record.get_list(), ["Программист", 100.0, "Мск", "2022-02-01T10:00:00+0300"])
+        self.assertEqual((record.currency, record.year), ("USD", 2022))
+        self.assertIsNone(csv_start.get_record(["Программист", "", "", "USD", "Мск", "2022-02"]))
+
+    def test_record_salary_with_one_or_two_edges(self):
+        csv_start = self.get_csv_start()
+        for salary_from, salary_to, salary in [("1000.9", "2000.5", 1500), ("", "3000", 3000), ("1500", "", 1500),
+                                               ("x", "700.7", 700)]:
+            line = ["Программист", salary_from, salary_to, "USD", "Мск", "2022-02-01T10:00:00+0300"]
+            self.assertEqual(csv_start.get_record(line).salary, salary)
+
+    def test_merge_keeps_samples_count(self):
+        rejects, other = Reject_Stats(), Reject_Stats()
+        for index in range(2):
+            rejects.add("no_rate", [str(index)])
+            other.add("no_rate", [str(index + 2)])
+        rejects.merge(other)
+        self.assertEqual(rejects.counts, {"no_rate": 4})
+        self.assertEqual(rejects.samples["no_rate"], [["0"], ["1"], ["2"]])
+
+    def test_state_keeps_rejects(self):
+        state = Aggregate_State("Программист")
+        state.rejects.add("bad_length", ["a"])
+        state.rejects.checked_count = 3
+        restored = Aggregate_State.from_dict(json.loads(json.dumps(state.to_dict())))
+        self.assertEqual(restored.rejects.to_dict(), state.rejects.to_dict())
+
+
+class CSVStartUnitTests(TestCase):
+    def test_parse_float_is_equal_to_float(self):
+        for value in ["50000", "0", " 12 ", "-3.5", "+7", "1.", ".5", "1e3", "2.5E-1", "٣٤"]:
+            self.assertEqual(CSV_Start.parse_float(value), float(value))
+
+    def test_parse_float_with_not_numbers(self):
+        for value in ["", " ", ".", "-", "e5", "1,5", "1.2.3", "10 000", "по договоренности", "nan", "inf", "1_000",
+                      "1e400"]:
+            self.assertIsNone(CSV_Start.parse_float(value))
+
+class BatchReadUnitTests(TestCase):
+    def setUp(self):
+        with open("batch_currency_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(Currency_Values_Reader.start_basic_row)
+            writer.writerows([[2022, month, "RUR", 1] for month in range(1, 13)])
+        self.values_reader = Currency_Values_Reader(".", "batch_currency_test.csv")
+        names = ["Программист", "Программист Python", "Аналитик", "Бухгалтер"]
+        with open("batch_read_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["name", "salary_from", "salary_to", "salary_currency", "area_name", "published_at"])
+            writer.writerows([[names[index % 4], 1000 + index, "", "RUR", "Мск" if index % 3 else "Екб",
+                               f"2022-0{1 + index % 9}-01T10:00:00+0300"] for index in range(100)])
+
+    def tearDown(self):
+        os.remove("batch_read_test.csv")
+        os.remove("batch_currency_test.csv")
+
+    def get_csv_start(self, prof: str) -> CSV_Start:
+        input_values = InputCorrect("batch_read_test.csv", prof, Timer("TEST", 3))
+        return CSV_Start(input_values, self.values_reader, count_currencies=False)
+
+    def test_batch_is_equal_to_single_reads(self):
+        profs = ["Программист", "Python", "Аналитик", "Водитель"]
+        batch_reader = Batch_Read(self.get_csv_start(profs[0]), profs)
+        for prof in profs:
+            prof_reader = batch_reader.get_prof_reader(prof)
+            single_reader = Single_Pass_Read(self.get_csv_start(prof))
+            self.assertEqual(prof_reader.get_year_data(), single_reader.get_year_data())
+            self.assertEqual(prof_reader.area_to_piece, single_reader.area_to_piece)
+            self.assertEqual(prof_reader.csv_start.input_values.prof, prof)
+
+    def test_prof_readers_do_not_share_area_dicts(self):
+        batch_reader = Batch_Read(self.get_csv_start("Программист"), ["Программист", "Аналитик"])
+        batch_reader.get_prof_reader("Программист").area_to_piece["Другие"] = 0
+        self.assertNotIn("Другие", batch_reader.get_prof_reader("Аналитик").area_to_piece)
+
+    def test_batch_uses_synonyms_of_input_matcher(self):
+        csv_start = self.get_csv_start("Программист")
+        csv_start.input_values.matcher = Prof_Matcher("Программист", {"Аналитик": ["Бухгалтер"]})
+        batch_reader = Batch_Read(csv_start, ["Аналитик"])
+        self.assertEqual(batch_reader.matcher.get_stats()["hits"], {"Аналитик": 50})
+
+
+class ProfMatcherUnitTests(TestCase):
+    def test_get_names_mask_counts_rows(self):
+        matcher = Prof_Matcher("Программист")
+        mask = Vacancy_Cache.get_names_mask(matcher, ["Программист", "Аналитик"], np.array([0, 1, 0, 0]))
+        self.assertEqual(mask.tolist(), [True, False, True, True])
+        self.assertEqual(matcher.get_stats()["hits"], {"Программист": 3})
+        self.assertEqual(matcher.get_stats()["rows"], 4)
+
+    def test_merge_counts(self):
+        matcher, other = Prof_Matcher("Программист"), Prof_Matcher("Программист")
+        matcher.is_match("Программист")
+        other.is_match("Программист 1С")
+        other.is_match("Аналитик")
+        matcher.merge_counts(other)
+        self.assertEqual(matcher.get_stats()["hits"], {"Программист": 2})
+        self.assertEqual(matcher.get_stats()["names"], 3)
+
+    def test_cache_size_is_bounded(self):
+        matcher = Prof_Matcher("Программист", cache_size=3)
+        for index in range(10):
+            self.assertTrue(matcher.is_match(f"Программист {index}"))
+            self.assertLessEqual(len(matcher.name_to_matches), 3)
+        other = Prof_Matcher("Программист", cache_size=3)
+        for name in ["Аналитик", "Бухгалтер", "Программист 1С"]:
+            other.is_match(name)
+        matcher.merge_counts(other)
+        self.assertLessEqual(len(matcher.name_to_matches), 3)
+        self.assertEqual(matcher.get_stats()["hits"], {"Программист": 11})
+
+
+class YearProcReadUnitTests(TestCase):
+    def test_reduce_year_is_equal_to_sequential_sum(self):
+        rand = np.random.default_rng(42)
+        salaries = np.round(rand.uniform(1000, 300000, Year_Proc_Read.reduce_block_size * 2 + 13), 1)
+        needed = rand.random(len(salaries)) < 0.3
+        all_sum, needed_count, needed_sum = Year_Proc_Read.reduce_year(salaries, np.packbits(needed))
+        self.assertEqual(all_sum, sum(salaries.tolist()))
+        self.assertEqual(needed_count, int(needed.sum()))
+        self.assertEqual(needed_sum, sum(salaries[needed].tolist()))
+
+    def test_reduce_year_without_needed(self):
+        salaries = np.array([10.5, 20.1])
+        self.assertEqual(Year_Proc_Read.reduce_year(salaries, np.packbits(np.zeros(2, dtype=bool))), (30.6, 0, 0.0))
+
+    def get_shm_names(self) -> set:
+        return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+    def test_year_proc_releases_blocks(self):
+        with open("year_proc_currency_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(Currency_Values_Reader.start_basic_row)
+            writer.writerows([[year, month, "RUR", 1] for year in [2021, 2022] for month in range(1, 13)])
+        with open("year_proc_read_test.csv", "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["name", "salary_from", "salary_to", "salary_currency", "area_name", "published_at"])
+            writer.writerows([["Программист" if index % 2 else "Бухгалтер", 1000 + index, "", "RUR", "Мск",
+                               f"{2021 + index // 50}-01-01T10:00:00+0300"] for index in range(100)])
+        try:
+            values_reader = Currency_Values_Reader(".", "year_proc_currency_test.csv")
+            shm_names = self.get_shm_names()
+            for backend, spawn_per_year in [(backend, False) for backend in backends] + [("processes", True)]:
+                input_values = InputCorrect("year_proc_read_test.csv", "Программист", Timer("TEST", 3))
+                csv_start = CSV_Start(input_values, values_reader)
+                year_reader = Year_Proc_Read(csv_start, "year_proc_csv_test", 2, queue_size=1,
+                                             spawn_per_year=spawn_per_year, backend=backend)
+                self.assertEqual(year_reader.get_year_data(),
+                                 [(2021, 50, 1024, 25, 1025), (2022, 50, 1074, 25, 1075)])
+            self.assertEqual(self.get_shm_names(), shm_names)
+        finally:
+            os.remove("year_proc_read_test.csv")
+            os.remove("year_proc_currency_test.csv")
+
+    def test_release_blocks(self):
+        shm = Year_Proc_Read.pack_year(array("d", [1.0, 2.0]), bytearray([1, 0]))
+        unlinked = Year_Proc_Read.pack_year(array("d", [3.0]), bytearray([1]))
+        unlinked.close()
+        unlinked.unlink()
+        shared_blocks = {shm.name: shm, unlinked.name: None}
+        Year_Proc_Read.release_blocks(shared_blocks)
+        self.assertEqual(shared_blocks, {})
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shm.name)
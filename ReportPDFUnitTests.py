@@ -1,3 +1,4 @@
+import csv, os, tempfile
 from unittest import TestCase
 from ReportPDF import *
 
@@ -88,6 +89,53 @@ class ReportPDFUnitTests(TestCase):
         self.assertEqual(DataSet.get_sorted_dict({"a": 1, "b": 3, "c": 5, "d": 2, "e": 8, "f": 4, "h": 9, "t": 10, "k": 6, "o": 7, "l": 11}),
                          {'l': 11, 't': 10, 'h': 9, 'e': 8, 'o': 7, 'k': 6, 'c': 5, 'f': 4, 'b': 3, 'd': 2})
 
+    def test_get_key_to_salary_and_count_adds_missing_years(self):
+        self.assertEqual(DataSet.get_key_to_salary_and_count([2022, 2023], {2022: 300}, {2022: 2}, 2, False),
+                         ({2022: 150, 2023: 0}, {2022: 2, 2023: 0}))
+
+    def test_get_key_to_salary_and_count_drops_small_areas(self):
+        self.assertEqual(DataSet.get_key_to_salary_and_count([], {"Мск": 990, "Екб": 10}, {"Мск": 99, "Екб": 1}, 100, True),
+                         ({'Мск': 10}, {'Мск': 99}))
+
+    @staticmethod
+    def write_vacancies(file_name: str):
+        with open(file_name, "w", encoding="utf-8-sig", newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["name", "salary_from", "salary_to", "salary_currency", "area_name", "published_at"])
+            for _ in range(20):
+                writer.writerow(["Программист", "100", "200", "RUR", "Москва", "2021-01-01T10:00:00+0300"])
+                writer.writerow(["Аналитик", "", "200", "RUR", "Москва", "2021-02-01T10:00:00+0300"])
+                writer.writerow(["Аналитик", "50", "50", "RUR", "Казань", "2022-01-01T10:00:00+0300"])
+            writer.writerow(["Аналитик", "1000", "1000", "USD", "Казань", "2022-01-01T10:00:00+0300"])
+            writer.writerow(["Аналитик", "по договоренности", "", "RUR", "Казань", "2022-01-01T10:00:00+0300"])
+
+    def test_data_set_reads_file_lazily(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, "vacancies.csv")
+            self.write_vacancies(file_name)
+            data = DataSet(file_name, "Программист")
+        self.assertFalse(hasattr(data, "other_lines"))
+        self.assertEqual(data.all_years, [2021, 2022])
+        self.assertEqual(data.year_to_salary, {2021: 175, 2022: 50})
+        self.assertEqual(data.year_to_count, {2021: 40, 2022: 20})
+        self.assertEqual(data.year_to_salary_needed, {2021: 150, 2022: 0})
+        self.assertEqual(data.year_to_count_needed, {2021: 20, 2022: 0})
+        self.assertEqual(data.area_to_salary, {'Москва': 175, 'Казань': 50})
+        self.assertEqual(data.area_to_piece, {'Москва': 0.6667, 'Казань': 0.3333})
+        self.assertEqual(data.rejects.counts, {"bad_salary": 1, "rare_currency": 1})
+
+    def test_data_set_backends_give_same_result(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, "vacancies.csv")
+            self.write_vacancies(file_name)
+            results = []
+            for backend in ["serial", "threads", "processes"]:
+                data = DataSet(file_name, "Программист", backend, 2)
+                results.append((data.year_to_salary, data.year_to_count_needed, data.area_to_piece,
+                                data.input_values.matcher.get_stats()))
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[2], results[0])
+
     def test_get_percents_from_zero(self):
         self.assertEqual(Report.get_percents(0), "0%")
 
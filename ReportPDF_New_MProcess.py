@@ -11,6 +11,8 @@ import concurrent.futures as pool
 from jinja2 import Template
 import pdfkit
 
+from ProfMatcher import Prof_Matcher
+
 
 class Timer:
     """Класс для отслеживания скорости выполнения кода.
@@ -79,17 +81,20 @@ class InputCorrect:
     Attributes:
         file (str): Название csv-файла с данными.
         prof (str): Название профессии.
+        matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
     """
-    def __init__(self, file: str, prof: str, timer: Timer):
+    def __init__(self, file: str, prof: str, timer: Timer, matcher: Prof_Matcher = None):
         """Инициализация объекта InputCorrect. Проверка на существование и заполненность файла.
         Args:
             file (str): Название csv-файла с данными.
             prof (str): Название профессии.
             timer (Timer): Таймер для отслеживания времени.
+            matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
         """
         self.file_name = file
         self.prof = prof
         self.timer = timer
+        self.matcher = matcher or Prof_Matcher(prof)
         self.check_file()
 
     def check_file(self) -> None:
@@ -143,6 +148,8 @@ class Salary:
     Attributes:
         dic (dict): Словарь информации о зарплате.
     """
+    __slots__ = ("salary_from", "salary_to", "salary_currency", "salary_in_rur")
+
     def __init__(self, dic):
         """Инициализация объекта Salary. Перевод зарплаты в рубли (для последущего сравнения).
 
@@ -162,6 +169,8 @@ class Vacancy:
     Attributes:
         dic (dict): Словарь информации о зарплате.
     """
+    __slots__ = ("dic", "salary", "is_needed")
+
     def __init__(self, dic: dict):
         """Инициализация объекта Vacancy. Приведение к более удобному виду.
 
@@ -181,28 +190,27 @@ class Year_Proc_Read:
         self.year_process, self.year_queue = self.create_year_proc()
 
     def read_one_csv_file(self, year_queue: mp.Queue, file_name: str) -> None:
-        """Читает один csv-файл и делает данные о нём.
+        """Читает один csv-файл и делает данные о нём. Суммы считаются по ходу чтения,
+        поэтому вакансии года не хранятся в памяти.
         Args:
             queue (Queue): очередь для добавления данных.
             file_name (str): файл, из которого идет чтение.
         """
+        all_count, all_sum, needed_count, needed_sum = 0, 0, 0, 0
         with open(f"{self.csv_dir}/{file_name}", "r", encoding='utf-8-sig', newline='') as csv_file:
             file = csv.reader(csv_file)
-            filtered_vacs = []
             year = int(file_name.replace("file_", "").replace(".csv", ""))
             for line in file:
                 new_dict_line = dict(zip(self.csv_start.start_line, line))
-                new_dict_line["is_needed"] = (new_dict_line["name"]).find(self.csv_start.input_values.prof) > -1
-                vac = Vacancy(new_dict_line)
-                filtered_vacs.append(vac)
+                salary = Salary(new_dict_line).salary_in_rur
+                all_count += 1
+                all_sum += salary
+                if self.csv_start.input_values.matcher.is_match(new_dict_line["name"]):
+                    needed_count += 1
+                    needed_sum += salary
             csv_file.close()
-            all_count = len(filtered_vacs)
-            all_sum = sum([vac.salary.salary_in_rur for vac in filtered_vacs])
-            all_middle = math.floor(all_sum / all_count)
-            needed_vacs = list(filter(lambda vacancy: vacancy.is_needed, filtered_vacs))
-            needed_count = len(needed_vacs)
-            needed_sum = sum([vac.salary.salary_in_rur for vac in needed_vacs])
-            needed_middle = math.floor(needed_sum / needed_count)
+        all_middle = math.floor(all_sum / all_count)
+        needed_middle = math.floor(needed_sum / needed_count) if needed_count > 0 else 0
         year_queue.put((year, all_count, all_middle, needed_count, needed_middle))
 
     def save_file(self, current_year: str, lines: list) -> str:
@@ -1,32 +1,101 @@
-import csv, math
-import shutil, os
-import time
+import csv, math, re
+import shutil, os, copy
+import time, datetime
+import hashlib, json
+import argparse, contextlib, threading
+import concurrent.futures as futures
+import cProfile, pstats
+from array import array
+
+import numpy as np
+import pandas as pd
 
 import matplotlib.pyplot as plt
 from matplotlib.axes import Axes
 
 import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
 
 from jinja2 import Template
 import pdfkit
 
+from ProfMatcher import Prof_Matcher
+from ReportBackends import CSV_Chunks, backends, create_executor
+from VacancyCache import String_Table, Vacancy_Cache
+
 class Timer:
-    """Класс для отслеживания скорости выполнения кода.
+    """Класс для отслеживания скорости выполнения кода: сообщения со временем от начала отсчета,
+    вложенные именованные участки (span), счетчики и cProfile каждого процесса.
+    Дочерние процессы сохраняют свои участки, счетчики и профиль в profile_dir, а export собирает их
+    вместе с данными главного процесса (без profile_dir данные дочерних процессов не сохраняются).
     Attributes:
         message (str): сообщение, обозначающие начало отсчета.
         count_chars_after_point (int): кол-во знаков после запятой.
+        profile_dir (str): директория для профилей и участков процессов (None - без cProfile).
     """
-    def __init__(self, message: str, count_chars_after_point: int):
+    def __init__(self, message: str, count_chars_after_point: int, profile_dir: str = None):
         """Инициализация класса. Начало отсчета и вывод надписи.
         Args:
             message (str): сообщение, обозначающие начало отсчета.
             count_chars_after_point (int): кол-во знаков после запятой.
+            profile_dir (str): директория для профилей и участков процессов (None - без cProfile).
         """
         self.start_time = time.time()
         self.last_time = self.start_time
+        self.trace_start = self.start_time
         self.chars_count = count_chars_after_point
+        self.profile_dir = profile_dir
+        self.main_pid = os.getpid()
+        self.events = []
+        self.counters = {}
+        self.counters_lock = threading.Lock()
+        self.details = {}
+        self.stacks = {}
+        self.profiler = None
+        if profile_dir is not None:
+            Timer.make_profile_dir(profile_dir)
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
         print(message)
 
+    def __getstate__(self) -> dict:
+        """Состояние для передачи в другой процесс (профилировщик и блокировка не передаются).
+        Returns:
+            dict: атрибуты таймера.
+        """
+        state = self.__dict__.copy()
+        state["profiler"] = None
+        state["counters_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Восстановление таймера в другом процессе (со своей блокировкой счетчиков).
+        Args:
+            state (dict): атрибуты таймера.
+        """
+        self.__dict__.update(state)
+        self.counters_lock = threading.Lock()
+
+    @staticmethod
+    def make_profile_dir(profile_dir: str) -> None:
+        """Создать директорию профилей и удалить из нее файлы прошлого запуска.
+        Args:
+            profile_dir (str): директория профилей.
+        """
+        os.makedirs(profile_dir, exist_ok=True)
+        for file_name in os.listdir(profile_dir):
+            if file_name.startswith("proc_"):
+                os.remove(f"{profile_dir}/{file_name}")
+
+    def get_ts(self, moment: float) -> int:
+        """Перевести время в микросекунды от начала работы таймера (формат Chrome trace).
+        Args:
+            moment (float): время (time.time()).
+        Returns:
+            int: микросекунды.
+        """
+        return round((moment - self.trace_start) * 1e6)
+
     def write_time(self, message: str) -> None:
         """Метод для выведения текущего времени от начала отсчета.
         Args:
@@ -36,6 +105,8 @@ class Timer:
         current_time = round(new_time-self.start_time, self.chars_count)
         time_between = round(new_time-self.last_time, self.chars_count)
         self.last_time = new_time
+        self.events.append({"name": message, "ph": "i", "s": "t", "ts": self.get_ts(new_time),
+                            "pid": os.getpid(), "tid": threading.get_ident()})
         print(f"{message}: {current_time} (+{time_between})")
 
     def reload_start_time(self) -> None:
@@ -43,6 +114,173 @@ class Timer:
         self.start_time = time.time()
         print("Таймер был сброшен!")
 
+    def count(self, name: str, value: int = 1) -> None:
+        """Увеличить счетчик (под блокировкой, так как счетчики увеличивают и потоки-обработчики).
+        Args:
+            name (str): название счетчика (например, rows_read, rows_rejected, bytes_read).
+            value (int): на сколько увеличить.
+
+        >>> timer = Timer("TEST", 3)
+        TEST
+        >>> timer.count("rows_read", 10); timer.count("rows_read", 5); timer.counters
+        {'rows_read': 15}
+        """
+        with self.counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_details(self, name: str, value) -> None:
+        """Добавить в сводку главного процесса дополнительные данные (например, статистику отбраковки).
+        Args:
+            name (str): ключ в сводке.
+            value: данные, пригодные для json.
+        """
+        self.details[name] = value
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        """Именованный участок кода. Участки могут быть вложенными (отдельно в каждом потоке и процессе).
+        Args:
+            name (str): название участка.
+            **args: дополнительные данные участка (например, год).
+
+        >>> timer = Timer("TEST", 3)
+        TEST
+        >>> with timer.span("read"):
+        ...     with timer.span("year", year=2022):
+        ...         pass
+        >>> [(event["name"], event["args"]["depth"], event["args"]["parent"]) for event in timer.events]
+        [('year', 1, 'read'), ('read', 0, None)]
+        """
+        stack = self.stacks.setdefault((os.getpid(), threading.get_ident()), [])
+        stack.append(name)
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            stack.pop()
+            self.events.append({"name": name, "ph": "X", "ts": self.get_ts(start), "dur": self.get_ts(end) -
+                                self.get_ts(start), "pid": os.getpid(), "tid": threading.get_ident(),
+                                "args": {**args, "depth": len(stack), "parent": stack[-1] if stack else None}})
+
+    @contextlib.contextmanager
+    def process_span(self, name: str, **args):
+        """Участок - работа дочернего процесса (или одной задачи в процессе пула). В дочернем процессе
+        участки и счетчики, полученные от родителя, сбрасываются, запускается свой cProfile, а в конце
+        все сохраняется в profile_dir. В главном процессе (например, в потоке) - обычный span.
+        Args:
+            name (str): название участка.
+            **args: дополнительные данные участка.
+        """
+        if os.getpid() == self.main_pid:
+            with self.span(name, **args):
+                yield
+            return
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.events, self.counters = [], {}
+        self.profiler = cProfile.Profile() if self.profile_dir is not None else None
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            with self.span(name, **args):
+                yield
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            self.dump_process()
+
+    def dump_process(self) -> None:
+        """Сохранить участки, счетчики и профиль текущего процесса в profile_dir."""
+        if self.profile_dir is None:
+            return
+        path = f"{self.profile_dir}/proc_{os.getpid()}_{time.perf_counter_ns()}"
+        if self.profiler is not None:
+            self.profiler.dump_stats(path + ".prof")
+        with open(path + ".json", "w", encoding="utf-8") as json_file:
+            json.dump({"pid": os.getpid(), "name": mp.current_process().name,
+                       "events": self.events, "counters": self.counters}, json_file, ensure_ascii=False)
+        self.events, self.counters = [], {}
+
+    @staticmethod
+    def get_top_functions(stats: pstats.Stats, count: int) -> list:
+        """Получить самые долгие функции (по времени вместе с вложенными вызовами).
+        Args:
+            stats (pstats.Stats): профиль.
+            count (int): кол-во функций.
+        Returns:
+            list: словари (функция, кол-во вызовов, собственное время, общее время).
+        """
+        rows = [{"function": f"{file_name}:{line}({function})", "calls": calls,
+                 "own_s": round(own_time, 4), "cumulative_s": round(cumulative_time, 4)}
+                for (file_name, line, function), (_, calls, own_time, cumulative_time, _) in stats.stats.items()]
+        return sorted(rows, key=lambda row: row["cumulative_s"], reverse=True)[:count]
+
+    def collect(self) -> (list, dict, dict, list):
+        """Собрать участки, счетчики и имена процессов главного и всех дочерних процессов.
+        Returns:
+            (list, dict, dict, list): события, счетчики, pid к имени процесса, файлы профилей дочерних процессов.
+        """
+        events, counters = list(self.events), dict(self.counters)
+        processes = {self.main_pid: mp.current_process().name}
+        profiles = []
+        if self.profile_dir is not None:
+            for file_name in sorted(os.listdir(self.profile_dir)):
+                path = f"{self.profile_dir}/{file_name}"
+                if file_name.startswith("proc_") and file_name.endswith(".json"):
+                    with open(path, "r", encoding="utf-8") as json_file:
+                        process_data = json.load(json_file)
+                    events += process_data["events"]
+                    processes[process_data["pid"]] = process_data["name"]
+                    for name, value in process_data["counters"].items():
+                        counters = CSV_Start.try_to_add(counters, name, value)
+                elif file_name.startswith("proc_") and file_name.endswith(".prof"):
+                    profiles.append(path)
+        return sorted(events, key=lambda event: event["ts"]), counters, processes, profiles
+
+    def export(self, json_path: str = None, trace_path: str = None, top_count: int = 20) -> dict:
+        """Собрать данные всех процессов: участки, счетчики и общий профиль (профили процессов
+        складываются через pstats в profile_dir/merged.prof). Сохранить сводку в json
+        и события в формате Chrome trace (chrome://tracing, ui.perfetto.dev).
+        Args:
+            json_path (str): файл для сводки (None - не сохранять).
+            trace_path (str): файл для Chrome trace (None - не сохранять).
+            top_count (int): кол-во самых долгих функций в сводке.
+        Returns:
+            dict: сводка (общее время, счетчики, участки, процессы, самые долгие функции, данные add_details).
+        """
+        events, counters, processes, profiles = self.collect()
+        report = {
+            "total_s": round(time.time() - self.trace_start, self.chars_count),
+            "counters": counters,
+            "processes": {str(pid): name for pid, name in processes.items()},
+            "spans": [{"name": event["name"], "pid": event["pid"], "start_s": event["ts"] / 1e6,
+                       "duration_s": event["dur"] / 1e6, **event["args"]} for event in events if event["ph"] == "X"],
+            **self.details
+        }
+        if self.profiler is not None:
+            self.profiler.disable()
+            main_profile = f"{self.profile_dir}/main.prof"
+            self.profiler.dump_stats(main_profile)
+            stats = pstats.Stats(main_profile)
+            for profile in profiles:
+                stats.add(profile)
+            stats.dump_stats(f"{self.profile_dir}/merged.prof")
+            report["profile"] = f"{self.profile_dir}/merged.prof"
+            report["top_functions"] = Timer.get_top_functions(stats, top_count)
+        if json_path is not None:
+            with open(json_path, "w", encoding="utf-8") as json_file:
+                json.dump(report, json_file, ensure_ascii=False, indent=2)
+        if trace_path is not None:
+            metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+                        for pid, name in processes.items()]
+            counter_event = {"name": "counters", "ph": "C", "ts": self.get_ts(time.time()),
+                             "pid": self.main_pid, "args": counters}
+            with open(trace_path, "w", encoding="utf-8") as trace_file:
+                json.dump({"traceEvents": metadata + events + [counter_event], "displayTimeUnit": "ms"},
+                          trace_file, ensure_ascii=False)
+        return report
+
 
 class Error:
     """Класс вывода ошибки и завершения программы с сообщением.
@@ -77,17 +315,20 @@ class InputCorrect:
         file (str): Название csv-файла с данными.
         prof (str): Название профессии.
         timer (Timer): Таймер для отслеживания времени.
+        matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
     """
-    def __init__(self, file: str, prof: str, timer: Timer):
+    def __init__(self, file: str, prof: str, timer: Timer, matcher: Prof_Matcher = None):
         """Инициализация объекта InputCorrect. Проверка на существование и заполненность файла.
         Args:
             file (str): Название csv-файла с данными.
             prof (str): Название профессии.
             timer (Timer): Таймер для отслеживания времени.
+            matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
         """
         self.file_name = file
         self.prof = prof
         self.timer = timer
+        self.matcher = matcher or Prof_Matcher(prof)
         self.check_file()
 
     def check_file(self) -> None:
@@ -101,85 +342,171 @@ class InputCorrect:
 
 
 class Currency_Values_Reader:
-    """Класс для чтения csv-валют и формирования словря с валютами.
+    """Класс для чтения csv-валют и формирования плотной таблицы курсов (месяц или день x валюта).
     Attributes:
         csv_dir (str): директория с csv-файлом.
         csv_name (str): имя самого csv-файла.
+        date_length (int): длина ключа даты в published_at (7 - "ГГГГ-ММ", 10 - "ГГГГ-ММ-ДД" для курсов по дням).
     """
     start_basic_row = ["Year", "Month", "CharCode", "InRuR"]
+    start_daily_row = ["Year", "Month", "Day", "CharCode", "InRuR"]
 
     def __init__(self, csv_dir: str, csv_name: str):
-        """Инициализация. создание нового параллельного процесса, который .
+        """Инициализация. Чтение csv-файла с валютами и построение таблицы курсов.
+        Строка таблицы - номер месяца (или дня, если в файле есть столбец Day) от 1 января первого года в файле,
+        столбец - номер валюты.
         Args:
             csv_dir (str): директория с csv-файлом.
             csv_name (str): имя самого csv-файла.
         """
-        self.currency_dict = self.count_currency_dict(csv_dir, csv_name)
+        self.cur_to_index, self.date_to_index, self.rate_table = self.count_rate_table(csv_dir, csv_name)
+        self.date_length = len(next(iter(self.date_to_index)))
+        self.cur_count = len(self.cur_to_index)
+        self.rate_matrix = np.frombuffer(self.rate_table, dtype=np.float64)\
+            .reshape(len(self.date_to_index), self.cur_count)
+        self.version = self.get_version(csv_dir, csv_name)
 
-    def add_if_key_not_exist(self, cur_value_dict: dict, key: any) -> dict:
-        """Функция проверки наличия ключа в словаре, и если его нет, то добавить.
+    @staticmethod
+    def get_version(csv_dir: str, csv_name: str) -> str:
+        """Получить версию таблицы валют (хэш содержимого файла).
         Args:
-            cur_value_dict (dict): словарь, в котором проверяем наличие ключа key.
-            key (any): сам ключ.
+            csv_dir (str): директория с csv-файлом.
+            csv_name (str): имя самого csv-файла.
+        Returns:
+            str: sha1 от содержимого файла.
         """
-        try:
-            test = cur_value_dict[key]
-        except:
-            cur_value_dict[key] = {}
-        return cur_value_dict
+        with open(file=csv_dir+"/"+csv_name, mode="rb") as csv_file:
+            return hashlib.sha1(csv_file.read()).hexdigest()
 
-    def count_currency_dict(self, csv_dir: str, csv_name: str) -> dict:
+    def count_rate_table(self, csv_dir: str, csv_name: str) -> (dict, dict, array):
         """Функция для обработки csv-файла с данными по валютам.
         Args:
-            csv_queue (Queue): очередь, в которую будут положены данные.
-            full_csv_name (str): полный путь до файла.
+            csv_dir (str): директория с csv-файлом.
+            csv_name (str): имя самого csv-файла.
         Returns:
-            dict: словарь с нужными данными по валютам.
+            (dict, dict, array): код валюты/номер столбца, "ГГГГ-ММ" (или "ГГГГ-ММ-ДД")/номер строки,
+                таблица курсов построчно (nan - курса нет).
         """
-        exit_cur_dict = {}
+        rows = []
+        cur_to_index = {}
         with open(file=csv_dir+"/"+csv_name, mode="r", encoding="utf-8-sig") as csv_file:
             file = csv.reader(csv_file)
             start_line = next(file)
+            is_daily = "Day" in start_line
+            fields = Currency_Values_Reader.start_daily_row if is_daily else Currency_Values_Reader.start_basic_row
+            index_of = {field: start_line.index(field) for field in fields}
+            day_index = index_of["Day"] if is_daily else None
             for line in file:
-                line_dict = dict(zip(start_line, line))
-                exit_cur_dict = self.add_if_key_not_exist(exit_cur_dict, line_dict["Year"])
-                exit_cur_dict[line_dict["Year"]] = \
-                    self.add_if_key_not_exist(exit_cur_dict[line_dict["Year"]], line_dict["Month"])
-                exit_cur_dict[line_dict["Year"]][line_dict["Month"]] = \
-                    self.add_if_key_not_exist(exit_cur_dict[line_dict["Year"]][line_dict["Month"]], line_dict["CharCode"])
-                exit_cur_dict[line_dict["Year"]][line_dict["Month"]][line_dict["CharCode"]] = float(line_dict["InRuR"])
-        return exit_cur_dict
+                cur_to_index.setdefault(line[index_of["CharCode"]], len(cur_to_index))
+                rows.append((int(line[index_of["Year"]]), int(line[index_of["Month"]]),
+                             1 if day_index is None else int(line[day_index]),
+                             line[index_of["CharCode"]], float(line[index_of["InRuR"]])))
+        start_year = min(row[0] for row in rows)
+        end_year = max(row[0] for row in rows)
+        if is_daily:
+            first_day = datetime.date(start_year, 1, 1).toordinal()
+            date_to_index = {datetime.date.fromordinal(day).isoformat(): day - first_day
+                             for day in range(first_day, datetime.date(end_year, 12, 31).toordinal() + 1)}
+        else:
+            date_to_index = {f"{year}-{month:02}": (year - start_year) * 12 + month - 1
+                             for year in range(start_year, end_year + 1) for month in range(1, 13)}
+        rate_table = array("d", [math.nan]) * (len(date_to_index) * len(cur_to_index))
+        for year, month, day, cur, rate in rows:
+            row = datetime.date(year, month, day).toordinal() - first_day if is_daily \
+                else (year - start_year) * 12 + month - 1
+            rate_table[row * len(cur_to_index) + cur_to_index[cur]] = rate
+        if is_daily:
+            Currency_Values_Reader.fill_as_of(
+                np.frombuffer(rate_table, dtype=np.float64).reshape(len(date_to_index), len(cur_to_index)))
+        return cur_to_index, date_to_index, rate_table
+
+    @staticmethod
+    def fill_as_of(rate_matrix: np.ndarray) -> None:
+        """Заполнить пропуски курсов по дням последним известным курсом валюты (as-of).
+        Курс выбывшей валюты (ее нет в последнем дне с курсами) продлевается только до первого дня с курсами,
+        в котором ее уже нет.
+        Args:
+            rate_matrix (np.ndarray): таблица курсов (день x валюта), заполняется на месте.
+
+        >>> matrix = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [3.0, np.nan], [np.nan, np.nan]])
+        >>> Currency_Values_Reader.fill_as_of(matrix)
+        >>> matrix.tolist()
+        [[nan, 1.0], [2.0, nan], [2.0, nan], [3.0, nan], [3.0, nan]]
+        """
+        is_known = ~np.isnan(rate_matrix)
+        known_rows = np.flatnonzero(is_known.any(axis=1))
+        if len(known_rows) == 0:
+            return
+        rows = np.arange(len(rate_matrix))
+        for column in range(rate_matrix.shape[1]):
+            last_known = np.maximum.accumulate(np.where(is_known[:, column], rows, -1))
+            filled = rate_matrix[last_known, column]
+            filled[last_known < 0] = np.nan
+            if not is_known[known_rows[-1], column]:
+                filled[known_rows[known_rows > last_known[-1]][0]:] = np.nan
+            rate_matrix[:, column] = filled
+
+    def rate(self, published_at_prefix: str, code: str) -> (float or None):
+        """Получить курс валюты в месяц (или день) публикации.
+        Args:
+            published_at_prefix (str): дата публикации (важны только первые date_length символов).
+            code (str): код валюты.
+        Returns:
+            float or None: курс валюты в рублях или None, если курса нет.
+        """
+        row = self.date_to_index.get(published_at_prefix[:self.date_length])
+        column = self.cur_to_index.get(code)
+        if row is None or column is None:
+            return None
+        value = self.rate_table[row * self.cur_count + column]
+        return None if value != value else value
 
 
 class CSV_Start:
     """Класс для формирования первичных данных файла и валют.
     Attributes:
         input_values (InputCorrect): информация о файле и профессии.
+        rejects (Reject_Stats): причины отбраковки записей при проверке.
+        field_indexes (tuple): индексы столбцов needed_fields (по порядку).
     """
     needed_fields = ["name", "salary_from", "salary_to", "salary_currency", "area_name", "published_at"]
     new_needed_fields = ["name", "salary", "area_name", "published_at"]
+    numeric_pattern = re.compile(r"\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*")
 
-    def __init__(self, input_values: InputCorrect, values_reader: Currency_Values_Reader):
+    def __init__(self, input_values: InputCorrect, values_reader: Currency_Values_Reader,
+                 count_currencies: bool = True):
         """Инициализация класса CSV_Start. Вычисление индексов и стартовой строки.
         Args:
             input_values (InputCorrect): информация о файле и профессии.
+            values_reader (Currency_Values_Reader): данные по валютам.
+            count_currencies (bool): считать ли валюты отдельным проходом по файлу.
         """
         self.input_values = input_values
         self.values_reader = values_reader
+        self.rejects = Reject_Stats()
         with open(self.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
             file = csv.reader(csv_file)
             self.start_line = next(file)
             self.index_of = {}
             self.get_indexes()
+            self.field_indexes = tuple(self.index_of[field] for field in CSV_Start.needed_fields)
             self.check_other_fields()
             self.start_line_len = len(self.start_line)
             self.all_currencies = {}
-            for line in file:
-                if len(line) == self.start_line_len:
-                    self.all_currencies = \
-                        CSV_Start.try_to_add(self.all_currencies, line[self.index_of["salary_currency"]], 1)
+            if count_currencies:
+                self.count_currencies(file)
         csv_file.close()
 
+    def count_currencies(self, file) -> None:
+        """Посчитать количество записей нужной длины для каждой валюты.
+        Args:
+            file: итератор по оставшимся строкам csv-файла.
+        """
+        for line in file:
+            if len(line) == self.start_line_len:
+                self.all_currencies = \
+                    CSV_Start.try_to_add(self.all_currencies, line[self.index_of["salary_currency"]], 1)
+
     def get_indexes(self) -> None:
         """Получить индексы для нужных столбцов."""
         for field in CSV_Start.needed_fields:
@@ -212,20 +539,78 @@ class CSV_Start:
             dic[key] = val
         return dic
 
-    def is_numeric_value(self, line: list, index: str) -> bool:
-        """Проерка, можно ли кастовать значение по индексу index к типу float.
+    @staticmethod
+    def parse_float(value: str) -> (float or None):
+        """Разобрать число без исключений: целые числа проверяются через str.isdecimal, остальные -
+        заранее скомпилированным регулярным выражением (десятичная запись как у float, но без nan, inf и '_').
+        Числа, которые не помещаются в float (например, 1e400), тоже не подходят.
         Args:
-            line (list): вакансия-строка.
-            index (str): значение позиции.
+            value (str): строка.
         Returns:
-            bool: молжно ли кастовать к числу.
+            float or None: конечное число или None, если строка - не число.
+
+        >>> CSV_Start.parse_float("50000"), CSV_Start.parse_float(" 1.5e3 "), CSV_Start.parse_float("")
+        (50000.0, 1500.0, None)
+        >>> CSV_Start.parse_float("по договоренности"), CSV_Start.parse_float("nan"), CSV_Start.parse_float("1e400")
+        (None, None, None)
         """
-        sal_norm = True
-        try:
-            float(line[self.index_of[index]])
-        except:
-            sal_norm = False
-        return sal_norm
+        if value.isdecimal():
+            number = float(value)
+        elif CSV_Start.numeric_pattern.fullmatch(value):
+            number = float(value)
+        else:
+            return None
+        return number if math.isfinite(number) else None
+
+    def check_line(self, line: list) -> (str or None, any):
+        """Проверить список без учета частоты валюты и сразу собрать запись: числа разбираются
+        и курс ищется один раз, без исключений.
+        Args:
+            line (list): список значений для проверки.
+        Returns:
+            (str or None, Vacancy_Record or None): причина отбраковки из Reject_Stats.reasons
+                (None, если список подходит) и запись (None, если не подходит).
+        """
+        if len(line) != self.start_line_len:
+            return "bad_length", None
+        name_index, from_index, to_index, cur_index, area_index, date_index = self.field_indexes
+        salary_from = CSV_Start.parse_float(line[from_index])
+        salary_to = CSV_Start.parse_float(line[to_index])
+        if salary_from is None and salary_to is None:
+            return "bad_salary", None
+        rate = self.values_reader.rate(line[date_index], line[cur_index])
+        if rate is None:
+            return "no_rate", None
+        return None, Vacancy_Record(line[name_index], rate * Vacancy_Record.get_middle_salary(salary_from, salary_to),
+                                    line[area_index], line[date_index], line[cur_index])
+
+    def get_record(self, line: list, rejects=None) -> (any):
+        """Проверить список без учета частоты валюты и получить запись. Причина отбраковки записывается в rejects.
+        Args:
+            line (list): список значений для проверки.
+            rejects (Reject_Stats): куда записать причину (по умолчанию - в rejects этого объекта).
+        Returns:
+            Vacancy_Record or None: запись или None, если список не подходит под вакансию.
+        """
+        rejects = rejects or self.rejects
+        rejects.checked_count += 1
+        reason, record = self.check_line(line)
+        if reason is not None:
+            rejects.add(reason, line)
+        return record
+
+    def get_vac_record(self, line: list) -> (any):
+        """Проверить список с учетом частоты валюты и получить запись.
+        Args:
+            line (list): список значений для проверки.
+        Returns:
+            Vacancy_Record or None: запись или None, если список не подходит под вакансию.
+        """
+        record = self.get_record(line)
+        if record is None or self.all_currencies.get(record.currency, 0) > Aggregate_State.min_currency_count:
+            return record
+        self.rejects.add("rare_currency", line)
+        return None
 
     def is_valid_vac(self, line: list) -> bool:
         """Проверка списка на соответствие требованиям вакансии.
@@ -234,146 +619,1196 @@ class CSV_Start:
         Returns:
             bool: подходит ли список под вакансию или нет.
         """
-        is_normal_len = len(line) == self.start_line_len
-        line_cur = line[self.index_of["salary_currency"]]
-        is_valid_cur = self.all_currencies[line_cur] > 50
-        sal_from = self.is_numeric_value(line, "salary_from")
-        sal_to = self.is_numeric_value(line, "salary_to")
-        year = line[self.index_of["published_at"]][:4]
-        month = str(int(line[self.index_of["published_at"]][5:7]))
-        try:
-            test = self.values_reader.currency_dict[year][month][line_cur]
-        except:
-            return False
-        return is_normal_len and is_valid_cur and (sal_from or sal_to)
+        return self.get_vac_record(line) is not None
+
+
+class Reject_Stats:
+    """Статистика отбраковки записей: кол-во записей по каждой причине и первые записи-примеры.
+    Проверки идут по порядку reasons, запись отбрасывается первой непройденной проверкой.
+    Attributes:
+        checked_count (int): кол-во проверенных записей.
+        counts (dict): причина/кол-во отброшенных записей.
+        samples (dict): причина/первые отброшенные записи (не больше samples_count).
+    """
+    reasons = ["bad_length", "bad_salary", "no_rate", "rare_currency"]
+    reason_names = {"bad_length": "Неверное кол-во полей", "bad_salary": "Зарплата - не число",
+                    "no_rate": "Нет курса валюты", "rare_currency": "Редкая валюта (не больше 50 записей)"}
+    samples_count = 3
+
+    def __init__(self):
+        """Инициализация пустой статистики."""
+        self.checked_count = 0
+        self.counts = {}
+        self.samples = {}
+
+    def add(self, reason: str, line: list) -> None:
+        """Учесть отброшенную запись (первые samples_count записей сохраняются как примеры).
+        Args:
+            reason (str): причина отбраковки.
+            line (list): запись.
+        """
+        self.counts = CSV_Start.try_to_add(self.counts, reason, 1)
+        if self.counts[reason] <= Reject_Stats.samples_count:
+            self.samples = CSV_Start.try_to_add(self.samples, reason, [list(line)])
+
+    def add_count(self, reason: str, count: int) -> None:
+        """Учесть сразу несколько отброшенных записей без примеров.
+        Args:
+            reason (str): причина отбраковки.
+            count (int): кол-во записей.
+        """
+        if count > 0:
+            self.counts = CSV_Start.try_to_add(self.counts, reason, count)
+
+    def merge(self, other) -> None:
+        """Добавить статистику другого куска файла или процесса.
+        Args:
+            other (Reject_Stats): другая статистика.
+        """
+        self.checked_count += other.checked_count
+        for reason, count in other.counts.items():
+            self.counts = CSV_Start.try_to_add(self.counts, reason, count)
+        for reason, lines in other.samples.items():
+            free_count = Reject_Stats.samples_count - len(self.samples.get(reason, []))
+            if free_count > 0:
+                self.samples = CSV_Start.try_to_add(self.samples, reason, lines[:free_count])
+
+    def get_rejected_count(self) -> int:
+        """Получить общее кол-во отброшенных записей.
+        Returns:
+            int: кол-во записей.
+        """
+        return sum(self.counts.values())
+
+    def get_stages(self) -> list:
+        """Получить воронку проверок: сколько записей дошло до каждой проверки и сколько на ней отброшено.
+        Returns:
+            list: кортежи (причина, кол-во записей на входе, кол-во отброшенных).
+
+        >>> rejects = Reject_Stats()
+        >>> rejects.checked_count = 10
+        >>> rejects.add("bad_length", ["a"]); rejects.add_count("no_rate", 3)
+        >>> rejects.get_stages()
+        [('bad_length', 10, 1), ('bad_salary', 9, 0), ('no_rate', 9, 3), ('rare_currency', 6, 0)]
+        """
+        stages = []
+        rows_count = self.checked_count
+        for reason in Reject_Stats.reasons:
+            stages.append((reason, rows_count, self.counts.get(reason, 0)))
+            rows_count -= self.counts.get(reason, 0)
+        return stages
+
+    def to_dict(self) -> dict:
+        """Получить статистику в виде, пригодном для json.
+        Returns:
+            dict: кол-во проверенных записей, кол-во по причинам и примеры.
+        """
+        return {"checked_count": self.checked_count, "counts": dict(self.counts), "samples": dict(self.samples)}
+
+    @staticmethod
+    def from_dict(rejects_dict: dict):
+        """Восстановить статистику из результата to_dict.
+        Args:
+            rejects_dict (dict): статистика в виде для json.
+        Returns:
+            Reject_Stats: восстановленная статистика.
+        """
+        rejects = Reject_Stats()
+        rejects.checked_count = rejects_dict["checked_count"]
+        rejects.counts = dict(rejects_dict["counts"])
+        rejects.samples = dict(rejects_dict["samples"])
+        return rejects
+
+    def write_to(self, timer: Timer) -> None:
+        """Добавить кол-во отброшенных записей по причинам в счетчики таймера (rows_rejected.<причина>)
+        и статистику целиком - в сводку таймера.
+        Args:
+            timer (Timer): таймер.
+        """
+        for reason, count in self.counts.items():
+            timer.count("rows_rejected." + reason, count)
+        timer.add_details("rejected", {**self.to_dict(), "stages": self.get_stages()})
 
 
-class Vacancy_Small:
-    """Информация о мини-вакансии.
+class Vacancy_Record:
+    """Проверенная запись о вакансии: собирается один раз при проверке строки и дальше используется
+    всеми обработчиками (без промежуточных словарей и объектов вакансий).
     Attributes:
-        dic (dict): Словарь информации о зарплате.
+        name (str): название вакансии.
+        salary (float): зарплата в рублях по курсу месяца публикации.
+        area_name (str): город.
+        published_at (str): дата публикации.
+        currency (str): код валюты.
+        year (int): год публикации.
     """
-    def __init__(self, dic: dict):
-        """Инициализация объекта Vacancy_Small. Приведение к более удобному виду.
+    __slots__ = ("name", "salary", "area_name", "published_at", "currency", "year")
+
+    def __init__(self, name: str, salary: float, area_name: str, published_at: str, currency: str):
+        """Инициализация записи.
+        Args:
+            name (str): название вакансии.
+            salary (float): зарплата в рублях.
+            area_name (str): город.
+            published_at (str): дата публикации (начинается с "ГГГГ-ММ").
+            currency (str): код валюты.
+        """
+        self.name = name
+        self.salary = salary
+        self.area_name = area_name
+        self.published_at = published_at
+        self.currency = currency
+        self.year = int(published_at[:4])
+
+    @staticmethod
+    def get_middle_salary(salary_from: (float or None), salary_to: (float or None)) -> float:
+        """Получить среднюю зарплату по краям вилки (без копеек; если одного края нет - берется другой).
         Args:
-            dic (dict): Словарь информации про зарплату.
+            salary_from (float or None): нижний край.
+            salary_to (float or None): верхний край.
+        Returns:
+            float: средняя зарплата.
+
+        >>> Vacancy_Record.get_middle_salary(1000.7, 2000.2), Vacancy_Record.get_middle_salary(None, 3000.5)
+        (1500.0, 3000.0)
         """
-        self.dic = dic
-        self.salary = round(float(dic["salary"]), 1)
-        self.is_needed = dic["is_needed"]
+        salary_from = math.floor(salary_to if salary_from is None else salary_from)
+        salary_to = salary_from if salary_to is None else math.floor(salary_to)
+        return (salary_to + salary_from) / 2
 
     def get_list(self) -> list:
-        """Получить список значений вакансии для дальнейшего сохранения в csv
+        """Получить список значений записи для сохранения в csv.
         Returns:
-            list: вакансия в виде списка.
+            list: название, зарплата, город, дата публикации.
         """
-        return [self.dic["name"], self.dic["salary"], self.dic["area_name"], self.dic["published_at"]]
+        return [self.name, self.salary, self.area_name, self.published_at]
 
 
-class Vacancy_Big:
-    """Информация о вакансии.
+class Aggregate_State:
+    """Частичные суммы и количества вакансий по годам и городам.
+    Суммы хранятся отдельно для каждой валюты, т.к. редкие валюты (не больше 50 записей)
+    можно отбросить только после полного прохода по файлу.
     Attributes:
-        dic (dict): Словарь информации о зарплате.
-        values_reader (Currency_Values_Reader): Словарь информации по валютам.
+        prof (str): Название профессии.
+        matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
+        rejects (Reject_Stats): причины отбраковки записей (без редких валют, они известны только в конце).
     """
-    def __init__(self, dic: dict, values_reader: Currency_Values_Reader):
-        """Инициализация объекта Vacancy_Big. Приведение к более удобному виду.
+    min_currency_count = 50
+    fields = ["currency_count", "year_sum", "year_count", "year_sum_needed",
+              "year_count_needed", "area_sum", "area_count"]
+
+    def __init__(self, prof: str, matcher: Prof_Matcher = None):
+        """Инициализация пустого состояния.
         Args:
-            dic (dict): Словарь информации про зарплату.
-            values_reader (Currency_Values_Reader): Словарь информации по валютам.
+            prof (str): Название профессии.
+            matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
         """
-        self.dic = dic
-        self.salary = self.get_salary(values_reader)
-        self.is_needed = dic["is_needed"]
+        self.prof = prof
+        self.matcher = matcher or Prof_Matcher(prof)
+        self.currency_count = {}
+        self.year_sum = {}
+        self.year_count = {}
+        self.year_sum_needed = {}
+        self.year_count_needed = {}
+        self.area_sum = {}
+        self.area_count = {}
+        self.rejects = Reject_Stats()
+
+    def add_currency(self, cur: str) -> None:
+        """Учесть валюту записи нужной длины.
+        Args:
+            cur (str): код валюты.
+        """
+        self.currency_count = CSV_Start.try_to_add(self.currency_count, cur, 1)
 
-    def get_salary(self, values_reader: Currency_Values_Reader) -> float:
-        """Получить зарплату по новой формуле (левый-правый край, зарплата того года)
+    def add_vacancy(self, cur: str, year: int, area: str, name: str, salary: float) -> None:
+        """Добавить валидную вакансию в суммы.
         Args:
-            values_reader (Currency_Values_Reader): словарь с валютами.
+            cur (str): код валюты.
+            year (int): год публикации.
+            area (str): город.
+            name (str): название вакансии.
+            salary (float): зарплата в рублях.
+        """
+        self.add_totals(cur, year, area, salary)
+        if self.matcher.is_match(name):
+            self.add_needed(cur, year, salary)
+
+    def add_totals(self, cur: str, year: int, area: str, salary: float) -> None:
+        """Добавить валидную вакансию в общие суммы (по годам и городам, без учета профессии).
+        Args:
+            cur (str): код валюты.
+            year (int): год публикации.
+            area (str): город.
+            salary (float): зарплата в рублях.
+        """
+        self.year_sum = CSV_Start.try_to_add(self.year_sum, (cur, year), round(salary, 1))
+        self.year_count = CSV_Start.try_to_add(self.year_count, (cur, year), 1)
+        self.area_sum = CSV_Start.try_to_add(self.area_sum, (cur, area), salary)
+        self.area_count = CSV_Start.try_to_add(self.area_count, (cur, area), 1)
+
+    def add_needed(self, cur: str, year: int, salary: float) -> None:
+        """Добавить вакансию нужной профессии в суммы по годам.
+        Args:
+            cur (str): код валюты.
+            year (int): год публикации.
+            salary (float): зарплата в рублях.
+        """
+        self.year_sum_needed = CSV_Start.try_to_add(self.year_sum_needed, (cur, year), round(salary, 1))
+        self.year_count_needed = CSV_Start.try_to_add(self.year_count_needed, (cur, year), 1)
+
+    def share_totals(self, other) -> None:
+        """Использовать общие суммы другого состояния (суммы по профессии остаются своими).
+        Args:
+            other (Aggregate_State): состояние, которое считает общие суммы.
+        """
+        for name in ["currency_count", "year_sum", "year_count", "area_sum", "area_count", "rejects"]:
+            setattr(self, name, getattr(other, name))
+
+    def merge(self, other) -> None:
+        """Добавить к текущему состоянию другое состояние (например, посчитанное другим процессом).
+        Args:
+            other (Aggregate_State): другое состояние.
+        """
+        for name in Aggregate_State.fields:
+            dic = getattr(self, name)
+            for key, val in getattr(other, name).items():
+                dic = CSV_Start.try_to_add(dic, key, val)
+        self.rejects.merge(other.rejects)
+
+    def to_dict(self) -> dict:
+        """Получить состояние в виде, пригодном для json (ключи-кортежи хранятся списками).
         Returns:
-            float: зарплата в рублях по курсу того года.
+            dict: профессия и списки пар ключ/значение для каждого словаря сумм.
         """
-        try:
-            salary_from = math.floor(float(self.dic["salary_from"]))
-        except:
-            salary_from = math.floor(float(self.dic["salary_to"]))
-        try:
-            salary_to = math.floor(float(self.dic["salary_to"]))
-        except:
-            salary_to = salary_from
-        middle_salary = (salary_to + salary_from) / 2
-        year = self.dic["published_at"][:4]
-        month = str(int(self.dic["published_at"][5:7]))
-        char = self.dic["salary_currency"]
-        return values_reader.currency_dict[year][month][char] * middle_salary
-
-    def get_small(self) -> Vacancy_Small:
-        """Получить уменьшенную версию вакансии.
-        Returns:
-            Vacancy_Small: уменьшенная версия вакансии.
-        """
-        new_dict = {
-            "name": self.dic["name"],
-            "salary": self.salary,
-            "area_name": self.dic["area_name"],
-            "published_at": self.dic["published_at"],
-            "is_needed": self.is_needed
+        state_dict = {"prof": self.prof}
+        for name in Aggregate_State.fields:
+            state_dict[name] = [[list(key) if isinstance(key, tuple) else key, val]
+                                for key, val in getattr(self, name).items()]
+        state_dict["rejects"] = self.rejects.to_dict()
+        return state_dict
+
+    @staticmethod
+    def from_dict(state_dict: dict, matcher: Prof_Matcher = None):
+        """Восстановить состояние из результата to_dict.
+        Args:
+            state_dict (dict): состояние в виде для json.
+            matcher (Prof_Matcher): проверка названия вакансии на профессию (по умолчанию - вхождение prof).
+        Returns:
+            Aggregate_State: восстановленное состояние.
+        """
+        state = Aggregate_State(state_dict["prof"], matcher)
+        for name in Aggregate_State.fields:
+            setattr(state, name, {tuple(key) if isinstance(key, list) else key: val
+                                  for key, val in state_dict[name]})
+        state.rejects = Reject_Stats.from_dict(state_dict["rejects"])
+        return state
+
+    def collapse(self, cur_key_to_value: dict) -> dict:
+        """Сложить значения по всем частым валютам.
+        Args:
+            cur_key_to_value (dict): словарь (валюта, ключ)/значение.
+        Returns:
+            dict: словарь ключ/значение.
+        """
+        key_to_value = {}
+        for (cur, key), val in cur_key_to_value.items():
+            if self.currency_count.get(cur, 0) > Aggregate_State.min_currency_count:
+                key_to_value = CSV_Start.try_to_add(key_to_value, key, val)
+        return key_to_value
+
+    def get_rejects(self) -> Reject_Stats:
+        """Получить статистику отбраковки вместе с записями редких валют.
+        Returns:
+            Reject_Stats: статистика отбраковки.
+        """
+        rejects = Reject_Stats()
+        rejects.merge(self.rejects)
+        rare_count = sum(count for (cur, _), count in self.year_count.items()
+                         if self.currency_count.get(cur, 0) <= Aggregate_State.min_currency_count)
+        rejects.add_count("rare_currency", rare_count)
+        return rejects
+
+    def get_year_data(self) -> list:
+        """Получить данные по годам.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
+        """
+        year_to_count = self.collapse(self.year_count)
+        year_to_salary = Area_Proc_Read.get_middle_salary(year_to_count, self.collapse(self.year_sum))
+        year_to_count_needed = self.collapse(self.year_count_needed)
+        year_to_salary_needed = Area_Proc_Read.get_middle_salary(year_to_count_needed,
+                                                                 self.collapse(self.year_sum_needed))
+        return [(year, count, year_to_salary[year], year_to_count_needed.get(year, 0),
+                 year_to_salary_needed.get(year, 0)) for year, count in sorted(year_to_count.items())]
+
+    def get_area_data(self) -> (dict, dict):
+        """Получить данные по городам.
+        Returns:
+            (dict, dict): город к средней зарплате, город к доле вакансий в нем.
+        """
+        area_to_middle_salary, area_to_piece = \
+            Area_Proc_Read.get_area_to_salary_and_piece(self.collapse(self.area_sum), self.collapse(self.area_count))
+        return Area_Proc_Read.get_sorted_dict(area_to_middle_salary), Area_Proc_Read.get_sorted_dict(area_to_piece)
+
+
+class Single_Pass_Read:
+    """Класс для счета данных по годам и по городам за один проход по файлу.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+    """
+    def __init__(self, csv_start: CSV_Start):
+        """Инициализация класса Single_Pass_Read. Чтение файла и формирование данных по годам и городам.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        """
+        self.csv_start = csv_start
+        with csv_start.input_values.timer.span(type(self).__name__ + ".read_file"):
+            self.state = self.read_file()
+        self.csv_start.all_currencies = self.state.currency_count
+        self.csv_start.rejects = self.state.get_rejects()
+        self.area_to_middle_salary, self.area_to_piece = self.state.get_area_data()
+
+    def read_file(self) -> Aggregate_State:
+        """Чтение большого csv-файла и подсчет сумм по годам, городам и валютам.
+        Returns:
+            Aggregate_State: посчитанные суммы.
+        """
+        state = Aggregate_State(self.csv_start.input_values.prof, self.csv_start.input_values.matcher)
+        with open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
+            file = csv.reader(csv_file)
+            next(file)
+            self.add_lines(state, file)
+        csv_file.close()
+        self.csv_start.input_values.timer.count("bytes_read", os.path.getsize(self.csv_start.input_values.file_name))
+        return state
+
+    def add_lines(self, state: Aggregate_State, lines) -> None:
+        """Добавить в суммы все записи из итератора.
+        Args:
+            state (Aggregate_State): суммы, в которые добавляются записи.
+            lines: итератор по записям csv-файла (без первой строки).
+        """
+        index_of = self.csv_start.index_of
+        rows_count, valid_count = 0, 0
+        for line in lines:
+            rows_count += 1
+            if len(line) == self.csv_start.start_line_len:
+                state.add_currency(line[index_of["salary_currency"]])
+            record = self.csv_start.get_record(line, state.rejects)
+            if record is not None:
+                valid_count += 1
+                state.add_vacancy(record.currency, record.year, record.area_name, record.name, record.salary)
+        self.csv_start.input_values.timer.count("rows_read", rows_count)
+        self.csv_start.input_values.timer.count("rows_rejected", rows_count - valid_count)
+
+    def get_year_data(self) -> list:
+        """Получить данные по годам.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
+        """
+        return self.state.get_year_data()
+
+
+class Mmap_Read(Single_Pass_Read):
+    """Класс для счета данных по годам и по городам за один проход по файлу, отображенному в память (mmap).
+    Декодируются только столбцы needed_fields (в примерах отброшенных записей остальные столбцы - пустые строки),
+    модулем csv разбираются только записи с кавычками в этих столбцах или с другим кол-вом полей.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+    """
+    def read_file(self) -> Aggregate_State:
+        """Чтение большого csv-файла через mmap и подсчет сумм по годам, городам и валютам.
+        Returns:
+            Aggregate_State: посчитанные суммы.
+        """
+        file_name = self.csv_start.input_values.file_name
+        state = Aggregate_State(self.csv_start.input_values.prof, self.csv_start.input_values.matcher)
+        with open(file_name, "rb") as csv_file:
+            header_end = CSV_Chunks.find_record_end(csv_file, 0, False)
+        self.add_lines(state, CSV_Chunks.read_rows_mmap(file_name, header_end, os.path.getsize(file_name),
+                                                        self.csv_start.start_line_len, self.csv_start.field_indexes))
+        self.csv_start.input_values.timer.count("bytes_read", os.path.getsize(file_name))
+        return state
+
+
+class Batch_Read(Single_Pass_Read):
+    """Класс для счета данных сразу для нескольких профессий за один проход по файлу.
+    Общие суммы (по годам и городам) считаются один раз, а суммы по годам для профессий - рядом друг с другом.
+    Синонимы и учет регистра берутся из проверки профессии в csv_start.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        profs (list): названия профессий.
+    """
+    def __init__(self, csv_start: CSV_Start, profs: list):
+        """Инициализация класса Batch_Read. Чтение файла и формирование данных для всех профессий.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            profs (list): названия профессий.
+        """
+        self.profs = profs
+        self.prof_to_state = {}
+        base_matcher = csv_start.input_values.matcher
+        self.matcher = Prof_Matcher(profs, base_matcher.synonyms, base_matcher.ignore_case)
+        super().__init__(csv_start)
+
+    def read_file(self) -> Aggregate_State:
+        """Чтение большого csv-файла и подсчет сумм для всех профессий.
+        Returns:
+            Aggregate_State: состояние первой профессии (в нем же лежат общие суммы).
+        """
+        self.prof_to_state = {prof: Aggregate_State(prof, self.matcher) for prof in self.profs}
+        totals = self.prof_to_state[self.profs[0]]
+        for state in self.prof_to_state.values():
+            state.share_totals(totals)
+        with open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
+            file = csv.reader(csv_file)
+            next(file)
+            self.add_lines(totals, file)
+        csv_file.close()
+        self.csv_start.input_values.timer.count("bytes_read", os.path.getsize(self.csv_start.input_values.file_name))
+        return totals
+
+    def add_lines(self, totals: Aggregate_State, lines) -> None:
+        """Добавить в суммы все записи из итератора.
+        Args:
+            totals (Aggregate_State): состояние с общими суммами.
+            lines: итератор по записям csv-файла (без первой строки).
+        """
+        index_of = self.csv_start.index_of
+        rows_count, valid_count = 0, 0
+        for line in lines:
+            rows_count += 1
+            if len(line) == self.csv_start.start_line_len:
+                totals.add_currency(line[index_of["salary_currency"]])
+            record = self.csv_start.get_record(line, totals.rejects)
+            if record is not None:
+                valid_count += 1
+                totals.add_totals(record.currency, record.year, record.area_name, record.salary)
+                for prof in self.matcher.get_matches(record.name):
+                    self.prof_to_state[prof].add_needed(record.currency, record.year, record.salary)
+        self.csv_start.input_values.timer.count("rows_read", rows_count)
+        self.csv_start.input_values.timer.count("rows_rejected", rows_count - valid_count)
+
+    def get_prof_reader(self, prof: str):
+        """Получить данные для отчета по одной профессии.
+        Args:
+            prof (str): название профессии.
+        Returns:
+            Batch_Prof_Read: данные по годам и городам для профессии.
+        """
+        return Batch_Prof_Read(self.csv_start, self.prof_to_state[prof], self.area_to_middle_salary,
+                               self.area_to_piece)
+
+
+class Batch_Prof_Read:
+    """Данные для отчета по одной профессии из пакетной обработки.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные с названием этой профессии.
+        state (Aggregate_State): суммы профессии.
+    """
+    def __init__(self, csv_start: CSV_Start, state: Aggregate_State, area_to_middle_salary: dict,
+                 area_to_piece: dict):
+        """Инициализация класса Batch_Prof_Read. Словари по городам копируются, т.к. отчет их меняет.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            state (Aggregate_State): суммы профессии.
+            area_to_middle_salary (dict): город к средней зарплате.
+            area_to_piece (dict): город к доле вакансий.
+        """
+        self.csv_start = copy.copy(csv_start)
+        self.csv_start.input_values = copy.copy(csv_start.input_values)
+        self.csv_start.input_values.prof = state.prof
+        self.state = state
+        self.area_to_middle_salary = dict(area_to_middle_salary)
+        self.area_to_piece = dict(area_to_piece)
+
+    def get_year_data(self) -> list:
+        """Получить данные по годам.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
+        """
+        return self.state.get_year_data()
+
+
+class Chunked_Read(Single_Pass_Read):
+    """Класс для счета данных по годам и по городам: файл делится на байтовые куски по границам записей,
+    каждый кусок обрабатывается отдельной задачей (в процессе, потоке или последовательно),
+    а частичные суммы затем складываются.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        processes_count (int): кол-во процессов или потоков (по умолчанию - кол-во ядер).
+        chunks_count (int): кол-во кусков файла (по умолчанию - 4 куска на процесс).
+        backend (str): способ обработки кусков ("serial", "threads" или "processes").
+    """
+    def __init__(self, csv_start: CSV_Start, processes_count: int = None, chunks_count: int = None,
+                 backend: str = "processes"):
+        """Инициализация класса Chunked_Read. Деление файла, параллельная обработка кусков и сложение сумм.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            processes_count (int): кол-во процессов или потоков (по умолчанию - кол-во ядер).
+            chunks_count (int): кол-во кусков файла (по умолчанию - 4 куска на процесс).
+            backend (str): способ обработки кусков ("serial", "threads" или "processes").
+        """
+        self.processes_count = processes_count or os.cpu_count()
+        self.chunks_count = chunks_count or self.processes_count * 4
+        self.backend = backend
+        super().__init__(csv_start)
+
+    def read_chunk(self, start: int, end: int) -> Aggregate_State:
+        """Функция задачи: прочитать один кусок файла и посчитать по нему суммы.
+        Args:
+            start (int): начало куска в байтах.
+            end (int): конец куска в байтах.
+        Returns:
+            Aggregate_State: частичные суммы по куску.
+        """
+        timer = self.csv_start.input_values.timer
+        with timer.process_span("Chunked_Read.read_chunk", start=start, end=end):
+            matcher = self.csv_start.input_values.matcher
+            state = Aggregate_State(self.csv_start.input_values.prof,
+                                    Prof_Matcher(matcher.profs, matcher.synonyms, matcher.ignore_case))
+            self.add_lines(state, csv.reader(CSV_Chunks.read_lines(self.csv_start.input_values.file_name, start, end)))
+            timer.count("bytes_read", end - start)
+        return state
+
+    def read_file(self) -> Aggregate_State:
+        """Обработка кусков файла выбранным способом и сложение частичных сумм в порядке кусков.
+        Returns:
+            Aggregate_State: посчитанные суммы.
+        """
+        chunk_ranges = CSV_Chunks.get_chunk_ranges(self.csv_start.input_values.file_name, self.chunks_count)
+        self.csv_start.input_values.timer.write_time(
+            f"CHUNKS >> Файл поделен на {len(chunk_ranges)} кусков, обработка: {self.backend}")
+        state = Aggregate_State(self.csv_start.input_values.prof, self.csv_start.input_values.matcher)
+        with create_executor(self.backend, self.processes_count) as executor:
+            for chunk_state in executor.map(self.read_chunk, *zip(*chunk_ranges)):
+                state.merge(chunk_state)
+                state.matcher.merge_counts(chunk_state.matcher)
+        return state
+
+
+class Incremental_Read(Single_Pass_Read):
+    """Класс для счета данных по годам и по городам с сохранением сумм между запусками.
+    Вместе с суммами сохраняется водяной знак - позиция в байтах конца последней обработанной записи,
+    поэтому повторный запуск читает только дописанный в конец файла хвост.
+    Если поменялась таблица валют, проверка профессии, первая строка или уже обработанная часть файла,
+    то суммы считаются заново.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        state_root (str): общая директория для сохраненных сумм.
+        rebuild (bool): посчитать суммы заново, не глядя на сохраненные.
+    """
+    state_version = 2
+    hash_block_size = 1 << 20
+
+    def __init__(self, csv_start: CSV_Start, state_root: str, rebuild: bool = False):
+        """Инициализация класса Incremental_Read. Загрузка сумм, чтение хвоста файла и сохранение новых сумм.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            state_root (str): общая директория для сохраненных сумм.
+            rebuild (bool): посчитать суммы заново, не глядя на сохраненные.
+        """
+        self.state_root = state_root
+        self.rebuild = rebuild
+        self.watermark = 0
+        super().__init__(csv_start)
+
+    @staticmethod
+    def get_state_path(state_root: str, file_name: str, prof: str) -> str:
+        """Получить путь к файлу с суммами для csv-файла и профессии.
+        Args:
+            state_root (str): общая директория для сохраненных сумм.
+            file_name (str): название csv-файла.
+            prof (str): Название профессии.
+        Returns:
+            str: путь к json-файлу.
+        """
+        prof_hash = hashlib.sha1(prof.encode("utf-8")).hexdigest()[:16]
+        return f"{state_root}/{os.path.basename(file_name)}/{prof_hash}.json"
+
+    @staticmethod
+    def get_prefix_hashes(file_name: str, watermark: int) -> (str, str):
+        """Посчитать хэши первого и последнего мегабайта уже обработанной части файла.
+        По ним проверяется, что файл только дописывали в конец.
+        Args:
+            file_name (str): название csv-файла.
+            watermark (int): конец обработанной части в байтах.
+        Returns:
+            (str, str): sha1 начала и sha1 конца обработанной части.
+        """
+        with open(file_name, "rb") as csv_file:
+            head_hash = hashlib.sha1(csv_file.read(min(watermark, Incremental_Read.hash_block_size))).hexdigest()
+            csv_file.seek(max(0, watermark - Incremental_Read.hash_block_size))
+            tail_hash = hashlib.sha1(csv_file.read(watermark - csv_file.tell())).hexdigest()
+        return head_hash, tail_hash
+
+    def get_meta(self, watermark: int) -> dict:
+        """Получить ключ сохраненных сумм.
+        Args:
+            watermark (int): конец обработанной части файла в байтах.
+        Returns:
+            dict: ключ сумм.
+        """
+        head_hash, tail_hash = Incremental_Read.get_prefix_hashes(self.csv_start.input_values.file_name, watermark)
+        return {
+            "state_version": Incremental_Read.state_version,
+            "prof": self.csv_start.input_values.prof,
+            "start_line": self.csv_start.start_line,
+            "currency_version": self.csv_start.values_reader.version,
+            "matcher": self.csv_start.input_values.matcher.get_config(),
+            "watermark": watermark,
+            "head_hash": head_hash,
+            "tail_hash": tail_hash
         }
-        return Vacancy_Small(new_dict)
+
+    def load_state(self) -> (Aggregate_State or None, int):
+        """Загрузить сохраненные суммы, если они подходят к файлу и таблице валют.
+        Returns:
+            (Aggregate_State or None, int): суммы и водяной знак или None и 0, если суммы нужно считать заново.
+        """
+        file_name = self.csv_start.input_values.file_name
+        state_path = Incremental_Read.get_state_path(self.state_root, file_name, self.csv_start.input_values.prof)
+        if self.rebuild or not os.path.exists(state_path):
+            return None, 0
+        with open(state_path, "r", encoding="utf-8") as json_file:
+            saved = json.load(json_file)
+        watermark = saved["meta"]["watermark"]
+        if os.path.getsize(file_name) < watermark or saved["meta"] != self.get_meta(watermark):
+            return None, 0
+        return Aggregate_State.from_dict(saved["state"], self.csv_start.input_values.matcher), watermark
+
+    def save_state(self, state: Aggregate_State) -> None:
+        """Сохранить суммы вместе с водяным знаком (через временный файл, чтобы не оставить половину json).
+        Args:
+            state (Aggregate_State): посчитанные суммы.
+        """
+        state_path = Incremental_Read.get_state_path(self.state_root, self.csv_start.input_values.file_name,
+                                                     self.csv_start.input_values.prof)
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path + ".tmp", "w", encoding="utf-8") as json_file:
+            json.dump({"meta": self.get_meta(self.watermark), "state": state.to_dict()}, json_file,
+                      ensure_ascii=False)
+        os.replace(state_path + ".tmp", state_path)
+
+    def read_records(self, csv_file, start: int):
+        """Генератор строк файла с позиции start. Отдает только законченные записи
+        (недописанная последняя запись останется на следующий запуск) и двигает водяной знак.
+        Args:
+            csv_file: файл, открытый в бинарном режиме.
+            start (int): позиция начала записи.
+        Returns:
+            генератор строк для csv.reader.
+        """
+        csv_file.seek(start)
+        self.watermark = start
+        record_lines = []
+        is_in_quotes = False
+        for raw_line in csv_file:
+            record_lines.append(raw_line)
+            is_in_quotes ^= raw_line.count(b'"') % 2 == 1
+            if not is_in_quotes and raw_line.endswith(b"\n"):
+                self.watermark += sum(len(record_line) for record_line in record_lines)
+                for record_line in record_lines:
+                    yield record_line.decode("utf-8")
+                record_lines = []
+
+    def read_file(self) -> Aggregate_State:
+        """Добавить к сохраненным суммам записи из хвоста файла (или прочитать весь файл) и сохранить суммы.
+        Returns:
+            Aggregate_State: посчитанные суммы.
+        """
+        file_name = self.csv_start.input_values.file_name
+        timer = self.csv_start.input_values.timer
+        state, start = self.load_state()
+        with open(file_name, "rb") as csv_file:
+            if state is None:
+                timer.write_time("INCREMENT >> Сохраненных сумм нет или они устарели, читаем весь файл")
+                state = Aggregate_State(self.csv_start.input_values.prof, self.csv_start.input_values.matcher)
+                start = CSV_Chunks.find_record_end(csv_file, 0, False)
+            else:
+                timer.write_time(f"INCREMENT >> Читаем хвост файла с позиции {start}")
+            self.add_lines(state, csv.reader(self.read_records(csv_file, start)))
+        timer.count("bytes_read", self.watermark - start)
+        self.save_state(state)
+        timer.write_time(f"INCREMENT >> Суммы сохранены, водяной знак - {self.watermark}")
+        return state
+
+
+class Cache_Read:
+    """Класс для счета данных по годам и по городам из колоночного кэша.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        cache_root (str): общая директория для кэшей.
+    """
+    def __init__(self, csv_start: CSV_Start, cache_root: str):
+        """Инициализация класса Cache_Read. Открытие (или создание) кэша и подсчет данных.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            cache_root (str): общая директория для кэшей.
+        """
+        self.csv_start = csv_start
+        self.cache = Cache_Read.load_or_build_cache(csv_start, cache_root)
+        self.csv_start.rejects = Reject_Stats.from_dict(self.cache.rejects)
+        self.area_to_middle_salary, self.area_to_piece = self.get_area_data()
+
+    @staticmethod
+    def build_cache(csv_start: CSV_Start, cache_root: str) -> Vacancy_Cache:
+        """Прочитать csv-файл, очистить данные и сохранить их в кэш.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            cache_root (str): общая директория для кэшей.
+        Returns:
+            Vacancy_Cache: созданный кэш.
+        """
+        file_name = csv_start.input_values.file_name
+        index_of = csv_start.index_of
+        name_table, area_table, cur_table = String_Table(), String_Table(), String_Table()
+        columns = {"salary": array("d"), "year_salary": array("d"), "published_at": []}
+        currency_count = {}
+        timer = csv_start.input_values.timer
+        rows_count = 0
+        with timer.span("Cache_Read.build_cache"), open(file_name, "r", encoding='utf-8-sig') as csv_file:
+            file = csv.reader(csv_file)
+            next(file)
+            for line in file:
+                rows_count += 1
+                if len(line) == csv_start.start_line_len:
+                    currency_count = CSV_Start.try_to_add(currency_count, line[index_of["salary_currency"]], 1)
+                record = csv_start.get_record(line)
+                if record is not None:
+                    name_table.add(record.name)
+                    area_table.add(record.area_name)
+                    cur_table.add(record.currency)
+                    columns["salary"].append(record.salary)
+                    columns["year_salary"].append(round(record.salary, 1))
+                    columns["published_at"].append(record.published_at[:19])
+        timer.count("rows_read", rows_count)
+        timer.count("rows_rejected", rows_count - len(columns["salary"]))
+        timer.count("bytes_read", os.path.getsize(file_name))
+        csv_start.all_currencies = currency_count
+        is_valid_cur = np.array([currency_count[cur] > Aggregate_State.min_currency_count
+                                 for cur in cur_table.get_values()],
+                                dtype=bool)
+        mask = cur_table.map_values(is_valid_cur)
+        csv_start.rejects.add_count("rare_currency", len(mask) - int(mask.sum()))
+        names, areas = name_table.get_values(), area_table.get_values()
+        name_order, name_id = Vacancy_Cache.get_first_seen_codes(name_table.get_ids()[mask])
+        area_order, area_id = Vacancy_Cache.get_first_seen_codes(area_table.get_ids()[mask])
+        arrays = {
+            "name_id": name_id,
+            "area_id": area_id,
+            "salary": np.array(columns["salary"], dtype=np.float64)[mask],
+            "year_salary": np.array(columns["year_salary"], dtype=np.float64)[mask],
+            "published_at": np.array(columns["published_at"], dtype="datetime64[s]")[mask]
+        }
+        return Vacancy_Cache.save(cache_root, file_name, arrays, [names[index] for index in name_order],
+                                  [areas[index] for index in area_order], csv_start.rejects.to_dict(),
+                                  csv_start.values_reader.version)
+
+    @staticmethod
+    def load_or_build_cache(csv_start: CSV_Start, cache_root: str) -> Vacancy_Cache:
+        """Открыть подходящий кэш или создать новый.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+            cache_root (str): общая директория для кэшей.
+        Returns:
+            Vacancy_Cache: кэш.
+        """
+        cache = Vacancy_Cache.load(cache_root, csv_start.input_values.file_name, csv_start.values_reader.version)
+        if cache is None:
+            csv_start.input_values.timer.write_time("CACHE >> Кэш не найден или устарел, создаем новый")
+            cache = Cache_Read.build_cache(csv_start, cache_root)
+        return cache
+
+    @staticmethod
+    def get_key_to_sum_and_count(keys: np.ndarray, values: np.ndarray) -> (dict, dict):
+        """Посчитать суммы и количества значений по ключам (суммирование идет в порядке записей).
+        Args:
+            keys (np.ndarray): ключи.
+            values (np.ndarray): значения.
+        Returns:
+            (dict, dict): ключ/сумма, ключ/кол-во.
+        """
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse, weights=values, minlength=len(unique_keys))
+        counts = np.bincount(inverse, minlength=len(unique_keys))
+        key_to_sum = {key.item(): float(val) for key, val in zip(unique_keys, sums)}
+        key_to_count = {key.item(): int(val) for key, val in zip(unique_keys, counts)}
+        return key_to_sum, key_to_count
+
+    @staticmethod
+    def get_year_data_from_arrays(years: np.ndarray, year_salary: np.ndarray, needed_mask: np.ndarray) -> list:
+        """Посчитать данные по годам по массивам записей.
+        Args:
+            years (np.ndarray): год каждой записи.
+            year_salary (np.ndarray): округленная зарплата каждой записи.
+            needed_mask (np.ndarray): маска записей с нужной профессией.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
+        """
+        year_to_sum, year_to_count = Cache_Read.get_key_to_sum_and_count(years, year_salary)
+        year_to_sum_needed, year_to_count_needed = \
+            Cache_Read.get_key_to_sum_and_count(years[needed_mask], year_salary[needed_mask])
+        year_to_salary = Area_Proc_Read.get_middle_salary(year_to_count, year_to_sum)
+        year_to_salary_needed = Area_Proc_Read.get_middle_salary(year_to_count_needed, year_to_sum_needed)
+        return [(year, count, year_to_salary[year], year_to_count_needed.get(year, 0),
+                 year_to_salary_needed.get(year, 0)) for year, count in sorted(year_to_count.items())]
+
+    @staticmethod
+    def get_area_data_from_arrays(area_codes: np.ndarray, areas: list, salary: np.ndarray) -> (dict, dict):
+        """Посчитать данные по городам по массивам записей.
+        Args:
+            area_codes (np.ndarray): номер города каждой записи.
+            areas (list): названия городов по номерам.
+            salary (np.ndarray): зарплата каждой записи.
+        Returns:
+            (dict, dict): город к средней зарплате, город к доле вакансий в нем.
+        """
+        sums = np.bincount(area_codes, weights=salary, minlength=len(areas))
+        counts = np.bincount(area_codes, minlength=len(areas))
+        area_to_sum = {area: float(val) for area, val in zip(areas, sums)}
+        area_to_count = {area: int(val) for area, val in zip(areas, counts)}
+        area_to_middle_salary, area_to_piece = Area_Proc_Read.get_area_to_salary_and_piece(area_to_sum, area_to_count)
+        return Area_Proc_Read.get_sorted_dict(area_to_middle_salary), Area_Proc_Read.get_sorted_dict(area_to_piece)
+
+    def get_year_data(self) -> list:
+        """Получить данные по годам.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
+        """
+        return Cache_Read.get_year_data_from_arrays(self.cache.get_years(), self.cache.year_salary,
+                                                    self.cache.get_needed_mask(self.csv_start.input_values.matcher))
+
+    def get_area_data(self) -> (dict, dict):
+        """Получить данные по городам.
+        Returns:
+            (dict, dict): город к средней зарплате, город к доле вакансий в нем.
+        """
+        return Cache_Read.get_area_data_from_arrays(self.cache.area_id, self.cache.areas, self.cache.salary)
+
+
+class Vectorized_Read:
+    """Класс для счета данных по годам и по городам через массивы NumPy: из файла достаются только
+    нужные столбцы, а проверка, перевод в рубли и суммирование идут сразу над всеми записями.
+    Суммы считаются в порядке записей, поэтому средние совпадают с Year_Proc_Read и Area_Proc_Read.
+    Столбцы хранятся словарным кодированием (String_Table): разбор чисел, поиск курса и проверка профессии
+    идут по уникальным строкам, суммы - по номерам, а названия городов достаются только для отчета.
+    Attributes:
+        csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+    """
+    def __init__(self, csv_start: CSV_Start):
+        """Инициализация класса Vectorized_Read. Чтение столбцов, перевод зарплат и подсчет данных по городам.
+        Args:
+            csv_start (CSV_Start): Начальные данные (индексы и первая строка).
+        """
+        self.csv_start = csv_start
+        columns = self.read_columns()
+        mask, salary, years = self.get_salaries(columns)
+        self.salary = salary[mask]
+        self.year_salary = Vectorized_Read.round_like_python(self.salary, 1)
+        self.years = years[mask]
+        name_order, self.name_codes = Vacancy_Cache.get_first_seen_codes(columns["name"].get_ids()[mask])
+        area_order, self.area_codes = Vacancy_Cache.get_first_seen_codes(columns["area_name"].get_ids()[mask])
+        name_values, area_values = columns["name"].get_values(), columns["area_name"].get_values()
+        self.names = [name_values[index] for index in name_order]
+        self.areas = [area_values[index] for index in area_order]
+        self.area_to_middle_salary, self.area_to_piece = self.get_area_data()
+
+    def read_columns(self) -> dict:
+        """Прочитать из файла только нужные столбцы записей нужной длины. От даты публикации
+        нужен только месяц ("ГГГГ-ММ"), поэтому уникальных значений в этом столбце мало.
+        Returns:
+            dict: название столбца/String_Table.
+        """
+        columns = {field: String_Table() for field in CSV_Start.needed_fields}
+        adds = [(self.csv_start.index_of[field], columns[field].value_to_id, columns[field].ids.append)
+                for field in CSV_Start.needed_fields if field != "published_at"]
+        date_index = self.csv_start.index_of["published_at"]
+        date_length = self.csv_start.values_reader.date_length
+        month_to_id, month_append = columns["published_at"].value_to_id, columns["published_at"].ids.append
+        timer = self.csv_start.input_values.timer
+        rows_count = 0
+        with timer.span("Vectorized_Read.read_columns"), \
+                open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
+            file = csv.reader(csv_file)
+            next(file)
+            for line in file:
+                rows_count += 1
+                if len(line) == self.csv_start.start_line_len:
+                    for index, value_to_id, append in adds:
+                        append(value_to_id.setdefault(line[index], len(value_to_id)))
+                    month_append(month_to_id.setdefault(line[date_index][:date_length], len(month_to_id)))
+        csv_file.close()
+        self.csv_start.rejects.checked_count += rows_count
+        self.csv_start.rejects.add_count("bad_length", rows_count - len(columns["name"].ids))
+        timer.count("rows_read", rows_count)
+        timer.count("bytes_read", os.path.getsize(self.csv_start.input_values.file_name))
+        return columns
+
+    @staticmethod
+    def get_codes(values: list, value_to_index: dict) -> np.ndarray:
+        """Заменить строки на их номера (-1, если строки нет в словаре).
+        Args:
+            values (list): строки.
+            value_to_index (dict): строка/номер.
+        Returns:
+            np.ndarray: номера.
+        """
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        unique_index = np.array([value_to_index.get(value, -1) for value in uniques] + [-1], dtype=np.int64)
+        return unique_index[codes]
+
+    @staticmethod
+    def parse_floats(values: list) -> np.ndarray:
+        """Разобрать уникальные строки так же, как CSV_Start.parse_float (pd.to_numeric принимает
+        nan и inf, поэтому не подходит).
+        Args:
+            values (list): строки.
+        Returns:
+            np.ndarray: числа (nan, если строка - не число).
+
+        >>> Vectorized_Read.parse_floats(["1.5", "inf", "-nan", "", "٣٤"]).tolist()
+        [1.5, nan, nan, nan, 34.0]
+        """
+        numbers = map(CSV_Start.parse_float, values)
+        return np.array([math.nan if number is None else number for number in numbers], dtype=np.float64)
+
+    @staticmethod
+    def round_like_python(values: np.ndarray, digits: int) -> np.ndarray:
+        """Округлить массив так же, как встроенный round (np.round ошибается на числах, близких к половине).
+        Args:
+            values (np.ndarray): значения.
+            digits (int): кол-во знаков после запятой.
+        Returns:
+            np.ndarray: округленные значения.
+        """
+        rounded = np.round(values, digits)
+        scaled = values * 10 ** digits
+        is_near_half = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+        for index in np.flatnonzero(is_near_half):
+            rounded[index] = round(float(values[index]), digits)
+        return rounded
+
+    def get_salaries(self, columns: dict) -> (np.ndarray, np.ndarray, np.ndarray):
+        """Проверить все записи и перевести зарплаты в рубли по курсу месяца публикации.
+        Args:
+            columns (dict): название столбца/String_Table.
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray): маска валидных записей, зарплаты в рублях, годы публикации.
+        """
+        values_reader = self.csv_start.values_reader
+        salary_from = columns["salary_from"].map_values(
+            np.floor(Vectorized_Read.parse_floats(columns["salary_from"].get_values())))
+        salary_to = columns["salary_to"].map_values(
+            np.floor(Vectorized_Read.parse_floats(columns["salary_to"].get_values())))
+        has_salary = ~np.isnan(salary_from) | ~np.isnan(salary_to)
+        salary_from, salary_to = np.where(np.isnan(salary_from), salary_to, salary_from), \
+            np.where(np.isnan(salary_to), salary_from, salary_to)
+        month_index = columns["published_at"].map_values(
+            Vectorized_Read.get_codes(columns["published_at"].get_values(), values_reader.date_to_index))
+        cur_index = columns["salary_currency"].map_values(
+            Vectorized_Read.get_codes(columns["salary_currency"].get_values(), values_reader.cur_to_index))
+        rate = values_reader.rate_matrix[month_index, cur_index]
+        has_rate = (month_index >= 0) & (cur_index >= 0) & ~np.isnan(rate)
+        cur_uniques = columns["salary_currency"].get_values()
+        cur_counts = np.bincount(columns["salary_currency"].get_ids(), minlength=len(cur_uniques))
+        self.csv_start.all_currencies = dict(zip(cur_uniques, cur_counts.tolist()))
+        is_valid_cur = columns["salary_currency"].map_values(cur_counts > Aggregate_State.min_currency_count)
+        mask = has_salary & has_rate & is_valid_cur
+        self.csv_start.rejects.add_count("bad_salary", int((~has_salary).sum()))
+        self.csv_start.rejects.add_count("no_rate", int((has_salary & ~has_rate).sum()))
+        self.csv_start.rejects.add_count("rare_currency", int((has_salary & has_rate & ~is_valid_cur).sum()))
+        month_years = np.array([int(date[:4]) for date in values_reader.date_to_index], dtype=np.int64)
+        return mask, rate * ((salary_to + salary_from) / 2), month_years[month_index]
+
+    def get_year_data(self) -> list:
+        """Получить данные по годам.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
+        """
+        needed_mask = Vacancy_Cache.get_names_mask(self.csv_start.input_values.matcher, self.names, self.name_codes)
+        return Cache_Read.get_year_data_from_arrays(self.years, self.year_salary, needed_mask)
+
+    def get_area_data(self) -> (dict, dict):
+        """Получить данные по городам.
+        Returns:
+            (dict, dict): город к средней зарплате, город к доле вакансий в нем.
+        """
+        return Cache_Read.get_area_data_from_arrays(self.area_codes, self.areas, self.salary)
 
 
 class Year_Proc_Read:
     """Класс для счета данных по годам.
     Attributes:
         csv_start (CSV_Start): Начальные данные (индексы и первая строка).
-        csv_dir (str): расположение будущих мини-файлов-csv.
+        csv_dir (str): расположение отладочных мини-файлов-csv.
+        processes_count (int): кол-во постоянных процессов-обработчиков (по умолчанию - кол-во ядер).
+        queue_size (int): максимальное кол-во файлов в очереди на обработку.
+        spawn_per_year (bool): старый режим - новый процесс на каждый год и неограниченная очередь.
+        save_csv (bool): сохранять ли годы в csv-файлы (только для отладки, обработчики их не читают).
+        backend (str): способ деления файла по годам и обработки годов ("serial", "threads" или "processes").
     """
-    def __init__(self, csv_start: CSV_Start, csv_dir: str):
-        """Инициализация класса Area_Proc_Read. Формирование словарей город к сред. зарплате,
-        город к доле вакансий в нем.
+    reduce_block_size = 1 << 16
+
+    def __init__(self, csv_start: CSV_Start, csv_dir: str, processes_count: int = None,
+                 queue_size: int = None, spawn_per_year: bool = False, save_csv: bool = False,
+                 backend: str = "processes"):
+        """Инициализация класса Year_Proc_Read. Запуск задачи, которая делит файл по годам
+        и отдает годы обработчикам (исполнители create_executor).
         Args:
             csv_start (CSV_Start): Начальные данные (индексы и первая строка).
-            csv_dir (str): расположение будущих мини-файлов-csv.
+            csv_dir (str): расположение отладочных мини-файлов-csv.
+            processes_count (int): кол-во постоянных процессов-обработчиков (по умолчанию - кол-во ядер).
+            queue_size (int): максимальное кол-во файлов в очереди (по умолчанию - 2 на процесс).
+            spawn_per_year (bool): старый режим - новый процесс на каждый год и неограниченная очередь.
+            save_csv (bool): сохранять ли годы в csv-файлы (только для отладки, обработчики их не читают).
+            backend (str): способ деления файла по годам и обработки годов ("serial", "threads" или "processes").
         """
         self.csv_start = csv_start
         self.csv_dir = csv_dir
-        self.year_process, self.year_queue = self.create_year_proc()
+        self.processes_count = processes_count or os.cpu_count()
+        self.queue_size = queue_size or self.processes_count * 2
+        self.spawn_per_year = spawn_per_year
+        self.save_csv = save_csv
+        self.backend = backend
+        if self.save_csv:
+            Year_Proc_Read.make_dir_if_needed(self.csv_dir)
+        self.year_executor = create_executor(backend, 1)
+        self.year_future = self.year_executor.submit(self.year_proc)
+
+    def __getstate__(self) -> dict:
+        """Состояние для передачи в другой процесс (исполнитель и результат деления по годам не передаются).
+        Returns:
+            dict: атрибуты обработчика.
+        """
+        state = self.__dict__.copy()
+        state.pop("year_executor", None)
+        state.pop("year_future", None)
+        return state
 
-    def read_one_csv_file(self, year_queue: mp.Queue, read_queue: mp.Queue) -> None:
-        """Читает один csv-файл и делает данные о нём.
+    @staticmethod
+    def read_one_year(timer: Timer, year: int, shm_name: str, all_count: int) -> tuple:
+        """Функция задачи-обработчика: посчитать год по блоку общей памяти. В блоке лежат зарплаты (float64),
+        а за ними - битовая маска нужной профессии. Блок удаляется сразу после подсчета года,
+        поэтому общая память не растет вместе с файлом.
         Args:
-            queue (mp.Queue): очередь для добавления данных.
-            read_queue (mp.Queue): очередь из файлов для чтения.
+            timer (Timer): таймер.
+            year (int): год.
+            shm_name (str): имя блока общей памяти.
+            all_count (int): кол-во записей года.
+        Returns:
+            tuple: (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
         """
-        while not read_queue.empty():
-            file_name = read_queue.get()
-            self.csv_start.input_values.timer\
-                .write_time("YEAR_PROCESS >>> [" + mp.current_process().name + "] Начало обработки файла \"" + file_name + "\"")
-            with open(f"{self.csv_dir}/{file_name}", "r", encoding='utf-8-sig', newline='') as csv_file:
-                file = csv.reader(csv_file)
-                filtered_vacs = []
-                year = int(file_name.replace("file_", "").replace(".csv", ""))
-                for line in file:
-                    new_dict_line = dict(zip(CSV_Start.new_needed_fields, line))
-                    new_dict_line["is_needed"] = (new_dict_line["name"]).find(self.csv_start.input_values.prof) > -1
-                    vac = Vacancy_Small(new_dict_line)
-                    filtered_vacs.append(vac)
-                csv_file.close()
-                all_count = len(filtered_vacs)
-                all_sum = sum([vac.salary for vac in filtered_vacs])
-                all_middle = math.floor(all_sum / all_count)
-                needed_vacs = list(filter(lambda vacancy: vacancy.is_needed, filtered_vacs))
-                needed_count = len(needed_vacs)
-                needed_sum = sum([vac.salary for vac in needed_vacs])
-                needed_middle = math.floor(needed_sum / needed_count)
-            year_queue.put((year, all_count, all_middle, needed_count, needed_middle))
-            self.csv_start.input_values.timer\
-                .write_time("YEAR_PROCESS >>> [" + mp.current_process().name + "] Конец \"" + file_name + "\"")
-
-    def save_file(self, current_year: str, lines: list) -> str:
+        with timer.process_span("Year_Proc_Read.read_one_year", year=year, rows=all_count):
+            timer.write_time("YEAR_PROCESS >>> [" + mp.current_process().name + "] Начало обработки года " + str(year))
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                salaries = np.ndarray((all_count,), dtype=np.float64, buffer=shm.buf)
+                needed_bits = np.ndarray(((all_count + 7) // 8,), dtype=np.uint8, buffer=shm.buf,
+                                         offset=8 * all_count)
+                all_sum, needed_count, needed_sum = Year_Proc_Read.reduce_year(salaries, needed_bits)
+                del salaries, needed_bits
+            finally:
+                shm.close()
+                shm.unlink()
+            all_middle = math.floor(all_sum / all_count)
+            needed_middle = math.floor(needed_sum / needed_count) if needed_count > 0 else 0
+            timer.count("years_reduced")
+            timer.write_time("YEAR_PROCESS >>> [" + mp.current_process().name + "] Конец года " + str(year))
+        return year, all_count, all_middle, needed_count, needed_middle
+
+    @staticmethod
+    def add_in_order(total: float, values: np.ndarray) -> float:
+        """Прибавить значения к сумме строго по порядку, как встроенный sum (np.sum складывает попарно).
+        Args:
+            total (float): текущая сумма.
+            values (np.ndarray): значения.
+        Returns:
+            float: новая сумма.
+        """
+        if len(values) == 0:
+            return total
+        return float(np.cumsum(np.concatenate(([total], values)))[-1])
+
+    @staticmethod
+    def reduce_year(salaries: np.ndarray, needed_bits: np.ndarray) -> (float, int, float):
+        """Потоково посчитать суммы года: записи берутся кусками по reduce_block_size,
+        поэтому дополнительная память обработчика не зависит от кол-ва записей года.
+        Args:
+            salaries (np.ndarray): зарплаты года.
+            needed_bits (np.ndarray): упакованная битовая маска нужной профессии.
+        Returns:
+            (float, int, float): сумма зарплат, кол-во нужных, сумма зарплат нужных.
+        """
+        all_sum, needed_count, needed_sum = 0.0, 0, 0.0
+        block_size = Year_Proc_Read.reduce_block_size
+        for start in range(0, len(salaries), block_size):
+            salaries_block = salaries[start:start + block_size]
+            needed = np.unpackbits(needed_bits[start // 8:(start + len(salaries_block) + 7) // 8],
+                                   count=len(salaries_block)).view(bool)
+            needed_salaries = salaries_block[needed]
+            all_sum = Year_Proc_Read.add_in_order(all_sum, salaries_block)
+            needed_count += len(needed_salaries)
+            needed_sum = Year_Proc_Read.add_in_order(needed_sum, needed_salaries)
+        return all_sum, needed_count, needed_sum
+
+    @staticmethod
+    def pack_year(salaries: array, needed: bytearray) -> shared_memory.SharedMemory:
+        """Положить данные года в новый блок общей памяти: зарплаты, а за ними битовую маску нужной профессии.
+        Args:
+            salaries (array): зарплаты года.
+            needed (bytearray): 1 - вакансия нужной профессии, 0 - нет.
+        Returns:
+            shared_memory.SharedMemory: созданный блок.
+        """
+        salaries_size = 8 * len(salaries)
+        needed_bits = np.packbits(np.frombuffer(needed, dtype=np.uint8)).tobytes()
+        shm = shared_memory.SharedMemory(create=True, size=max(1, salaries_size + len(needed_bits)))
+        shm.buf[:salaries_size] = memoryview(salaries).cast("B")
+        shm.buf[salaries_size:salaries_size + len(needed_bits)] = needed_bits
+        return shm
+
+    def send_year(self, current_year: int, year_data: tuple, executor: futures.Executor, year_futures: list,
+                  shared_blocks: dict) -> None:
+        """Отдать год обработчикам через общую память (и сохранить его в csv, если нужен отладочный вывод).
+        Если обработчики уже заняты и в очереди queue_size годов, то ждем, пока хоть один год не посчитается
+        (так деление файла не убегает вперед обработки). В режиме spawn_per_year для года создается
+        свой исполнитель на один процесс (или поток), а очередь не ограничена.
+        В POSIX свое отображение блока сразу закрывается (блок живет до unlink в обработчике),
+        в Windows блок существует, пока открыт хоть один дескриптор, поэтому он остается открытым до конца.
+        Args:
+            current_year (int): Текущий год.
+            year_data (tuple): зарплаты (array), маска нужной профессии (bytearray), строки для csv (list).
+            executor (Executor): исполнитель задач-обработчиков.
+            year_futures (list): Future посчитанных и отданных годов (по порядку).
+            shared_blocks (dict): имя блока общей памяти к открытому блоку (None - уже закрыт).
+        """
+        salaries, needed, lines = year_data
+        if len(salaries) == 0:
+            return
+        if self.save_csv:
+            new_csv = self.save_file(current_year, lines)
+            self.csv_start.input_values.timer.write_time("YEAR >> Создан файл \"" + new_csv + "\"")
+        if self.spawn_per_year:
+            executor = create_executor(self.backend, 1)
+        else:
+            running = [future for future in year_futures if not future.done()]
+            if len(running) >= self.processes_count + self.queue_size:
+                futures.wait(running, return_when=futures.FIRST_COMPLETED)
+        shm = Year_Proc_Read.pack_year(salaries, needed)
+        shared_blocks[shm.name] = shm
+        year_futures.append(executor.submit(Year_Proc_Read.read_one_year, self.csv_start.input_values.timer,
+                                            current_year, shm.name, len(salaries)))
+        if self.spawn_per_year:
+            executor.shutdown(wait=False)
+        if os.name == "posix":
+            shm.close()
+            shared_blocks[shm.name] = None
+
+    def save_file(self, current_year: int, lines: list) -> str:
         """Сохраняет CSV-файл с конкретными годами
         Args:
-            current_year (str): Текущий год.
+            current_year (int): Текущий год.
             lines (list): Список вакансий этого года.
         Returns:
             str: название нового csv-чанка.
@@ -384,69 +1819,80 @@ class Year_Proc_Read:
             writer.writerows(lines)
         return file_name
 
-    def get_year(self, line: list) -> str:
-        """Получить значение года из записи.
+    def add_record(self, record: Vacancy_Record, year_data: tuple) -> None:
+        """Добавить проверенную запись к данным года.
         Args:
-            line (list): Запись.
-        Returns:
-            str: значение года в виде 4 символов.
+            record (Vacancy_Record): запись.
+            year_data (tuple): зарплаты (array), маска нужной профессии (bytearray), строки для csv (list).
         """
-        return line[self.csv_start.index_of["published_at"]][:4]
+        salaries, needed, lines = year_data
+        salaries.append(round(record.salary, 1))
+        needed.append(self.csv_start.input_values.matcher.is_match(record.name))
+        if self.save_csv:
+            lines.append(record.get_list())
 
-    def get_new_line(self, line: list) -> list:
-        """Получить новый список под новую, более простую вакансию.
+    @staticmethod
+    def release_blocks(shared_blocks: dict) -> None:
+        """Закрыть и удалить блоки общей памяти, которые не удалили обработчики (например, после ошибки).
         Args:
-            line (list): стандартная строка:
-        Return:
-            list: укороченный лист.
+            shared_blocks (dict): имя блока общей памяти к открытому блоку (None - уже закрыт).
         """
-        new_dict = dict(zip(self.csv_start.start_line, line))
-        new_dict["is_needed"] = None
-        new_vac = Vacancy_Big(new_dict, self.csv_start.values_reader)
-        return new_vac.get_small().get_list()
-
-    def year_proc(self, year_queue: mp.Queue) -> None:
-        """Функция процесса, которая читает большой csv-файл и делит его на маленькие + создает процессы,
-        которые читают эти маленькие файлы.
-        Args:
-            year_queue (mp.Queue): очередь, в которую будут складываться данные из файлов.
+        for shm_name, shm in shared_blocks.items():
+            if shm is None:
+                try:
+                    shm = shared_memory.SharedMemory(name=shm_name)
+                except FileNotFoundError:
+                    continue
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        shared_blocks.clear()
+
+    def year_proc(self) -> list:
+        """Функция задачи, которая читает большой csv-файл, делит его по годам и отдает годы
+        обработчикам через общую память.
+        Трекер ресурсов запускается до процессов-обработчиков, чтобы они делили его с этим процессом:
+        иначе у каждого обработчика свой трекер, который удалит блоки при его завершении.
+        При ошибке (или Ctrl-C) еще не начатые годы отменяются, а оставшиеся блоки удаляются.
+        Кол-во строк не считается: файл целиком читает и Area_Proc_Read, счетчики строк ведет он.
+        Returns:
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных) в порядке годов в файле.
         """
-        procs = []
-        read_queue = mp.Queue()
-        with open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
-            file = csv.reader(csv_file)
-            next(file)
-            next_line = next(file)
-            current_year = self.get_year(next_line)
-            data_years = []
-            if self.csv_start.is_valid_vac(next_line):
-                data_years.append(self.get_new_line(next_line))
-            for line in file:
-                if self.csv_start.is_valid_vac(line):
-                    line_year = self.get_year(line)
-                    if line_year != current_year:
-                        new_csv = self.save_file(current_year, data_years)
-                        self.csv_start.input_values.timer. \
-                            write_time("YEAR >> Создан файл \"" + new_csv + "\"")
-                        read_queue.put(new_csv)
-                        proc = mp.Process(target=self.read_one_csv_file, args=(year_queue, read_queue))
-                        proc.start()
-                        procs.append(proc)
-                        data_years = []
-                        current_year = line_year
-                    data_years.append(self.get_new_line(line))
-            new_csv = self.save_file(current_year, data_years)
-            self.csv_start.input_values.timer. \
-                write_time("YEAR >> Создан файл \"" + new_csv + "\"")
-            read_queue.put(new_csv)
-            if len(mp.active_children()) <= 0:
-                proc = mp.Process(target=self.read_one_csv_file, args=(year_queue, read_queue))
-                proc.start()
-                procs.append(proc)
-        csv_file.close()
-        self.csv_start.input_values.timer.write_time("YEAR >> Файл прочитан, ожидаем конца всех подпроцессов")
-        for proc in procs:
-            proc.join()
+        timer = self.csv_start.input_values.timer
+        with timer.process_span("Year_Proc_Read.year_proc"):
+            year_futures = []
+            shared_blocks = {}
+            if os.name == "posix" and self.backend == "processes":
+                resource_tracker.ensure_running()
+            executor = create_executor(self.backend, self.processes_count)
+            try:
+                with open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
+                    file = csv.reader(csv_file)
+                    next(file)
+                    current_year = None
+                    year_data = (array("d"), bytearray(), [])
+                    for line in file:
+                        record = self.csv_start.get_vac_record(line)
+                        if record is not None:
+                            if record.year != current_year:
+                                if current_year is not None:
+                                    with timer.span("Year_Proc_Read.send_year", year=current_year):
+                                        self.send_year(current_year, year_data, executor, year_futures,
+                                                       shared_blocks)
+                                year_data = (array("d"), bytearray(), [])
+                                current_year = record.year
+                            self.add_record(record, year_data)
+                    if current_year is not None:
+                        with timer.span("Year_Proc_Read.send_year", year=current_year):
+                            self.send_year(current_year, year_data, executor, year_futures, shared_blocks)
+                timer.count("bytes_read", os.path.getsize(self.csv_start.input_values.file_name))
+                timer.write_time("YEAR >> Файл прочитан, ожидаем конца обработки всех годов")
+                return [future.result() for future in year_futures]
+            finally:
+                executor.shutdown(cancel_futures=True)
+                Year_Proc_Read.release_blocks(shared_blocks)
 
     @staticmethod
     def make_dir_if_needed(csv_dir: str) -> None:
@@ -458,16 +1904,15 @@ class Year_Proc_Read:
             shutil.rmtree(csv_dir)
         os.mkdir(csv_dir)
 
-    def create_year_proc(self) -> (mp.Process, mp.Queue):
-        """Создание процесса для вычислений данных по годам.
+    def get_year_data(self) -> list:
+        """Дождаться конца деления файла по годам и получить данные по годам.
         Returns:
-            (mp.Process, mp.Queue): Созданный процесс и очередь с данными.
+            list: кортежи (год, кол-во, средняя з/п, кол-во нужных, средняя з/п нужных).
         """
-        Year_Proc_Read.make_dir_if_needed(self.csv_dir)
-        year_queue = mp.Queue()
-        year_process = mp.Process(target=self.year_proc, args=(year_queue,))
-        year_process.start()
-        return year_process, year_queue
+        try:
+            return self.year_future.result()
+        finally:
+            self.year_executor.shutdown()
 
 
 class Area_Proc_Read:
@@ -545,22 +1990,28 @@ class Area_Proc_Read:
 
     def area_proc(self) -> (dict, dict):
         """Чтение большого csv-файла и формаирование данных по городам.
+        Счетчики rows_read (все строки) и rows_rejected добавляются в таймер один раз после чтения.
         Returns:
             (dict, dict): город к средней зарплате, город к доле вакансий в нем.
         """
+        timer = self.csv_start.input_values.timer
         area_to_sum = {}
         area_to_count = {}
-        with open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
-            file = csv.reader(csv_file)
-            next(file)
-            for line in file:
-                if self.csv_start.is_valid_vac(line):
-                    new_dict_line = dict(zip(self.csv_start.start_line, line))
-                    new_dict_line["is_needed"] = None
-                    vac = Vacancy_Big(new_dict_line, self.csv_start.values_reader)
-                    area_to_sum = Area_Proc_Read.try_to_add(area_to_sum, vac.dic["area_name"], vac.salary)
-                    area_to_count = Area_Proc_Read.try_to_add(area_to_count, vac.dic["area_name"], 1)
-        csv_file.close()
+        with timer.span("Area_Proc_Read.area_proc"):
+            with open(self.csv_start.input_values.file_name, "r", encoding='utf-8-sig') as csv_file:
+                file = csv.reader(csv_file)
+                next(file)
+                rows_count, valid_count = 0, 0
+                for line in file:
+                    rows_count += 1
+                    record = self.csv_start.get_vac_record(line)
+                    if record is not None:
+                        valid_count += 1
+                        area_to_sum = Area_Proc_Read.try_to_add(area_to_sum, record.area_name, record.salary)
+                        area_to_count = Area_Proc_Read.try_to_add(area_to_count, record.area_name, 1)
+            timer.count("rows_read", rows_count)
+            timer.count("rows_rejected", rows_count - valid_count)
+            timer.count("bytes_read", os.path.getsize(self.csv_start.input_values.file_name))
         area_to_middle_salary, area_to_piece = Area_Proc_Read.get_area_to_salary_and_piece(area_to_sum, area_to_count)
         area_to_middle_salary = Area_Proc_Read.get_sorted_dict(area_to_middle_salary)
         area_to_piece = Area_Proc_Read.get_sorted_dict(area_to_piece)
@@ -628,13 +2079,10 @@ class Image_Creator:
         self.horizontal_bar(axis[1, 0])
         self.pie_diogramm(axis[1, 1])
 
-    def get_year_queue_data(self) -> (dict, dict, dict, dict):
-        """Достать из очереди все данные и распределить их по словарям.
-        Returns:
-            (dict, dict, dict, dict): Год к кол-ву, год к зарплате, год к кол-ву нужных проф. год к зарплате нужных проф.
-        """
-        while not self.year_reader.year_queue.empty():
-            data = self.year_reader.year_queue.get()
+    def get_year_queue_data(self) -> None:
+        """Получить данные по годам и распределить их по словарям: год к кол-ву, год к зарплате,
+        год к кол-ву нужных проф., год к зарплате нужных проф."""
+        for data in self.year_reader.get_year_data():
             self.year_to_count[data[0]] = data[1]
             self.year_to_salary[data[0]] = data[2]
             self.year_to_count_needed[data[0]] = data[3]
@@ -687,7 +2135,6 @@ class Image_Creator:
         """
         self.area_reader.csv_start.input_values.timer\
             .write_time("MAIN > Графики по городам построены. Ожидаем конец обработки по годам")
-        self.year_reader.year_process.join()
         self.get_year_queue_data()
         self.sort_year_dicts()
         self.standart_bar(axis[0, 0], self.year_to_salary.keys(), self.year_to_salary_needed.keys(),
@@ -708,6 +2155,7 @@ class Image_Creator:
         fig.set_size_inches(16, 9)
         fig.tight_layout(h_pad=2)
         fig.savefig(self.image_name)
+        plt.close(fig)
 
 
 class Report_PDF_MP:
@@ -774,12 +2222,34 @@ class Report_PDF_MP:
         sheet_2_rows = Report_PDF_MP.get_table_rows(sheet_2_columns)
         return sheet_1_headers, sheet_1_rows, sheet_2_headers, sheet_2_rows
 
+    @staticmethod
+    def get_rejects_table(rejects: Reject_Stats) -> (list, list):
+        """Получить таблицу воронки проверок записей.
+        Args:
+            rejects (Reject_Stats): статистика отбраковки.
+        Returns:
+            (list, list): заголовки и строки таблицы (проверка, записей на входе, отброшено, доля отброшенных).
+
+        >>> rejects = Reject_Stats()
+        >>> rejects.checked_count = 4
+        >>> rejects.add("bad_salary", ["a"])
+        >>> Report_PDF_MP.get_rejects_table(rejects)[1][1]
+        ['Зарплата - не число', 4, 1, '25.0%']
+        """
+        headers = ["Проверка", "Записей на входе", "Отброшено", "Доля отброшенных"]
+        rows = [[Reject_Stats.reason_names[reason], rows_count, rejected_count,
+                 Report_PDF_MP.get_percents(rejected_count / rows_count if rows_count > 0 else 0)]
+                for reason, rows_count, rejected_count in rejects.get_stages()]
+        return headers, rows
+
     def generate_pdf(self, file_name: str):
         """Сгенерировать pdf-файл из получившихся данных, png-графиков, и HTML-шаблона с названием html_template.html.
         Args:
             file_name (str): Название pdf-файла с графиками и таблицами.
         """
         sheet_1_headers, sheet_1_rows, sheet_2_headers, sheet_2_rows = Report_PDF_MP.get_table_data(self.image_data)
+        rejects_headers, rejects_rows = \
+            Report_PDF_MP.get_rejects_table(self.image_data.area_reader.csv_start.rejects)
         html = open("html_template.html").read()
         template = Template(html)
         keys_to_values = {
@@ -792,7 +2262,10 @@ class Report_PDF_MP:
             "years_rows": sheet_1_rows,
             "cities_headers": sheet_2_headers,
             "count_columns": len(sheet_2_headers),
-            "cities_rows": sheet_2_rows
+            "cities_rows": sheet_2_rows,
+            "rejects_head": "Проверка записей",
+            "rejects_headers": rejects_headers,
+            "rejects_rows": rejects_rows
         }
         pdf_template = template.render(keys_to_values)
         self.image_data.area_reader.csv_start.input_values.timer.write_time("MAIN > Вызываем wkhtmltopdf.exe")
@@ -800,27 +2273,134 @@ class Report_PDF_MP:
         pdfkit.from_string(pdf_template, file_name, configuration=config, options={"enable-local-file-access": True})
 
 
-if __name__ == '__main__':
-    timer = Timer("MAIN > Начало работы таймера", 3)
-    input_values = InputCorrect(input("Введите название файла: "), input("Введите название профессии: "), timer)
-
-    timer.write_time("MAIN > Ввод окончен")
-    timer.reload_start_time()
-
-    values_reader = Currency_Values_Reader("api_data", "currency_csv.csv")
-    timer.write_time("MAIN > начало формирования словарей с данными валют")
-
+def create_readers(mode: str, input_values: InputCorrect, values_reader: Currency_Values_Reader,
+                   backend: str = "processes") -> (any, any):
+    """Создать обработчики данных по годам и по городам для выбранного режима.
+    Args:
+        mode (str): режим обработки ("Процессы", "Один проход", "MMap", "Куски", "Инкремент", "Пересчет", "Кэш"
+            или "NumPy").
+        input_values (InputCorrect): информация о файле и профессии.
+        values_reader (Currency_Values_Reader): данные по валютам.
+        backend (str): способ обработки в режимах "Куски" и "Процессы" ("serial", "threads" или "processes").
+    Returns:
+        (any, any): обработчик данных по годам и обработчик данных по городам.
+    """
+    timer = input_values.timer
+    if mode == "Один проход":
+        csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+        timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+        single_reader = Single_Pass_Read(csv_start)
+        timer.write_time("MAIN > обработка по годам и городам за один проход завершена")
+        return single_reader, single_reader
+    if mode == "MMap":
+        csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+        timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+        mmap_reader = Mmap_Read(csv_start)
+        timer.write_time("MAIN > обработка по годам и городам через mmap завершена")
+        return mmap_reader, mmap_reader
+    if mode == "Куски":
+        csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+        timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+        chunked_reader = Chunked_Read(csv_start, backend=backend)
+        timer.write_time("MAIN > обработка кусков файла завершена")
+        return chunked_reader, chunked_reader
+    if mode in ["Инкремент", "Пересчет"]:
+        csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+        timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+        incremental_reader = Incremental_Read(csv_start, "state", rebuild=mode == "Пересчет")
+        timer.write_time("MAIN > обработка новых записей завершена")
+        return incremental_reader, incremental_reader
+    if mode == "Кэш":
+        csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+        timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+        cache_reader = Cache_Read(csv_start, "cache")
+        timer.write_time("MAIN > обработка по кэшу завершена")
+        return cache_reader, cache_reader
+    if mode == "NumPy":
+        csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+        timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+        vectorized_reader = Vectorized_Read(csv_start)
+        timer.write_time("MAIN > обработка массивами NumPy завершена")
+        return vectorized_reader, vectorized_reader
     csv_start = CSV_Start(input_values, values_reader)
     timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
 
-    year_reader = Year_Proc_Read(csv_start, "csv")
-    timer.write_time("MAIN > Процесс по годам стартовал")
+    year_reader = Year_Proc_Read(csv_start, "csv", backend=backend)
+    timer.write_time("MAIN > Задача по годам стартовала")
 
     area_reader = Area_Proc_Read(csv_start)
     timer.write_time("MAIN > обработка по городам завершена")
+    return year_reader, area_reader
 
-    image_data = Image_Creator("graph_new_mp_2.png", year_reader, area_reader)
-    timer.write_time("MAIN > Данные готовы. Собираем PDF-отчет")
 
-    report = Report_PDF_MP("report_new_multi_api_2.pdf", image_data)
-    timer.write_time("MAIN > Обработка завершена. Отчет готов")
+def create_batch_reports(input_values: InputCorrect, values_reader: Currency_Values_Reader, profs: list) -> list:
+    """Посчитать данные для всех профессий за один проход по файлу и собрать pdf-отчет для каждой.
+    Args:
+        input_values (InputCorrect): информация о файле.
+        values_reader (Currency_Values_Reader): данные по валютам.
+        profs (list): названия профессий.
+    Returns:
+        list: названия созданных pdf-файлов.
+    """
+    csv_start = CSV_Start(input_values, values_reader, count_currencies=False)
+    input_values.timer.write_time("MAIN > Первичная обработка завершена (первая строка + индексы)")
+    batch_reader = Batch_Read(csv_start, profs)
+    input_values.timer.write_time(f"MAIN > обработка {len(profs)} профессий за один проход завершена")
+    print("MAIN > Совпадения профессий:", batch_reader.matcher.get_stats())
+    batch_reader.csv_start.rejects.write_to(input_values.timer)
+    print("MAIN > Отброшенные записи:", batch_reader.csv_start.rejects.counts)
+    pdf_names = []
+    for index, prof in enumerate(profs):
+        prof_reader = batch_reader.get_prof_reader(prof)
+        image_data = Image_Creator(f"graph_new_mp_2_{index}.png", prof_reader, prof_reader)
+        pdf_names.append(f"report_new_multi_api_2_{index}.pdf")
+        Report_PDF_MP(pdf_names[-1], image_data)
+        input_values.timer.write_time(f"MAIN > Отчет для профессии \"{prof}\" готов: {pdf_names[-1]}")
+    return pdf_names
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PDF-отчет по вакансиям с курсами валют ЦБ РФ")
+    parser.add_argument("--backend", choices=backends, default="processes",
+                        help="способ обработки в режимах \"Куски\" и \"Процессы\"")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="включить cProfile во всех процессах и сохранять профили в директорию DIR")
+    parser.add_argument("--stats", metavar="JSON", help="сохранить сводку (участки, счетчики, профиль) в файл")
+    parser.add_argument("--trace", metavar="JSON", help="сохранить участки всех процессов в формате Chrome trace")
+    args = parser.parse_args()
+
+    timer = Timer("MAIN > Начало работы таймера", 3, args.profile)
+    input_values = InputCorrect(input("Введите название файла: "),
+                                input("Введите название профессии (для режима \"Пакет\" - несколько через ';'): "),
+                                timer)
+    mode = input("Введите режим обработки (Процессы/Один проход/MMap/Куски/Инкремент/Пересчет/Кэш/NumPy/Пакет): ")
+
+    timer.write_time("MAIN > Ввод окончен")
+    timer.reload_start_time()
+
+    values_reader = Currency_Values_Reader("api_data", "currency_csv.csv")
+    timer.write_time("MAIN > начало формирования словарей с данными валют")
+
+    if mode == "Пакет":
+        with timer.span("create_batch_reports"):
+            create_batch_reports(input_values, values_reader, [prof.strip() for prof in input_values.prof.split(";")])
+        timer.write_time("MAIN > Обработка завершена. Отчеты готовы")
+    else:
+        with timer.span("create_readers", mode=mode):
+            year_reader, area_reader = create_readers(mode, input_values, values_reader, args.backend)
+        area_reader.csv_start.rejects.write_to(timer)
+        print("MAIN > Отброшенные записи:", area_reader.csv_start.rejects.counts)
+
+        with timer.span("Image_Creator"):
+            image_data = Image_Creator("graph_new_mp_2.png", year_reader, area_reader)
+        timer.write_time("MAIN > Данные готовы. Собираем PDF-отчет")
+
+        with timer.span("Report_PDF_MP"):
+            report = Report_PDF_MP("report_new_multi_api_2.pdf", image_data)
+        timer.write_time("MAIN > Обработка завершена. Отчет готов")
+
+    if args.profile is not None or args.stats is not None or args.trace is not None:
+        summary = timer.export(args.stats, args.trace)
+        print("MAIN > Счетчики:", summary["counters"])
+        for row in summary.get("top_functions", [])[:10]:
+            print(f"MAIN > {row['cumulative_s']:>9} с  {row['calls']:>9}  {row['function']}")
@@ -1,7 +1,12 @@
 import csv, math
+import argparse
 import sqlite3
+import numpy as np
 import pandas as pd
 
+from VacancyCache import Vacancy_Cache
+from ProfMatcher import Prof_Matcher
+
 
 class SQLReport:
     """Класс для создания 6-ти запросов в базу данных.
@@ -16,13 +21,26 @@ class SQLReport:
             prof (str): название професии.
         """
         self.connect = sqlite3.connect(db_name)
+        self.create_needed_names(Prof_Matcher(prof))
         self.print_salary_by_year()
         self.print_count_by_year()
-        self.print_salary_by_year_needed(prof)
-        self.print_count_by_year_needed(prof)
+        self.print_salary_by_year_needed()
+        self.print_count_by_year_needed()
         self.print_salary_by_area()
         self.print_piece_by_area()
 
+    def create_needed_names(self, matcher: Prof_Matcher) -> None:
+        """Создает временную таблицу needed_names с уникальными названиями вакансий нужной профессии.
+        Каждое название проверяется один раз, а запросы по профессии ищут по таблице вместо LIKE по всем записям.
+        Args:
+            matcher (Prof_Matcher): проверка названия вакансии на профессию.
+        """
+        self.connect.execute("DROP TABLE IF EXISTS needed_names;")
+        self.connect.execute("CREATE TEMP TABLE needed_names (name TEXT PRIMARY KEY);")
+        name_counts = self.connect.execute("SELECT name, COUNT(*) FROM vacancies GROUP BY name;").fetchall()
+        self.connect.executemany("INSERT INTO needed_names VALUES (?);",
+                                 [(name,) for name, count in name_counts if matcher.is_match(name, count)])
+
     def print_salary_by_year(self) -> None:
         """Создает запрос по средней зарплате всех вакансий по годам"""
         print(">>>>>>>>>>>>>>>>>>>>>>>Динамика уровня зарплат по годам<<<<<<<<<<<<<<<<<<<<<<<")
@@ -47,28 +65,28 @@ class SQLReport:
         print(df)
         print(">>>>>>>>>>>>>>>>>>>>>>>=================================<<<<<<<<<<<<<<<<<<<<<<<", "\n")
 
-    def print_salary_by_year_needed(self, prof: str) -> None:
+    def print_salary_by_year_needed(self) -> None:
         """Создает запрос по средней зарплате нужных вакансий по годам"""
         print(">>>>>>>>>>>>>>>>>>>>>>>Динамика уровня зарплат по годам для выбранной профессии<<<<<<<<<<<<<<<<<<<<<<<")
-        sql_request = f" \
-            SELECT strftime('%Y', published_at) as year, CAST(ROUND(AVG(salary)) AS INTEGER) as avg_salary \
-            FROM vacancies \
-            WHERE name LIKE '%{prof}%' \
-            GROUP BY strftime('%Y', published_at); \
-        "
+        sql_request = """
+            SELECT strftime('%Y', published_at) as year, CAST(ROUND(AVG(salary)) AS INTEGER) as avg_salary
+            FROM vacancies
+            WHERE name IN needed_names
+            GROUP BY strftime('%Y', published_at);
+        """
         df = pd.read_sql(sql_request, self.connect)
         print(df)
         print(">>>>>>>>>>>>>>>>>>>>>>>=================================<<<<<<<<<<<<<<<<<<<<<<<", "\n")
 
-    def print_count_by_year_needed(self, prof: str) -> None:
+    def print_count_by_year_needed(self) -> None:
         """Создает запрос по количеству нужных вакансий по годам"""
         print(">>>>>>>>>>>>>>>>>>>>>>>Динамика количества вакансий по годам для выбранной профессии<<<<<<<<<<<<<<<<<<<<<<<")
-        sql_request = f" \
-            SELECT strftime('%Y', published_at) as year, COUNT(*) as count \
-            FROM vacancies \
-            WHERE name LIKE '%{prof}%' \
-            GROUP BY strftime('%Y', published_at); \
-        "
+        sql_request = """
+            SELECT strftime('%Y', published_at) as year, COUNT(*) as count
+            FROM vacancies
+            WHERE name IN needed_names
+            GROUP BY strftime('%Y', published_at);
+        """
         df = pd.read_sql(sql_request, self.connect)
         print(df)
         print(">>>>>>>>>>>>>>>>>>>>>>>=================================<<<<<<<<<<<<<<<<<<<<<<<", "\n")
@@ -105,6 +123,77 @@ class SQLReport:
         print(">>>>>>>>>>>>>>>>>>>>>>>=================================<<<<<<<<<<<<<<<<<<<<<<<", "\n")
 
 
+class CacheReport:
+    """Класс для тех же 6-ти запросов, но по колоночному кэшу вакансий вместо базы данных.
+    Attributes:
+        cache (Vacancy_Cache): открытый кэш вакансий.
+        prof (str): название професии.
+    """
+    def __init__(self, cache: Vacancy_Cache, prof: str):
+        """Инициализация. Создание таблицы из столбцов кэша, все запросы и вывод результата на экран.
+        Args:
+            cache (Vacancy_Cache): открытый кэш вакансий.
+            prof (str): название професии.
+        """
+        self.vacancies = pd.DataFrame({
+            "year": cache.get_years(),
+            "salary": cache.salary,
+            "area_name": pd.Categorical.from_codes(cache.area_id, cache.areas),
+            "is_needed": cache.get_needed_mask(Prof_Matcher(prof))
+        })
+        self.print_result("Динамика уровня зарплат по годам", self.get_salary_by_year(self.vacancies))
+        self.print_result("Динамика количества вакансий по годам", self.get_count_by_year(self.vacancies))
+        needed_vacancies = self.vacancies[self.vacancies["is_needed"]]
+        self.print_result("Динамика уровня зарплат по годам для выбранной профессии",
+                          self.get_salary_by_year(needed_vacancies))
+        self.print_result("Динамика количества вакансий по годам для выбранной профессии",
+                          self.get_count_by_year(needed_vacancies))
+        self.print_result("Уровень зарплат по городам", self.get_salary_by_area())
+        self.print_result("Доля вакансий по городам", self.get_piece_by_area())
+
+    @staticmethod
+    def print_result(title: str, df: pd.DataFrame) -> None:
+        """Выводит результат запроса в том же виде, что и SQLReport."""
+        print(f">>>>>>>>>>>>>>>>>>>>>>>{title}<<<<<<<<<<<<<<<<<<<<<<<")
+        print(df)
+        print(">>>>>>>>>>>>>>>>>>>>>>>=================================<<<<<<<<<<<<<<<<<<<<<<<", "\n")
+
+    @staticmethod
+    def sql_round(values: pd.Series) -> pd.Series:
+        """Округление как в ROUND у sqlite (половина - от нуля)."""
+        return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(int)
+
+    @staticmethod
+    def get_salary_by_year(vacancies: pd.DataFrame) -> pd.DataFrame:
+        """Средняя зарплата по годам."""
+        df = vacancies.groupby("year")["salary"].mean().reset_index(name="avg_salary")
+        df["avg_salary"] = CacheReport.sql_round(df["avg_salary"])
+        return df
+
+    @staticmethod
+    def get_count_by_year(vacancies: pd.DataFrame) -> pd.DataFrame:
+        """Количество вакансий по годам."""
+        return vacancies.groupby("year").size().reset_index(name="count")
+
+    def get_big_areas(self) -> pd.DataFrame:
+        """Города, в которых больше 1% вакансий, с количеством и средней зарплатой."""
+        df = self.vacancies.groupby("area_name", observed=True)["salary"].agg(["size", "mean"]).reset_index()
+        df.columns = ["area_name", "count", "avg_salary"]
+        return df[df["count"] > len(self.vacancies) // 100].copy()
+
+    def get_salary_by_area(self) -> pd.DataFrame:
+        """Средняя зарплата в городах."""
+        df = self.get_big_areas()
+        df["avg_salary"] = CacheReport.sql_round(df["avg_salary"])
+        return df.sort_values("avg_salary", ascending=False, kind="stable").head(10).reset_index(drop=True)
+
+    def get_piece_by_area(self) -> pd.DataFrame:
+        """Доля вакансий в городах."""
+        df = self.get_big_areas()[["area_name", "count"]].copy()
+        df["piece"] = (df["count"] / len(self.vacancies) * 100).round(4).astype(str) + "%"
+        return df.sort_values("count", ascending=False, kind="stable").head(10).reset_index(drop=True)
+
+
 def set_pandas_options():
     """Устанавливает настройки pandas, чтобы корректно отображать класс DataFrame в консоли."""
     pd.set_option('display.max_rows', None)
@@ -114,7 +203,20 @@ def set_pandas_options():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="6 запросов по вакансиям: по базе данных или по кэшу вакансий")
+    parser.add_argument("--cache", metavar="CSV",
+                        help="считать запросы по кэшу csv-файла (создается режимом \"Кэш\" ReportPDF_New_MProcess_2)")
+    parser.add_argument("--cache-root", default="cache", help="общая директория для кэшей")
+    args = parser.parse_args()
+
     set_pandas_options()
     file_name = "vacancies_big.db" #input("Введите название файла: ")
     prof_name = "Программист" #input("Введите название профессии: ")
-    input_values = SQLReport(file_name, prof_name)
\ No newline at end of file
+    if args.cache is None:
+        input_values = SQLReport(file_name, prof_name)
+    else:
+        cache = Vacancy_Cache.load(args.cache_root, args.cache, None)
+        if cache is None:
+            print(f"Кэш для {args.cache} не найден или устарел: создайте его режимом \"Кэш\" ReportPDF_New_MProcess_2")
+        else:
+            input_values = CacheReport(cache, prof_name)
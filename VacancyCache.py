@@ -0,0 +1,212 @@
+import os
+import hashlib, json
+from array import array
+
+import numpy as np
+
+from ProfMatcher import Prof_Matcher
+
+
+class String_Table:
+    """Словарное кодирование столбца: каждая уникальная строка хранится один раз,
+    а для каждой записи хранится только номер строки (в порядке первого появления).
+    Attributes:
+        value_to_id (dict): строка/номер.
+        ids (array): номер строки для каждой записи.
+    """
+    def __init__(self):
+        """Инициализация пустого столбца."""
+        self.value_to_id = {}
+        self.ids = array("i")
+
+    def add(self, value: str) -> None:
+        """Добавить значение записи.
+        Args:
+            value (str): строка.
+        """
+        self.ids.append(self.value_to_id.setdefault(value, len(self.value_to_id)))
+
+    def get_values(self) -> list:
+        """Получить уникальные строки по номерам.
+        Returns:
+            list: строки.
+        """
+        return list(self.value_to_id)
+
+    def get_ids(self) -> np.ndarray:
+        """Получить номера строк записей без копирования.
+        Returns:
+            np.ndarray: номера строк.
+        """
+        return np.frombuffer(self.ids, dtype=np.int32) if len(self.ids) > 0 else np.zeros(0, dtype=np.int32)
+
+    def map_values(self, values: np.ndarray) -> np.ndarray:
+        """Разнести значения, посчитанные для уникальных строк, по записям.
+        Args:
+            values (np.ndarray): значение для каждой уникальной строки.
+        Returns:
+            np.ndarray: значение для каждой записи.
+        """
+        return values[self.get_ids()]
+
+
+class Vacancy_Cache:
+    """Колоночный бинарный кэш очищенных вакансий (только валидные записи с частыми валютами).
+    Столбцы хранятся в npy-файлах и открываются через mmap, названия вакансий и городов
+    хранятся один раз в таблицах строк, а в столбцах - только их номера.
+    Кэш создается движком отчета (Cache_Read.build_cache), а читать его можно без движка (SQLReport.CacheReport).
+    Attributes:
+        cache_dir (str): директория кэша конкретного csv-файла.
+        meta (dict): ключ кэша (размер, время изменения и хэш файла, версия таблицы валют).
+        rejects (dict): статистика отбраковки при создании кэша (Reject_Stats.to_dict).
+    """
+    cache_version = 2
+    hash_block_size = 1 << 20
+    columns = ["name_id", "area_id", "salary", "year_salary", "published_at"]
+
+    def __init__(self, cache_dir: str, meta: dict):
+        """Открытие готового кэша через mmap.
+        Args:
+            cache_dir (str): директория кэша конкретного csv-файла.
+            meta (dict): ключ кэша.
+        """
+        self.cache_dir = cache_dir
+        self.meta = meta
+        with open(cache_dir + "/strings.json", "r", encoding="utf-8") as json_file:
+            strings = json.load(json_file)
+        self.names = strings["names"]
+        self.areas = strings["areas"]
+        with open(cache_dir + "/rejects.json", "r", encoding="utf-8") as json_file:
+            self.rejects = json.load(json_file)
+        for column in Vacancy_Cache.columns:
+            setattr(self, column, np.load(f"{cache_dir}/{column}.npy", mmap_mode="r"))
+
+    @staticmethod
+    def get_meta(file_name: str, currency_version: str) -> dict:
+        """Получить ключ кэша для csv-файла. Хэш считается по первому и последнему мегабайту файла,
+        чтобы проверка кэша не читала весь файл.
+        Args:
+            file_name (str): название csv-файла.
+            currency_version (str): версия таблицы валют (Currency_Values_Reader.version).
+        Returns:
+            dict: ключ кэша.
+        """
+        file_stat = os.stat(file_name)
+        file_hash = hashlib.sha1()
+        with open(file_name, "rb") as csv_file:
+            file_hash.update(csv_file.read(Vacancy_Cache.hash_block_size))
+            csv_file.seek(max(0, file_stat.st_size - Vacancy_Cache.hash_block_size))
+            file_hash.update(csv_file.read(Vacancy_Cache.hash_block_size))
+        return {
+            "cache_version": Vacancy_Cache.cache_version,
+            "file_size": file_stat.st_size,
+            "file_mtime_ns": file_stat.st_mtime_ns,
+            "file_hash": file_hash.hexdigest(),
+            "currency_version": currency_version
+        }
+
+    @staticmethod
+    def get_cache_dir(cache_root: str, file_name: str) -> str:
+        """Получить директорию кэша для csv-файла.
+        Args:
+            cache_root (str): общая директория для кэшей.
+            file_name (str): название csv-файла.
+        Returns:
+            str: директория кэша.
+        """
+        return cache_root + "/" + os.path.basename(file_name)
+
+    @staticmethod
+    def load(cache_root: str, file_name: str, currency_version: str):
+        """Открыть кэш, если он есть и подходит к файлу и таблице валют.
+        Args:
+            cache_root (str): общая директория для кэшей.
+            file_name (str): название csv-файла.
+            currency_version (str): версия таблицы валют (None - не проверять, взять версию из кэша).
+        Returns:
+            Vacancy_Cache или None: кэш или None, если его нужно пересоздать.
+        """
+        cache_dir = Vacancy_Cache.get_cache_dir(cache_root, file_name)
+        if not os.path.exists(cache_dir + "/meta.json"):
+            return None
+        with open(cache_dir + "/meta.json", "r", encoding="utf-8") as json_file:
+            meta = json.load(json_file)
+        if currency_version is None:
+            currency_version = meta.get("currency_version")
+        if meta != Vacancy_Cache.get_meta(file_name, currency_version):
+            return None
+        return Vacancy_Cache(cache_dir, meta)
+
+    @staticmethod
+    def get_first_seen_codes(ids: np.ndarray) -> (np.ndarray, np.ndarray):
+        """Перенумеровать номера строк в порядке их первого появления.
+        Args:
+            ids (np.ndarray): номера строк.
+        Returns:
+            (np.ndarray, np.ndarray): старые номера в новом порядке, новые номера для каждой записи.
+        """
+        unique_ids, first_index, inverse = np.unique(ids, return_index=True, return_inverse=True)
+        order = np.argsort(first_index, kind="stable")
+        new_code = np.empty(len(order), dtype=np.int32)
+        new_code[order] = np.arange(len(order), dtype=np.int32)
+        return unique_ids[order], new_code[inverse]
+
+    @staticmethod
+    def save(cache_root: str, file_name: str, arrays: dict, names: list, areas: list, rejects: dict,
+             currency_version: str):
+        """Сохранить очищенные столбцы в кэш (meta.json пишется последним, поэтому недописанный кэш не откроется).
+        Args:
+            cache_root (str): общая директория для кэшей.
+            file_name (str): название csv-файла.
+            arrays (dict): столбец/значения (все столбцы из columns).
+            names (list): названия вакансий по номерам name_id.
+            areas (list): города по номерам area_id.
+            rejects (dict): статистика отбраковки.
+            currency_version (str): версия таблицы валют.
+        Returns:
+            Vacancy_Cache: созданный кэш.
+        """
+        cache_dir = Vacancy_Cache.get_cache_dir(cache_root, file_name)
+        os.makedirs(cache_dir, exist_ok=True)
+        for column in Vacancy_Cache.columns:
+            np.save(f"{cache_dir}/{column}.npy", arrays[column])
+        with open(cache_dir + "/strings.json", "w", encoding="utf-8") as json_file:
+            json.dump({"names": names, "areas": areas}, json_file, ensure_ascii=False)
+        with open(cache_dir + "/rejects.json", "w", encoding="utf-8") as json_file:
+            json.dump(rejects, json_file, ensure_ascii=False)
+        meta = Vacancy_Cache.get_meta(file_name, currency_version)
+        with open(cache_dir + "/meta.json", "w", encoding="utf-8") as json_file:
+            json.dump(meta, json_file)
+        return Vacancy_Cache(cache_dir, meta)
+
+    def get_years(self) -> np.ndarray:
+        """Получить год публикации каждой вакансии.
+        Returns:
+            np.ndarray: годы.
+        """
+        return self.published_at.astype("datetime64[Y]").astype(np.int64) + 1970
+
+    def get_needed_mask(self, matcher: Prof_Matcher) -> np.ndarray:
+        """Получить маску вакансий нужной профессии (проверяется только каждое уникальное название).
+        Args:
+            matcher (Prof_Matcher): проверка названия вакансии на профессию.
+        Returns:
+            np.ndarray: маска нужных вакансий.
+        """
+        return Vacancy_Cache.get_names_mask(matcher, self.names, self.name_id)
+
+    @staticmethod
+    def get_names_mask(matcher: Prof_Matcher, names: list, name_codes: np.ndarray) -> np.ndarray:
+        """Проверить каждое уникальное название и разнести результат по записям.
+        В счетчики совпадений попадает кол-во записей с каждым названием.
+        Args:
+            matcher (Prof_Matcher): проверка названия вакансии на профессию.
+            names (list): уникальные названия.
+            name_codes (np.ndarray): номер названия каждой записи.
+        Returns:
+            np.ndarray: маска нужных вакансий.
+        """
+        name_counts = np.bincount(name_codes, minlength=len(names))
+        is_needed_name = np.array([matcher.is_match(name, int(count)) for name, count in zip(names, name_counts)],
+                                  dtype=bool)
+        return is_needed_name[name_codes]